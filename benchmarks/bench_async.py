@@ -0,0 +1,107 @@
+"""
+Concurrent multi-user throughput: sync task_manager vs AsyncTaskManager.
+
+Every simulated user creates tasks (shared with a neighbour), edits their
+details, toggles them complete and reloads their list. The sync run executes
+users one after another, as a naive server would; the async run interleaves
+all users on one event loop. Both runs use a fresh temporary database and
+master key, so the project database is never touched.
+
+Run with:  python benchmarks/bench_async.py [--users 16] [--tasks 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    # Allow running this script directly by ensuring project root is importable.
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from core import task_manager
+from core.async_task_manager import AsyncTaskManager
+from crypto import key_manager
+from database import db_setup
+from database.models import User
+
+
+def _fresh_environment(workdir: Path, label: str, users: int):
+    db_setup.DATABASE_NAME = str(workdir / f"{label}.db")
+    os.environ[key_manager.MASTER_KEY_ENV_VAR] = str(workdir / f"{label}.key")
+    key_manager.reset_master_key_cache()
+    db_setup.initialize_database()
+    return [User.create(f"bench{i}", "pw") for i in range(users)]
+
+
+def _neighbour(user_ids, index):
+    return [user_ids[(index + 1) % len(user_ids)]]
+
+
+def run_sync(user_ids, tasks_per_user):
+    ops = 0
+    for index, user_id in enumerate(user_ids):
+        for n in range(tasks_per_user):
+            _, _, task_id = task_manager.create_encrypted_task(
+                f"Task {n}", f"details {n} for {user_id}", user_id, _neighbour(user_ids, index)
+            )
+            task_manager.update_task(task_id, user_id, new_details=f"edited {n}")
+            task_manager.update_task(task_id, user_id, is_complete=True)
+            ops += 3
+        task_manager.get_tasks_for_user(user_id)
+        ops += 1
+    return ops
+
+
+async def run_async(user_ids, tasks_per_user, db_pool_size, crypto_workers):
+    async with AsyncTaskManager(db_pool_size=db_pool_size, crypto_workers=crypto_workers) as manager:
+
+        async def one_task(index, user_id, n):
+            _, _, task_id = await manager.create_encrypted_task(
+                f"Task {n}", f"details {n} for {user_id}", user_id, _neighbour(user_ids, index)
+            )
+            await manager.update_task(task_id, user_id, new_details=f"edited {n}")
+            await manager.update_task(task_id, user_id, is_complete=True)
+
+        async def one_user(index, user_id):
+            await asyncio.gather(*(one_task(index, user_id, n) for n in range(tasks_per_user)))
+            await manager.get_tasks_for_user(user_id)
+
+        await asyncio.gather(*(one_user(i, u) for i, u in enumerate(user_ids)))
+    return len(user_ids) * (tasks_per_user * 3 + 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--tasks", type=int, default=20, help="tasks per user")
+    parser.add_argument("--db-pool", type=int, default=4)
+    parser.add_argument("--crypto-workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+
+        user_ids = _fresh_environment(workdir, "sync", args.users)
+        start = time.perf_counter()
+        sync_ops = run_sync(user_ids, args.tasks)
+        sync_elapsed = time.perf_counter() - start
+
+        user_ids = _fresh_environment(workdir, "async", args.users)
+        start = time.perf_counter()
+        async_ops = asyncio.run(run_async(user_ids, args.tasks, args.db_pool, args.crypto_workers))
+        async_elapsed = time.perf_counter() - start
+
+    print(f"users={args.users} tasks/user={args.tasks}")
+    print(f"sync : {sync_ops} ops in {sync_elapsed:.2f}s  ({sync_ops / sync_elapsed:,.0f} ops/s)")
+    print(f"async: {async_ops} ops in {async_elapsed:.2f}s  ({async_ops / async_elapsed:,.0f} ops/s)")
+    print(f"speedup: {sync_elapsed / async_elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
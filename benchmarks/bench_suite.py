@@ -0,0 +1,306 @@
+"""
+Latency and throughput of the core hot paths, as JSON, with baseline checks.
+
+A synthetic dataset is generated first (fresh temporary database and master
+key): --users users with one shared password, --tasks tasks each, and every
+task shared with --fanout other users picked at random (seeded, so runs are
+comparable). Then each benchmark calls one operation --iterations times and
+records every call's latency:
+
+  create_task      task_manager.create_encrypted_task, shared with --fanout users
+  get_tasks        task_manager.get_tasks_for_user (owned + shared, decrypted)
+  update_task      task_manager.update_task with new details (re-encrypts)
+  share_task       task_manager.share_task_with_user
+  login            user_auth.login_user (PBKDF2 dominated)
+  encrypt_roundtrip  encrypt_message + decrypt_message of a ~500 character text
+  key_roundtrip    encrypt_data_key_for_user + decrypt_data_key_for_user
+  gui_refresh      TaskWindow.refresh, offscreen (skipped without PyQt5)
+
+The report has ops/s and mean/p50/p90/p99/max latency in milliseconds per
+benchmark. With --baseline, each benchmark whose p50 latency is more than
+--tolerance (default 25%, and at least MIN_REGRESSION_MS) above the
+baseline's is reported as a regression and the exit status is 1. --save-baseline writes the report as the new
+baseline (benchmarks/baseline.json is the one checked in; numbers are only
+comparable on similar hardware).
+
+Run with:  python benchmarks/bench_suite.py [--users 20] [--tasks 25] [--fanout 2]
+           [--iterations 200] [--only get_tasks,gui_refresh] [--output report.json]
+           [--baseline benchmarks/baseline.json] [--save-baseline FILE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+if __package__ in (None, ""):
+    # Allow running this script directly by ensuring project root is importable.
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from core import task_manager, user_auth
+from crypto import encryption, key_manager
+from database import db_setup
+from database.models import User
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+PASSWORD = "bench-password"
+# calls per benchmark are capped for the slow ones (PBKDF2, building widgets)
+MAX_ITERATIONS = {"login": 20, "gui_refresh": 30}
+# p50 changes smaller than this are timer noise, whatever the percentage
+MIN_REGRESSION_MS = 0.1
+
+
+def generate_dataset(workdir: Path, users: int, tasks: int, fanout: int, seed: int = 0) -> dict:
+    """
+    Create a fresh database with users * tasks tasks, each shared with
+    fanout random other users. Returns user ids and task ids per owner.
+    """
+    db_setup.DATABASE_NAME = str(workdir / "bench.db")
+    os.environ[key_manager.MASTER_KEY_ENV_VAR] = str(workdir / "bench.key")
+    key_manager.reset_master_key_cache()
+    db_setup.initialize_database()
+
+    rng = random.Random(seed)
+    # hashing once is enough: the salt is part of the stored value
+    password_hash = user_auth.hash_password(PASSWORD)
+    user_ids = [User.create(f"bench{n}", password_hash) for n in range(users)]
+    fanout = min(fanout, users - 1)
+    owned = {}
+    for user_id in user_ids:
+        others = [u for u in user_ids if u != user_id]
+        ok, message, task_ids = task_manager.create_encrypted_tasks(user_id, [
+            {
+                "title": f"Task {n}",
+                "details": _details(rng),
+                "shared_with": rng.sample(others, fanout),
+                "is_complete": n % 3 == 0,
+            }
+            for n in range(tasks)
+        ])
+        if not ok:
+            raise RuntimeError(message)
+        owned[user_id] = task_ids
+    return {"user_ids": user_ids, "owned": owned, "fanout": fanout}
+
+
+def _details(rng: random.Random, length: int = 500) -> str:
+    words = ("groceries", "deadline", "meeting", "notes", "review", "draft", "call", "plan")
+    text = " ".join(rng.choice(words) for _ in range(length // 6))
+    return text[:length]
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[float]) -> dict:
+    """Latency samples (seconds) -> ops/s and percentile latencies (ms)."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "ops": len(ordered),
+        "ops_per_sec": len(ordered) / total if total else 0.0,
+        "mean_ms": total / len(ordered) * 1000,
+        "p50_ms": _percentile(ordered, 50) * 1000,
+        "p90_ms": _percentile(ordered, 90) * 1000,
+        "p99_ms": _percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _measure(op: Callable[[int], object], iterations: int) -> List[float]:
+    samples = []
+    for n in range(iterations):
+        start = time.perf_counter()
+        op(n)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _benchmarks(dataset: dict, rng: random.Random) -> Dict[str, Callable[[], Callable[[int], object]]]:
+    """name -> setup() returning the operation to time (called with the iteration number)."""
+    user_ids = dataset["user_ids"]
+    owned = dataset["owned"]
+    fanout = dataset["fanout"]
+
+    def create_task():
+        def op(n):
+            owner = user_ids[n % len(user_ids)]
+            others = [u for u in user_ids if u != owner]
+            task_manager.create_encrypted_task(
+                f"New {n}", _details(rng), owner, rng.sample(others, fanout)
+            )
+        return op
+
+    def get_tasks():
+        return lambda n: task_manager.get_tasks_for_user(user_ids[n % len(user_ids)])
+
+    def update_task():
+        def op(n):
+            owner = user_ids[n % len(user_ids)]
+            task_id = rng.choice(owned[owner])
+            task_manager.update_task(task_id, owner, new_details=_details(rng))
+        return op
+
+    def share_task():
+        def op(n):
+            owner = user_ids[n % len(user_ids)]
+            task_manager.share_task_with_user(rng.choice(owned[owner]), owner, rng.choice(user_ids))
+        return op
+
+    def login():
+        def op(n):
+            ok, message, _ = user_auth.login_user(f"bench{n % len(user_ids)}", PASSWORD)
+            if not ok:
+                raise RuntimeError(message)
+        return op
+
+    def encrypt_roundtrip():
+        data_key = encryption.generate_data_key()
+        text = _details(rng)
+        return lambda n: encryption.decrypt_message(encryption.encrypt_message(text, data_key), data_key)
+
+    def key_roundtrip():
+        data_key = encryption.generate_data_key()
+
+        def op(n):
+            user_id = user_ids[n % len(user_ids)]
+            wrapped = key_manager.encrypt_data_key_for_user(user_id, data_key)
+            key_manager.decrypt_data_key_for_user(user_id, wrapped)
+        return op
+
+    def gui_refresh():
+        from gui.qt_compat import QtWidgets
+        from gui.task_window import TaskWindow
+
+        app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+        window = TaskWindow({"user_id": user_ids[0], "username": "bench0"})
+        window.show()
+        app.processEvents()
+
+        def op(n):
+            window.refresh()
+            app.processEvents()
+        op.window = window
+        return op
+
+    return {
+        "create_task": create_task,
+        "get_tasks": get_tasks,
+        "update_task": update_task,
+        "share_task": share_task,
+        "login": login,
+        "encrypt_roundtrip": encrypt_roundtrip,
+        "key_roundtrip": key_roundtrip,
+        "gui_refresh": gui_refresh,
+    }
+
+
+def run(users: int, tasks: int, fanout: int, iterations: int, only=None, seed: int = 0) -> dict:
+    report = {
+        "params": {"users": users, "tasks": tasks, "fanout": fanout, "iterations": iterations, "seed": seed},
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "results": {},
+        "skipped": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = generate_dataset(Path(tmp), users, tasks, fanout, seed)
+        rng = random.Random(seed + 1)
+        for name, setup in _benchmarks(dataset, rng).items():
+            if only and name not in only:
+                continue
+            count = min(iterations, MAX_ITERATIONS.get(name, iterations))
+            try:
+                op = setup()
+            except ImportError as exc:  # PyQt5 missing: no GUI numbers
+                report["skipped"][name] = str(exc)
+                continue
+            op(0)  # warm-up: caches, lazy imports
+            report["results"][name] = summarize(_measure(op, count))
+            window = getattr(op, "window", None)
+            if window is not None:
+                window._closing_with_sound = True
+                window.close()
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Lines describing each benchmark against the baseline; a line starting with
+    "REGRESSION" means p50 latency grew by more than tolerance (and by more
+    than MIN_REGRESSION_MS).
+    """
+    lines = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            lines.append(f"new        {name}: p50 {result['p50_ms']:.3f} ms (no baseline)")
+            continue
+        change = result["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        regressed = change > tolerance and result["p50_ms"] - base["p50_ms"] > MIN_REGRESSION_MS
+        status = "REGRESSION" if regressed else "ok        "
+        lines.append(
+            f"{status} {name}: p50 {base['p50_ms']:.3f} -> {result['p50_ms']:.3f} ms ({change:+.0%}), "
+            f"{base['ops_per_sec']:,.0f} -> {result['ops_per_sec']:,.0f} ops/s"
+        )
+    if baseline.get("params") != report["params"]:
+        lines.append(f"note: baseline params {baseline.get('params')} differ from this run")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=25, help="tasks per user")
+    parser.add_argument("--fanout", type=int, default=2, help="users each task is shared with")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", default="", help="comma separated benchmark names")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", nargs="?", const=str(DEFAULT_BASELINE),
+                        help=f"compare against a report (default {DEFAULT_BASELINE.name})")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE))
+    args = parser.parse_args(argv)
+
+    only = {name.strip() for name in args.only.split(",") if name.strip()}
+    # keep stdout for the JSON report (database setup prints progress)
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args.users, args.tasks, args.fanout, args.iterations, only, args.seed)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        lines = compare(report, baseline, args.tolerance)
+        print("\n".join(lines), file=sys.stderr)
+        if any(line.startswith("REGRESSION") for line in lines):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+TaskWindow construction and list repaint time per stylesheet setup.
+
+Compares the old single app-wide stylesheet with the scoped pastel theme and
+the scoped lightweight theme. Each run builds a TaskWindow over the same
+freshly generated tasks (temporary database and master key), then repaints
+the task list viewport and the whole window a number of times. Qt runs with
+the offscreen platform unless QT_QPA_PLATFORM is already set.
+
+Configurations are interleaved over several rounds and the median is shown,
+so warm-up effects do not favour whichever runs last.
+
+Run with:  python benchmarks/bench_theme.py [--tasks 2000] [--repaints 30] [--rounds 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    # Allow running this script directly by ensuring project root is importable.
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from core import task_manager
+from crypto import key_manager
+from database import db_setup
+from database.models import User
+from gui import style, task_window
+from gui.qt_compat import QtWidgets
+
+CONFIGS = (
+    ("global sheet", "pastel"),
+    ("scoped", "pastel"),
+    ("scoped", "lightweight"),
+)
+
+
+def _fresh_environment(workdir: Path, tasks: int) -> dict:
+    db_setup.DATABASE_NAME = str(workdir / "bench.db")
+    os.environ[key_manager.MASTER_KEY_ENV_VAR] = str(workdir / "bench.key")
+    key_manager.reset_master_key_cache()
+    db_setup.initialize_database()
+    user_id = User.create("bench", "pw")
+    task_manager.create_encrypted_tasks(user_id, [
+        {"title": f"Task {n}", "details": f"details {n}", "is_complete": n % 3 == 0}
+        for n in range(tasks)
+    ])
+    return {"user_id": user_id, "username": "bench"}
+
+
+def _timed(fn, repeats: int) -> float:
+    """Median milliseconds per call."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(app, user: dict, mode: str, theme: str, repaints: int) -> dict:
+    style.compile_stylesheet.cache_clear()
+    os.environ[style.THEME_ENV_VAR] = theme
+    if mode == "global sheet":
+        # the pre-split setup: one sheet on the app, nothing per widget
+        app.setStyleSheet(style.get_stylesheet(theme))
+        task_window.apply_theme = lambda *args, **kwargs: False
+    else:
+        app.setStyleSheet("")
+        app.setProperty("planitTheme", None)
+        style.apply_theme(app, "app", theme)
+        task_window.apply_theme = style.apply_theme
+
+    start = time.perf_counter()
+    window = task_window.TaskWindow(user)
+    window.resize(1200, 800)
+    window.show()
+    app.processEvents()
+    construct_ms = (time.perf_counter() - start) * 1000
+
+    viewport = window.list_widget.viewport()
+    list_ms = _timed(viewport.repaint, repaints)
+    window_ms = _timed(window.repaint, repaints)
+    window._closing_with_sound = True
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return {"construct_ms": construct_ms, "list_repaint_ms": list_ms, "window_repaint_ms": window_ms}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--repaints", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    original_apply = task_window.apply_theme
+    with tempfile.TemporaryDirectory() as tmp:
+        user = _fresh_environment(Path(tmp), args.tasks)
+        print(f"tasks={args.tasks} repaints={args.repaints} rounds={args.rounds} "
+              f"platform={app.platformName()}")
+        try:
+            results = {config: [] for config in CONFIGS}
+            for _ in range(args.rounds):
+                for mode, theme in CONFIGS:
+                    results[(mode, theme)].append(run(app, user, mode, theme, args.repaints))
+            print(f"{'setup':<26} {'construct ms':>13} {'list repaint ms':>16} {'window repaint ms':>18}")
+            for (mode, theme), runs in results.items():
+                median = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+                print(
+                    f"{mode + ' / ' + theme:<26} {median['construct_ms']:>13.1f} "
+                    f"{median['list_repaint_ms']:>16.2f} {median['window_repaint_ms']:>18.2f}"
+                )
+        finally:
+            task_window.apply_theme = original_apply
+            os.environ.pop(style.THEME_ENV_VAR, None)
+
+
+if __name__ == "__main__":
+    main()
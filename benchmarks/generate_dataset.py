@@ -0,0 +1,320 @@
+"""
+Generate a large, realistic PlanIt database for sizing and load tests.
+
+Writes a new database file (never an existing one) and a master key:
+
+* --users users named <prefix>0 .. <prefix>N-1, all with --password (hashed
+  once; the salt is stored in the hash, so every login still runs PBKDF2);
+* --tasks tasks whose owners follow a Zipf distribution (--owner-skew), so a
+  few users own thousands of tasks and most own a handful;
+* a skewed sharing graph: each task gets a geometric number of collaborators
+  (mean --share-mean, at most --max-fanout), drawn with Zipf weights
+  (--share-skew) so some users are in almost everything;
+* details of --details-min..--details-max characters (the limit in
+  validate_todo_data is 1000), a third of the tasks complete, and creation
+  times spread over the last --days days.
+
+Everything is encrypted the way task_manager does it (per-task data key,
+key wrapped per collaborator under the current master key version, blind
+search tokens) by a pool of --workers processes, chunk by chunk. The main
+process bulk-inserts each chunk with executemany and explicit task ids.
+The counter, change feed and FTS triggers are dropped during the load. They
+are recreated afterwards, and the counters and title index are rebuilt in
+one pass each. The change feed starts empty.
+
+Run with:  python benchmarks/generate_dataset.py --db big.db --key-file big.key
+           [--users 10000] [--tasks 1000000] [--workers 8] [--no-search-tokens]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+if __package__ in (None, ""):
+    # Allow running this script directly by ensuring project root is importable.
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from core import task_manager, user_auth
+from crypto import blind_index, encryption, key_manager
+from database import db_setup
+
+CHUNK_SIZE = 2000  # tasks per worker job and per write transaction
+VOCABULARY_SIZE = 5000
+_LOAD_TRIGGERS = (
+    db_setup.STATS_TRIGGERS
+    + db_setup.SEARCH_TRIGGERS
+    + db_setup.TITLE_INDEX_TRIGGERS
+    + db_setup.CHANGE_FEED_TRIGGERS
+)
+
+# set in each worker by _init_worker
+_plan: Optional[dict] = None
+
+
+def zipf_cum_weights(count: int, skew: float) -> List[float]:
+    """Cumulative Zipf weights (rank r has weight 1 / r**skew) for random.choices."""
+    return list(itertools.accumulate(1.0 / rank ** skew for rank in range(1, count + 1)))
+
+
+def _vocabulary(seed: int) -> List[str]:
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def _details(rng: random.Random, words: Sequence[str], length: int) -> str:
+    parts = []
+    size = 0
+    while size < length:
+        word = rng.choice(words)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)[:length].rstrip()
+
+
+def _init_worker(plan: dict) -> None:
+    global _plan
+    os.environ[key_manager.MASTER_KEY_ENV_VAR] = plan["key_file"]
+    key_manager.reset_master_key_cache()
+    _plan = dict(plan, words=_vocabulary(plan["seed"]))
+
+
+def build_chunk(job) -> tuple:
+    """
+    Encrypt one chunk of tasks; runs in a worker. Returns row lists for
+    todos, permissions, encryption_keys and task_search_tokens.
+    """
+    first_task_id, count = job
+    plan = _plan
+    rng = random.Random(plan["seed"] * 1_000_003 + first_task_id)
+    owners = rng.choices(plan["owner_order"], cum_weights=plan["owner_weights"], k=count)
+    now = datetime.fromisoformat(plan["now"])
+    todos, permissions, keys, tokens = [], [], [], []
+
+    for offset, owner in enumerate(owners):
+        task_id = first_task_id + offset
+        collaborators = set()
+        wanted = min(_geometric(rng, plan["share_mean"]), plan["max_fanout"])
+        for _ in range(wanted * 3):  # a few retries for the owner/duplicates
+            if len(collaborators) >= wanted:
+                break
+            candidate = rng.choices(plan["share_order"], cum_weights=plan["share_weights"])[0]
+            if candidate != owner:
+                collaborators.add(candidate)
+
+        details = _details(rng, plan["words"], rng.randint(plan["details_min"], plan["details_max"]))
+        # same steps as task_manager._prepare_new_task, minus the tokens if unwanted
+        data_key = encryption.generate_data_key()
+        encrypted_details = encryption.encrypt_message(details, data_key)
+        words = blind_index.normalize_words(details) if plan["search_tokens"] else ()
+        grants = [
+            task_manager._prepare_grant(user_id, data_key, words)
+            for user_id in (owner, *sorted(collaborators))
+        ]
+        created = now - timedelta(seconds=rng.randint(0, plan["days"] * 86400))
+        updated = created + timedelta(seconds=rng.randint(0, 7 * 86400))
+        created_at = created.strftime("%Y-%m-%d %H:%M:%S")
+        updated_at = min(updated, now).strftime("%Y-%m-%d %H:%M:%S")
+        todos.append((
+            task_id, f"Task {task_id} for {owner}", encrypted_details, owner, owner,
+            created_at, updated_at, 1 if rng.random() < 1 / 3 else 0,
+        ))
+        for user_id, encrypted_key, user_tokens in grants:
+            permissions.append((user_id, task_id, 1 if plan["search_tokens"] else 0))
+            keys.append((user_id, task_id, encrypted_key, key_manager.key_version_of(encrypted_key)))
+            tokens.extend((user_id, token, task_id) for token in user_tokens)
+    return todos, permissions, keys, tokens
+
+
+def _geometric(rng: random.Random, mean: float) -> int:
+    """Number of failures before a success with p = 1 / (1 + mean): 0, 1, 2 ... with the given mean."""
+    if mean <= 0:
+        return 0
+    p = 1.0 / (1.0 + mean)
+    count = 0
+    while rng.random() > p:
+        count += 1
+    return count
+
+
+def _create_users(conn: sqlite3.Connection, prefix: str, count: int, password: str) -> List[int]:
+    password_hash = user_auth.hash_password(password)
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+        ((f"{prefix}{n}", password_hash) for n in range(count)),
+    )
+    cursor.execute("SELECT user_id FROM users ORDER BY user_id")  # the database is new
+    user_ids = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    return user_ids
+
+
+def _write_chunk(conn: sqlite3.Connection, chunk: tuple) -> None:
+    todos, permissions, keys, tokens = chunk
+    cursor = conn.cursor()
+    cursor.executemany(
+        """
+        INSERT INTO todos (task_id, title, details, created_by, updated_by,
+                           created_at, updated_at, is_complete)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        todos,
+    )
+    cursor.executemany(
+        "INSERT INTO permissions (user_id, task_id, search_indexed) VALUES (?, ?, ?)", permissions
+    )
+    cursor.executemany(
+        "INSERT INTO encryption_keys (user_id, task_id, encrypted_key, key_version) VALUES (?, ?, ?, ?)",
+        keys,
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO task_search_tokens (user_id, token, task_id) VALUES (?, ?, ?)",
+        tokens,
+    )
+    conn.commit()
+
+
+def _finish(conn: sqlite3.Connection) -> None:
+    """Recreate the triggers and rebuild what they would have maintained."""
+    db_setup.initialize_database()
+    cursor = conn.cursor()
+    db_setup.rebuild_user_task_stats(cursor)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todos_fts'")
+    if cursor.fetchone():
+        cursor.execute("INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')")
+    conn.commit()
+    cursor.execute("ANALYZE")
+    conn.commit()
+
+
+def generate(
+    db_path: str,
+    key_file: str,
+    users: int,
+    tasks: int,
+    *,
+    workers: Optional[int] = None,
+    prefix: str = "user",
+    password: str = "password",
+    owner_skew: float = 1.1,
+    share_mean: float = 1.0,
+    share_skew: float = 1.2,
+    max_fanout: int = 20,
+    details_min: int = 800,
+    details_max: int = 1000,
+    days: int = 365,
+    search_tokens: bool = True,
+    seed: int = 0,
+    progress=None,
+) -> dict:
+    """Create the dataset; returns counts and timings."""
+    if Path(db_path).exists():
+        raise FileExistsError(f"{db_path} already exists; pick a new path")
+    db_setup.DATABASE_NAME = db_path
+    os.environ[key_manager.MASTER_KEY_ENV_VAR] = key_file
+    key_manager.reset_master_key_cache()
+    key_manager.get_master_key()  # create it here, before any worker needs it
+    started = time.perf_counter()
+
+    db_setup.initialize_database()
+    conn = db_setup.get_connection()
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MiB
+    conn.execute("PRAGMA temp_store=MEMORY")
+    try:
+        for name, _ in _LOAD_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        user_ids = _create_users(conn, prefix, users, password)
+
+        rng = random.Random(seed)
+        owner_order = rng.sample(user_ids, len(user_ids))  # who is "popular" is random
+        share_order = rng.sample(user_ids, len(user_ids))
+        plan = {
+            "key_file": key_file,
+            "seed": seed,
+            "owner_order": owner_order,
+            "owner_weights": zipf_cum_weights(len(user_ids), owner_skew),
+            "share_order": share_order,
+            "share_weights": zipf_cum_weights(len(user_ids), share_skew),
+            "share_mean": share_mean,
+            "max_fanout": max_fanout,
+            "details_min": details_min,
+            "details_max": min(details_max, 1000),
+            "days": days,
+            "now": datetime.now().replace(microsecond=0).isoformat(),
+            "search_tokens": search_tokens,
+        }
+        jobs = [(1 + start, min(CHUNK_SIZE, tasks - start)) for start in range(0, tasks, CHUNK_SIZE)]
+        counts = {"users": len(user_ids), "tasks": 0, "grants": 0, "search_tokens": 0}
+
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(plan,)) as pool:
+            for chunk in pool.imap(build_chunk, jobs):
+                _write_chunk(conn, chunk)
+                counts["tasks"] += len(chunk[0])
+                counts["grants"] += len(chunk[1])
+                counts["search_tokens"] += len(chunk[3])
+                if progress:
+                    progress(counts, time.perf_counter() - started)
+
+        load_seconds = time.perf_counter() - started
+        _finish(conn)
+    finally:
+        conn.close()
+    counts["load_seconds"] = round(load_seconds, 1)
+    counts["total_seconds"] = round(time.perf_counter() - started, 1)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", required=True, help="new database file to create")
+    parser.add_argument("--key-file", required=True, help="master key file (created if missing)")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=None, help="encryption processes (default: CPUs)")
+    parser.add_argument("--prefix", default="user", help="username prefix")
+    parser.add_argument("--password", default="password", help="password of every user")
+    parser.add_argument("--owner-skew", type=float, default=1.1)
+    parser.add_argument("--share-mean", type=float, default=1.0, help="mean collaborators per task")
+    parser.add_argument("--share-skew", type=float, default=1.2)
+    parser.add_argument("--max-fanout", type=int, default=20)
+    parser.add_argument("--details-min", type=int, default=800)
+    parser.add_argument("--details-max", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--no-search-tokens", action="store_true",
+                        help="skip blind tokens (build them later with reindex_search_tokens)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    def progress(counts, elapsed):
+        print(f"\r{counts['tasks']:,}/{args.tasks:,} tasks  {counts['tasks'] / elapsed:,.0f} tasks/s",
+              end="", file=sys.stderr, flush=True)
+
+    counts = generate(
+        args.db, args.key_file, args.users, args.tasks,
+        workers=args.workers, prefix=args.prefix, password=args.password,
+        owner_skew=args.owner_skew, share_mean=args.share_mean, share_skew=args.share_skew,
+        max_fanout=args.max_fanout, details_min=args.details_min, details_max=args.details_max,
+        days=args.days, search_tokens=not args.no_search_tokens, seed=args.seed,
+        progress=progress,
+    )
+    print(file=sys.stderr)
+    print(", ".join(f"{key}={value:,}" for key, value in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
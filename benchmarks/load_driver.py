@@ -0,0 +1,237 @@
+"""
+Replay a mixed read/write/share workload against a database from several processes.
+
+Point it at a database made by generate_dataset.py (it writes to it, so use
+a copy you can throw away). --processes workers each run for --duration
+seconds, picking a random operation by the --mix weights and a random user
+from an --active-users sample (drawn once, shared by all workers):
+
+  list    task_manager.get_tasks_for_user
+  read    task_manager.read_task of one of the user's own tasks
+  search  task_manager.search_tasks for a word of one of the user's tasks
+  update  task_manager.update_task: new details (half the time) or toggle done
+  create  task_manager.create_encrypted_task shared with 0-2 random users
+  share   task_manager.share_task_with_user to a random user
+
+The JSON report has the overall and per-operation throughput and latency
+percentiles (like bench_suite.py), plus contention: operations that failed
+with "database is locked" or another error, and how much of the write time
+went into waiting for the write lock (time until BEGIN IMMEDIATE
+succeeded on a probe connection, sampled once per write).
+
+Run with:  python benchmarks/load_driver.py --db big.db --key-file big.key
+           [--processes 4] [--duration 30] [--mix list=40,read=20,search=10,update=15,create=5,share=10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+if __package__ in (None, ""):
+    # Allow running this script directly by ensuring project root is importable.
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_suite import summarize
+from core import task_manager
+from crypto import key_manager
+from database import db_setup
+
+DEFAULT_MIX = "list=40,read=20,search=10,update=15,create=5,share=10"
+WRITES = frozenset({"update", "create", "share"})
+TASKS_PER_USER = 50  # own task ids remembered per active user
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation '{name}' (known: {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _use_database(db_path: str, key_file: str) -> None:
+    db_setup.DATABASE_NAME = db_path
+    os.environ[key_manager.MASTER_KEY_ENV_VAR] = key_file
+    key_manager.reset_master_key_cache()
+
+
+def sample_users(count: int, seed: int) -> dict:
+    """{user_id: [own task ids]} for a random sample of users that own tasks."""
+    conn = db_setup.get_connection()
+    try:
+        owners = [row[0] for row in conn.execute("SELECT DISTINCT created_by FROM todos")]
+        chosen = random.Random(seed).sample(owners, min(count, len(owners)))
+        return {
+            user_id: [row[0] for row in conn.execute(
+                "SELECT task_id FROM todos WHERE created_by = ? LIMIT ?", (user_id, TASKS_PER_USER)
+            )]
+            for user_id in chosen
+        }
+    finally:
+        conn.close()
+
+
+# ---------- operations: (rng, user_id, own task ids, all user ids) ----------
+
+def _op_list(rng, user_id, own, users):
+    task_manager.get_tasks_for_user(user_id)
+
+
+def _op_read(rng, user_id, own, users):
+    task_manager.read_task(rng.choice(own), user_id)
+
+
+def _op_search(rng, user_id, own, users):
+    task = task_manager.read_task(rng.choice(own), user_id)
+    words = (task.details if task else "").split()
+    if words:
+        task_manager.search_tasks(user_id, rng.choice(words))
+
+
+def _op_update(rng, user_id, own, users):
+    task_id = rng.choice(own)
+    if rng.random() < 0.5:
+        details = " ".join(rng.choice(("call", "plan", "draft", "review")) for _ in range(150))
+        return task_manager.update_task(task_id, user_id, new_details=details[:1000])
+    return task_manager.update_task(task_id, user_id, is_complete=rng.random() < 0.5)
+
+
+def _op_create(rng, user_id, own, users):
+    shared = rng.sample(users, rng.randint(0, 2))
+    return task_manager.create_encrypted_task("Load test", "x" * rng.randint(100, 1000), user_id, shared)
+
+
+def _op_share(rng, user_id, own, users):
+    return task_manager.share_task_with_user(rng.choice(own), user_id, rng.choice(users))
+
+
+OPERATIONS = {
+    "list": _op_list,
+    "read": _op_read,
+    "search": _op_search,
+    "update": _op_update,
+    "create": _op_create,
+    "share": _op_share,
+}
+
+
+def _lock_wait(db_path: str) -> float:
+    """Seconds until this process could take the write lock (released at once)."""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        waited = time.perf_counter() - start
+        conn.execute("ROLLBACK")
+        return waited
+    finally:
+        conn.close()
+
+
+def run_worker(args: tuple) -> dict:
+    index, db_path, key_file, active, mix, duration, seed = args
+    _use_database(db_path, key_file)
+    rng = random.Random(seed * 7919 + index)
+    active = {int(user_id): tasks for user_id, tasks in active.items()}
+    user_ids = list(active)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Counter = Counter()
+    lock_wait = 0.0
+
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        user_id = rng.choice(user_ids)
+        if name in WRITES:
+            lock_wait += _lock_wait(db_path)
+        start = time.perf_counter()
+        try:
+            OPERATIONS[name](rng, user_id, active[user_id], user_ids)
+        except sqlite3.OperationalError as exc:
+            errors[f"{name}: {exc}"] += 1
+            continue
+        except Exception as exc:
+            errors[f"{name}: {type(exc).__name__}: {exc}"] += 1
+            continue
+        samples[name].append(time.perf_counter() - start)
+    return {"samples": samples, "errors": dict(errors), "lock_wait": lock_wait}
+
+
+def run(db_path: str, key_file: str, processes: int, duration: float, mix: Dict[str, float],
+        active_users: int = 1000, seed: int = 0) -> dict:
+    _use_database(db_path, key_file)
+    active = sample_users(active_users, seed)
+    if not active:
+        raise ValueError(f"{db_path} has no tasks; generate a dataset first")
+
+    jobs = [(n, db_path, key_file, active, mix, duration, seed) for n in range(processes)]
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(run_worker, jobs)
+    elapsed = time.perf_counter() - started
+
+    samples: Dict[str, List[float]] = {name: [] for name in mix}
+    errors: Counter = Counter()
+    for result in results:
+        for name, values in result["samples"].items():
+            samples[name].extend(values)
+        errors.update(result["errors"])
+    write_time = sum(sum(samples[name]) for name in WRITES & set(samples))
+    lock_wait = sum(result["lock_wait"] for result in results)
+    total_ops = sum(len(values) for values in samples.values())
+
+    return {
+        "params": {"processes": processes, "duration": duration, "mix": mix,
+                   "active_users": len(active), "seed": seed},
+        "throughput_ops_per_sec": total_ops / elapsed,
+        "operations": {name: summarize(values) for name, values in samples.items() if values},
+        "contention": {
+            "locked_errors": sum(count for key, count in errors.items() if "locked" in key),
+            "other_errors": sum(count for key, count in errors.items() if "locked" not in key),
+            "lock_wait_seconds": lock_wait,
+            "lock_wait_share_of_writes": lock_wait / (lock_wait + write_time) if write_time else 0.0,
+            "errors": dict(errors.most_common(10)),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--key-file", required=True)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per worker")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight,...")
+    parser.add_argument("--active-users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if not Path(args.db).exists():
+        parser.error(f"{args.db} does not exist")
+    report = run(args.db, args.key_file, args.processes, args.duration, parse_mix(args.mix),
+                 args.active_users, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
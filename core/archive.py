@@ -0,0 +1,242 @@
+"""
+Portable, encrypted backups of one user's tasks.
+
+An archive is a length-prefixed binary stream:
+
+    MAGIC (8 bytes) | header | record | record | ... | end marker
+
+where header and records are uint32 (big-endian) length + compact UTF-8 JSON,
+and the end marker is a zero length, so a truncated archive is detected. The
+header carries the PBKDF2 salt and iteration count for the archive passphrase.
+
+Each record keeps the task's existing details ciphertext byte for byte; only
+its data key is re-wrapped, from the exporting user's key to the archive key
+(and on import from the archive key to the importing user's key). Importing
+decrypts details once to rebuild the blind search tokens, but nothing is
+re-encrypted. Both directions stream, so memory use does not grow with the
+number of tasks, and imports commit every chunk_size tasks.
+
+Shares are not archived: restored tasks belong to the importing user only.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import secrets
+import sqlite3
+import struct
+import time
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterator, Optional
+
+from core import metrics, task_manager
+from crypto import blind_index, encryption, key_manager
+from database.db_setup import get_connection
+from database.models import validate_todo_data
+
+MAGIC = b"PLANITA1"
+LENGTH = struct.Struct(">I")
+MAX_RECORD_BYTES = 16 * 1024 * 1024
+KDF_ITERATIONS = 200_000
+KDF_SALT_BYTES = 16
+IMPORT_CHUNK_SIZE = 500  # tasks per commit
+FETCH_BATCH_SIZE = 500   # rows per fetchmany on export
+
+Progress = Callable[[dict], None]
+
+
+class ArchiveError(ValueError):
+    """The archive is malformed, truncated or the passphrase is wrong."""
+
+
+@metrics.timed("archive.pbkdf2")
+def derive_archive_key(passphrase: str, salt: bytes, iterations: int) -> bytes:
+    if not passphrase:
+        raise ValueError("Archive passphrase cannot be empty")
+    return hashlib.pbkdf2_hmac("sha256", passphrase.encode("utf-8"), salt, iterations)
+
+
+def export_tasks(
+    user_id: int,
+    stream: BinaryIO,
+    passphrase: str,
+    progress: Optional[Progress] = None,
+) -> dict:
+    """
+    Write every task the user can access to a binary stream.
+    Returns throughput stats (tasks, bytes, seconds, tasks_per_sec).
+    """
+    salt = secrets.token_bytes(KDF_SALT_BYTES)
+    iterations = KDF_ITERATIONS
+    archive_key = derive_archive_key(passphrase, salt, iterations)
+    stats = _Stats()
+    stream.write(MAGIC)
+    stats.bytes += len(MAGIC) + _write_record(stream, {
+        "format": 1,
+        "kdf": "pbkdf2_sha256",
+        "iterations": iterations,
+        "salt": salt.hex(),
+    })
+
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            task_manager._TASK_ROWS_SQL + " ORDER BY t.created_at ASC, t.task_id ASC",
+            (user_id,),
+        )
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                data_key = key_manager.decrypt_data_key_for_user(user_id, row["encrypted_key"])
+                stats.bytes += _write_record(stream, {
+                    "title": row["title"],
+                    "details": row["details"],
+                    "key": key_manager.wrap_data_key(archive_key, data_key),
+                    "is_complete": bool(row["is_complete"]),
+                    "created_at": row["created_at"],
+                })
+                stats.tasks += 1
+            if progress:
+                progress(stats.snapshot())
+    finally:
+        conn.close()
+
+    stream.write(LENGTH.pack(0))
+    stats.bytes += LENGTH.size
+    return stats.snapshot()
+
+
+def import_tasks(
+    user_id: int,
+    stream: BinaryIO,
+    passphrase: str,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Optional[Progress] = None,
+) -> dict:
+    """
+    Restore an archive as new tasks owned by user_id, committing every
+    chunk_size tasks. A bad passphrase fails on the first record, before
+    anything is written; a record that fails later discards only its own
+    chunk. Returns the same stats as export_tasks.
+    """
+    stats = _Stats()
+    records = _read_records(stream, stats)
+    header = next(records, None)
+    if not isinstance(header, dict) or header.get("kdf") != "pbkdf2_sha256":
+        raise ArchiveError("Unsupported archive header")
+    try:
+        archive_key = derive_archive_key(
+            passphrase, bytes.fromhex(header["salt"]), int(header["iterations"])
+        )
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ArchiveError(f"Invalid archive header: {exc}") from exc
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        pending = 0
+        for record in records:
+            _validate_record(record, stats.tasks + 1)
+            try:
+                title = record["title"]
+                data_key = key_manager.unwrap_data_key(archive_key, record["key"])
+                words = blind_index.normalize_words(
+                    encryption.decrypt_message(record["details"], data_key)
+                )
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ArchiveError(
+                    f"Record {stats.tasks + 1} cannot be restored (wrong passphrase?): {exc}"
+                ) from exc
+            grant = task_manager._prepare_grant(user_id, data_key, words)
+            task_manager._store_new_task(
+                cursor,
+                title,
+                record["details"],
+                user_id,
+                [grant],
+                bool(record.get("is_complete")),
+                record.get("created_at"),
+            )
+            stats.tasks += 1
+            pending += 1
+            if pending >= chunk_size:
+                conn.commit()
+                pending = 0
+                if progress:
+                    progress(stats.snapshot())
+        conn.commit()
+    finally:
+        conn.close()
+    return stats.snapshot()
+
+
+def _validate_record(record, number: int) -> None:
+    """Check what the schema would reject, so it fails as an ArchiveError."""
+    if not isinstance(record, dict):
+        raise ArchiveError(f"Record {number} is not an object")
+    title = record.get("title")
+    if not isinstance(title, str):
+        raise ArchiveError(f"Record {number} has no title")
+    ok, msg = validate_todo_data(title)
+    if not ok:
+        raise ArchiveError(f"Record {number} is invalid: {msg}")
+    created_at = record.get("created_at")
+    if created_at is not None:
+        try:
+            datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise ArchiveError(f"Record {number} has an invalid created_at: {created_at!r}") from None
+
+
+class _Stats:
+    def __init__(self):
+        self.tasks = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+
+    def snapshot(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "tasks": self.tasks,
+            "bytes": self.bytes,
+            "seconds": round(elapsed, 3),
+            "tasks_per_sec": round(self.tasks / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+def _write_record(stream: BinaryIO, obj) -> int:
+    body = json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    stream.write(LENGTH.pack(len(body)))
+    stream.write(body)
+    return LENGTH.size + len(body)
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ArchiveError("Archive is truncated")
+    return data
+
+
+def _read_records(stream: BinaryIO, stats: _Stats) -> Iterator[dict]:
+    """Yield the header and then each record, up to the end marker."""
+    if _read_exact(stream, len(MAGIC)) != MAGIC:
+        raise ArchiveError("Not a PlanIt archive")
+    stats.bytes += len(MAGIC)
+    while True:
+        (length,) = LENGTH.unpack(_read_exact(stream, LENGTH.size))
+        stats.bytes += LENGTH.size + length
+        if length == 0:
+            return
+        if length > MAX_RECORD_BYTES:
+            raise ArchiveError("Archive record is too large")
+        try:
+            record = json.loads(_read_exact(stream, length).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise ArchiveError("Archive record is not valid JSON") from exc
+        yield record
@@ -0,0 +1,277 @@
+"""
+Asyncio front end for the encrypted task manager.
+
+task_manager is blocking sqlite3 plus CPU-bound crypto, so awaiting it from an
+event loop stalls every other user's request. AsyncTaskManager runs the same
+prepare/store helpers on two worker pools instead:
+
+* a DB executor whose threads each own one SQLite connection, so the pool size
+  bounds the number of open connections, and
+* a crypto executor for key wrapping, AES-GCM and blind-token hashing.
+
+Writes are optimistic: crypto is prepared outside any transaction, then the
+store step re-reads what it was prepared from and retries if another writer
+changed it in between. A semaphore bounds the operations in flight, so callers
+wait instead of queueing unbounded work. Cancelling a call interrupts the SQL
+it is running (sqlite3 interrupt) and never leaves a half-applied write,
+because every write commits in a single store step.
+
+Usage:
+    async with AsyncTaskManager() as manager:
+        ok, msg, task_id = await manager.create_encrypted_task("Title", "notes", user_id)
+
+(or await manager.aclose() when done; close() is the blocking version.)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from core import task_manager
+from database.db_setup import get_connection
+from database.models import Task
+
+DB_POOL_SIZE = 4
+MAX_PENDING = 64
+MAX_WRITE_ATTEMPTS = 3
+DECRYPT_CHUNK = 64  # rows per crypto job when decrypting a task list
+
+
+class _DbJob:
+    """One unit of DB work; remembers its connection so it can be interrupted."""
+
+    def __init__(self, manager: "AsyncTaskManager", func, args, write: bool):
+        self._manager = manager
+        self._func = func
+        self._args = args
+        self._write = write
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cancelled = False
+
+    def run(self):
+        conn = self._manager._thread_connection()
+        with self._lock:
+            if self._cancelled:
+                return None
+            self._conn = conn
+        try:
+            if self._write:
+                # writers are serialized in-process instead of spinning on SQLITE_BUSY
+                with self._manager._write_lock:
+                    return self._run_in_transaction(conn)
+            return self._func(conn.cursor(), *self._args)
+        finally:
+            with self._lock:
+                self._conn = None
+
+    def _run_in_transaction(self, conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            result = self._func(cursor, *self._args)
+            conn.commit()
+            return result
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+
+class AsyncTaskManager:
+    """Async equivalents of the task_manager create/get/update/share/delete calls."""
+
+    def __init__(
+        self,
+        db_pool_size: int = DB_POOL_SIZE,
+        crypto_workers: Optional[int] = None,
+        max_pending: int = MAX_PENDING,
+    ):
+        self._db_executor = ThreadPoolExecutor(
+            max_workers=db_pool_size, thread_name_prefix="planit-db"
+        )
+        self._crypto_executor = ThreadPoolExecutor(
+            max_workers=crypto_workers or os.cpu_count() or 2,
+            thread_name_prefix="planit-crypto",
+        )
+        self._slots = asyncio.Semaphore(max_pending)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+    async def __aenter__(self) -> "AsyncTaskManager":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """close() on a helper thread, so the event loop keeps running meanwhile."""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def close(self) -> None:
+        """Wait for running jobs, then close the pools and their connections (blocking)."""
+        self._crypto_executor.shutdown(wait=True)
+        self._db_executor.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    async def create_encrypted_task(
+        self,
+        title: str,
+        details: Optional[str],
+        created_by: int,
+        shared_with: Optional[Iterable[int]] = None,
+    ) -> Tuple[bool, str, Optional[int]]:
+        title = (title or "").strip()
+        if not title:
+            return False, "Title is required", None
+        user_ids = task_manager._task_user_ids(created_by, shared_with)
+        async with self._slots:
+            encrypted_details, grants = await self._crypto(
+                task_manager._prepare_new_task, details, user_ids
+            )
+            task_id = await self._db(
+                task_manager._store_new_task,
+                title,
+                encrypted_details,
+                created_by,
+                grants,
+                write=True,
+            )
+        return True, "Task created", task_id
+
+    async def get_tasks_for_user(self, user_id: int) -> List[Task]:
+        async with self._slots:
+            rows = await self._db(task_manager._fetch_task_rows, user_id)
+            chunks = [rows[i:i + DECRYPT_CHUNK] for i in range(0, len(rows), DECRYPT_CHUNK)]
+            decrypted = await asyncio.gather(
+                *(self._crypto(_decrypt_rows, user_id, chunk) for chunk in chunks)
+            )
+        return [task for chunk in decrypted for task in chunk]
+
+    async def get_task_stats(self, user_id: int) -> dict:
+        async with self._slots:
+            return await self._db(task_manager._read_task_stats, user_id)
+
+    async def update_task(
+        self,
+        task_id: int,
+        user_id: int,
+        *,
+        new_title: Optional[str] = None,
+        new_details: Optional[str] = None,
+        is_complete: Optional[bool] = None,
+    ) -> Tuple[bool, str]:
+        if new_title is None and new_details is None and is_complete is None:
+            return False, "No updates provided"
+        changes = (new_title, new_details, is_complete)
+        async with self._slots:
+            if new_details is None:
+                # nothing to encrypt, so the whole update is one DB job
+                return await self._db(_update_in_place, task_id, user_id, changes, write=True)
+            for _ in range(MAX_WRITE_ATTEMPTS):
+                source = await self._db(task_manager._load_update_source, user_id, task_id, True)
+                if source is None:
+                    return False, "User does not have access to this task"
+                ok, message, prepared = await self._crypto(
+                    task_manager._prepare_update, user_id, source, *changes
+                )
+                if not ok:
+                    return False, message
+                result = await self._db(
+                    _store_update_if_current, task_id, user_id, source, prepared, write=True
+                )
+                if result is not None:
+                    return result
+        return False, "Task changed concurrently, try again"
+
+    async def share_task_with_user(
+        self, task_id: int, owner_id: int, target_user_id: int
+    ) -> Tuple[bool, str]:
+        async with self._slots:
+            for _ in range(MAX_WRITE_ATTEMPTS):
+                source = await self._db(task_manager._load_access, owner_id, task_id)
+                if source is None:
+                    return False, "Owner does not have access to this task"
+                grant = await self._crypto(
+                    task_manager._prepare_share, owner_id, source, target_user_id
+                )
+                if await self._db(
+                    _store_share_if_current, task_id, owner_id, source, grant, write=True
+                ):
+                    return True, "Task shared"
+        return False, "Task changed concurrently, try again"
+
+    async def delete_task(self, task_id: int, user_id: int) -> Tuple[bool, str]:
+        async with self._slots:
+            return await self._db(task_manager._delete_task, task_id, user_id, write=True)
+
+    async def _crypto(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._crypto_executor, func, *args)
+
+    async def _db(self, func, *args, write: bool = False):
+        job = _DbJob(self, func, args, write)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._db_executor, job.run)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False only so close() can run on the caller's thread
+            conn = get_connection(check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+
+def _decrypt_rows(user_id: int, rows) -> List[Task]:
+    return [task_manager._decrypt_task_row(user_id, row) for row in rows]
+
+
+def _update_in_place(cursor: sqlite3.Cursor, task_id: int, user_id: int, changes) -> Tuple[bool, str]:
+    source = task_manager._load_update_source(cursor, user_id, task_id, False)
+    if source is None:
+        return False, "User does not have access to this task"
+    ok, message, prepared = task_manager._prepare_update(user_id, source, *changes)
+    if not ok:
+        return False, message
+    return task_manager._store_update(cursor, user_id, task_id, prepared)
+
+
+def _store_update_if_current(
+    cursor: sqlite3.Cursor, task_id: int, user_id: int, source, prepared
+) -> Optional[Tuple[bool, str]]:
+    if task_manager._load_update_source(cursor, user_id, task_id, True) != source:
+        return None
+    return task_manager._store_update(cursor, user_id, task_id, prepared)
+
+
+def _store_share_if_current(
+    cursor: sqlite3.Cursor, task_id: int, owner_id: int, source, grant
+) -> bool:
+    if task_manager._load_access(cursor, owner_id, task_id) != source:
+        return False
+    task_manager._store_grant(cursor, task_id, grant)
+    return True
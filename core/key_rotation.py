@@ -0,0 +1,123 @@
+"""
+Master key rotation for wrapped data keys.
+
+After key_manager.create_master_key_version() new data keys are wrapped under
+the new master key, while existing encryption_keys rows keep working under
+the old one (every row records its key_version). rotate_keys() re-wraps the
+old rows in the background:
+
+* rows are walked in key_id order, batch_size at a time, and each batch is
+  committed on its own, so the job can be stopped and simply run again (rows
+  already on the target version are skipped);
+* unwrapping and re-wrapping happen outside any transaction, and each row is
+  written with a compare-and-swap on the old ciphertext, so concurrent shares
+  or rekeys are never overwritten;
+* the job sleeps between batches (pause) to leave the database to live users.
+
+Only the wrapping changes: data keys and task ciphertext are untouched, and
+the change feed ignores version-only key updates. Old master key files can be
+retired once "remaining" reaches 0. Processes that are still running may keep
+wrapping with the old version for up to KEY_VERSION_RECHECK_SECONDS, so run
+the job again after that window.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Optional
+
+from crypto import key_manager
+from database.db_setup import get_connection
+
+BATCH_SIZE = 500
+PAUSE_SECONDS = 0.05
+
+
+def rotate_keys(
+    target_version: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+    pause: float = PAUSE_SECONDS,
+    progress: Optional[Callable[[dict], None]] = None,
+    stop_event: Optional[threading.Event] = None,
+) -> dict:
+    """
+    Re-wrap every data key below target_version (default: the current master
+    key version). Returns stats: target_version, rotated, skipped (changed
+    concurrently), failed (could not be unwrapped), remaining, seconds.
+    """
+    target = target_version or key_manager.current_key_version()
+    stats = {"target_version": target, "rotated": 0, "skipped": 0, "failed": 0}
+    started = time.perf_counter()
+    last_key_id = 0
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        while not (stop_event and stop_event.is_set()):
+            cursor.execute(
+                """
+                SELECT key_id, user_id, encrypted_key
+                FROM encryption_keys
+                WHERE key_id > ? AND key_version < ?
+                ORDER BY key_id
+                LIMIT ?
+                """,
+                (last_key_id, target, batch_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_key_id = rows[-1][0]
+
+            updates = []
+            for key_id, user_id, encrypted_key in rows:
+                try:
+                    data_key = key_manager.decrypt_data_key_for_user(user_id, encrypted_key)
+                except ValueError:
+                    stats["failed"] += 1
+                    continue
+                rewrapped = key_manager.encrypt_data_key_for_user(user_id, data_key, target)
+                updates.append((rewrapped, target, key_id, encrypted_key))
+
+            cursor.executemany(
+                """
+                UPDATE encryption_keys SET encrypted_key = ?, key_version = ?
+                WHERE key_id = ? AND encrypted_key = ?
+                """,
+                updates,
+            )
+            conn.commit()
+            stats["rotated"] += cursor.rowcount
+            stats["skipped"] += len(updates) - cursor.rowcount
+
+            if progress:
+                progress(dict(stats, last_key_id=last_key_id))
+            if pause:
+                if stop_event:
+                    stop_event.wait(pause)
+                else:
+                    time.sleep(pause)
+
+        cursor.execute("SELECT COUNT(*) FROM encryption_keys WHERE key_version < ?", (target,))
+        stats["remaining"] = cursor.fetchone()[0]
+    finally:
+        conn.close()
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+class KeyRotationJob(threading.Thread):
+    """Runs rotate_keys on a daemon thread; stop() ends it after the current batch."""
+
+    def __init__(self, **kwargs):
+        super().__init__(name="planit-key-rotation", daemon=True)
+        self._kwargs = kwargs
+        self._stop_event = threading.Event()
+        self.result: Optional[dict] = None
+
+    def run(self):
+        self.result = rotate_keys(stop_event=self._stop_event, **self._kwargs)
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,292 @@
+"""
+In-process metrics: counters, latency histograms and timers.
+
+Recording is off unless PLANIT_METRICS=1 (or enable() is called); while off,
+every hook is one flag check, so the instrumented hot paths (connection
+checkout, SQL statements, data key unwraps, decrypts, PBKDF2, TaskWindow
+refresh) cost next to nothing.
+
+When on:
+
+* snapshot() returns every counter and, per histogram, count, total and
+  mean/p50/p90/p99/max in milliseconds (percentiles are bucket upper bounds,
+  capped at the max; buckets double from 1 microsecond to ~8 seconds);
+* PLANIT_METRICS_LOG=<seconds> prints summary_line() to stderr at that
+  interval: the histograms with the most total time first, so a slow
+  refresh shows how much of it went to SQL, unwrapping and decrypting;
+* PLANIT_METRICS_PORT=<port> serves the Prometheus text format on
+  http://127.0.0.1:<port>/metrics.
+
+Those two are started by start_from_env(), which the app and the sync server
+call at startup.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+METRICS_ENV_VAR = "PLANIT_METRICS"
+METRICS_LOG_ENV_VAR = "PLANIT_METRICS_LOG"
+METRICS_PORT_ENV_VAR = "PLANIT_METRICS_PORT"
+PROMETHEUS_PREFIX = "planit_"
+
+# upper bounds in seconds: 1 us, 2 us, 4 us ... ~8.4 s, then +Inf
+BUCKETS = tuple(1e-6 * 2 ** n for n in range(24))
+
+_enabled = os.getenv(METRICS_ENV_VAR) == "1"
+_lock = threading.Lock()
+_counters: Dict[str, "Counter"] = {}
+_histograms: Dict[str, "Histogram"] = {}
+
+
+class Counter:
+    __slots__ = ("name", "value")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        with _lock:
+            self.value += amount
+
+
+class Histogram:
+    __slots__ = ("name", "count", "total", "max", "buckets")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with _lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            self.buckets[index] += 1
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound (seconds) of the bucket holding the pct-th percentile, capped at max."""
+        if not self.count:
+            return 0.0
+        wanted = pct / 100 * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= wanted:
+                return min(BUCKETS[index], self.max) if index < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p90_ms": self.percentile(90) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+# ---------- recording ----------
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+def counter(name: str) -> Counter:
+    found = _counters.get(name)
+    if found is None:
+        with _lock:
+            found = _counters.setdefault(name, Counter(name))
+    return found
+
+
+def histogram(name: str) -> Histogram:
+    found = _histograms.get(name)
+    if found is None:
+        with _lock:
+            found = _histograms.setdefault(name, Histogram(name))
+    return found
+
+
+def inc(name: str, amount: int = 1) -> None:
+    if _enabled:
+        counter(name).inc(amount)
+
+
+def observe(name: str, seconds: float) -> None:
+    if _enabled:
+        histogram(name).observe(seconds)
+
+
+def timer(name: str):
+    """Context manager recording its duration in histogram name (no-op when disabled)."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(histogram(name))
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of timer()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram(name).observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+# ---------- reading ----------
+
+def snapshot() -> dict:
+    with _lock:
+        counters = {name: c.value for name, c in _counters.items()}
+        histograms = list(_histograms.values())
+    return {
+        "enabled": _enabled,
+        "counters": dict(sorted(counters.items())),
+        "histograms": {h.name: h.summary() for h in sorted(histograms, key=lambda h: h.name)},
+    }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def summary_line(top: int = 8) -> str:
+    """One line: the histograms with the most total time, then the counters."""
+    histograms = sorted(_histograms.values(), key=lambda h: h.total, reverse=True)
+    parts = [
+        f"{h.name} {h.count}x {h.total * 1000:.1f}ms (p99 {h.percentile(99) * 1000:.2f}ms)"
+        for h in histograms[:top] if h.count
+    ]
+    parts += [f"{c.name}={c.value}" for c in sorted(_counters.values(), key=lambda c: c.name)]
+    return "metrics: " + (" | ".join(parts) if parts else "nothing recorded")
+
+
+def _prometheus_name(name: str) -> str:
+    return PROMETHEUS_PREFIX + "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def render_prometheus() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for c in sorted(_counters.values(), key=lambda c: c.name):
+        metric = _prometheus_name(c.name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {c.value}"]
+    for h in sorted(_histograms.values(), key=lambda h: h.name):
+        metric = _prometheus_name(h.name) + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, h.buckets):
+            cumulative += bucket
+            lines.append(f'{metric}_bucket{{le="{bound:.6g}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {h.count}')
+        lines += [f"{metric}_sum {h.total:.9f}", f"{metric}_count {h.count}"]
+    return "\n".join(lines) + "\n"
+
+
+# ---------- exporters ----------
+
+def start_log_thread(interval: float, stream=None) -> threading.Thread:
+    """Print summary_line() every interval seconds from a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            print(summary_line(), file=stream or sys.stderr, flush=True)
+
+    thread = threading.Thread(target=loop, name="planit-metrics-log", daemon=True)
+    thread.start()
+    return thread
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes would flood stderr
+
+
+def serve_prometheus(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread; returns the server (shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="planit-metrics-http", daemon=True).start()
+    return server
+
+
+def start_from_env() -> Optional[ThreadingHTTPServer]:
+    """Start the log line and/or the Prometheus endpoint if configured (and metrics are on)."""
+    if not _enabled:
+        return None
+    interval = os.getenv(METRICS_LOG_ENV_VAR)
+    if interval:
+        start_log_thread(float(interval))
+    port = os.getenv(METRICS_PORT_ENV_VAR)
+    if port:
+        return serve_prometheus(int(port))
+    return None
@@ -10,11 +10,39 @@ protected at rest in the database.
 
 from __future__ import annotations
 
+import json
+import re
 import sqlite3
-from typing import Iterable, List, Optional, Sequence, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
-from crypto import encryption, key_manager
+from crypto import blind_index, encryption, key_manager
+from database import db_setup
 from database.db_setup import get_connection
+from database.models import Task, User
+
+_TITLE_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_ID_BATCH_SIZE = 500  # task ids per IN (...) clause
+_REKEY_BATCH_SIZE = 200  # tasks per rekey transaction
+# change-feed rows older than this are pruned; a client that has been behind
+# for longer gets reset=True and reloads everything
+CHANGE_RETENTION_DAYS = 7
+
+# the MATERIALIZED hint (SQLite 3.35+) keeps the FTS lookup as the driving table
+_MATERIALIZED = "MATERIALIZED" if sqlite3.sqlite_version_info >= (3, 35) else ""
+_title_index_by_database: dict = {}  # database path -> has todos_fts
+
+_TASK_ROWS_SQL = """
+    SELECT t.task_id, t.title, t.details, t.created_by, t.updated_by,
+           t.created_at, t.updated_at, t.is_complete, ek.encrypted_key
+    FROM todos t
+    JOIN permissions p ON p.task_id = t.task_id
+    JOIN encryption_keys ek
+         ON ek.task_id = t.task_id AND ek.user_id = p.user_id
+    WHERE p.user_id = ?
+"""
 
 
 def create_encrypted_task(
@@ -31,71 +59,172 @@ def create_encrypted_task(
     if not title:
         return False, "Title is required", None
     
-    normalized_shared = _normalize_shared_users(shared_with)
+    user_ids = _task_user_ids(created_by, shared_with)
+    encrypted_details, grants = _prepare_new_task(details, user_ids)
     
-    data_key = encryption.generate_data_key()
-    encrypted_details = encryption.encrypt_message(details, data_key)
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        task_id = _store_new_task(cursor, title, encrypted_details, created_by, grants)
+        conn.commit()
+        return True, "Task created", task_id
+    finally:
+        conn.close()
+
+
+def create_encrypted_tasks(created_by: int, tasks: Iterable[dict]) -> Tuple[bool, str, List[int]]:
+    """
+    Create many tasks in one transaction (bulk imports, scripts).
+    Each item has a title and optional details, shared_with and is_complete.
+    Nothing is written unless every item is valid.
+    """
+    prepared = []
+    for index, task in enumerate(tasks):
+        title = (task.get("title") or "").strip()
+        if not title:
+            return False, f"Title is required (item {index + 1})", []
+        user_ids = _task_user_ids(created_by, task.get("shared_with"))
+        encrypted_details, grants = _prepare_new_task(task.get("details"), user_ids)
+        prepared.append((title, encrypted_details, grants, bool(task.get("is_complete"))))
     
     conn = get_connection()
     cursor = conn.cursor()
     try:
+        task_ids = [
+            _store_new_task(cursor, title, encrypted_details, created_by, grants, is_complete)
+            for title, encrypted_details, grants, is_complete in prepared
+        ]
+        conn.commit()
+        return True, f"{len(task_ids)} tasks created", task_ids
+    finally:
+        conn.close()
+
+
+def get_tasks_for_user(user_id: int) -> List[Task]:
+    """Return decrypted todos the user is authorized to access."""
+    conn = get_connection()
+    conn.row_factory = _task_factory(user_id)
+    tasks = _fetch_task_rows(conn.cursor(), user_id)
+    conn.close()
+    return tasks
+
+
+def iter_tasks_for_user(user_id: int, batch_size: int = _ID_BATCH_SIZE) -> Iterator[Task]:
+    """
+    Like get_tasks_for_user, but decrypts lazily in batches of rows so exports
+    and CLI listings run in constant memory. Close the generator (or exhaust it)
+    to release the connection.
+    """
+    conn = get_connection()
+    conn.row_factory = _task_factory(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(_TASK_ROWS_SQL + " ORDER BY t.created_at ASC, t.task_id ASC", (user_id,))
+        while True:
+            tasks = cursor.fetchmany(batch_size)
+            if not tasks:
+                return
+            yield from tasks
+    finally:
+        conn.close()
+
+
+def get_change_version() -> int:
+    """Return the current change-feed watermark (0 when nothing has changed yet)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(change_id), 0) FROM task_changes")
+    version = cursor.fetchone()[0]
+    conn.close()
+    return version
+
+
+def get_task_changes(user_id: int, since_version: int) -> dict:
+    """
+    Return what changed for the user after since_version.
+    The result holds the new "version" watermark, decrypted "inserted" and
+    "updated" todos, and "deleted" task ids (tasks that are gone or no longer
+    accessible). "reset" is True when the log was pruned past since_version;
+    the caller must then reload everything with get_tasks_for_user.
+    """
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        # one read transaction so the log and the task rows agree
+        cursor.execute("BEGIN")
+        if since_version < _get_pruned_version(cursor):
+            return {"version": since_version, "reset": True,
+                    "inserted": [], "updated": [], "deleted": []}
+        
         cursor.execute(
             """
-            INSERT INTO todos (title, details, created_by, updated_by)
-            VALUES (?, ?, ?, ?)
+            SELECT task_id, MAX(change_id) AS last_change, MAX(op = 'insert') AS granted
+            FROM task_changes
+            WHERE user_id = ? AND change_id > ?
+            GROUP BY task_id
             """,
-            (title, encrypted_details, created_by, created_by),
+            (user_id, since_version),
         )
-        task_id = cursor.lastrowid
-        _grant_user_access(cursor, created_by, task_id, data_key)
-        for user_id in normalized_shared:
-            if user_id == created_by:
-                continue
-            _grant_user_access(cursor, user_id, task_id, data_key)
+        changes = cursor.fetchall()
+        version = max((row["last_change"] for row in changes), default=since_version)
+        granted = {row["task_id"] for row in changes if row["granted"]}
+        rows = _fetch_task_rows(cursor, user_id, [row["task_id"] for row in changes]) if changes else []
+        conn.rollback()
+    finally:
+        conn.close()
+    
+    inserted, updated = [], []
+    for row in rows:
+        task = _decrypt_task_row(user_id, row)
+        (inserted if task["task_id"] in granted else updated).append(task)
+    visible = {row["task_id"] for row in rows}
+    deleted = sorted(row["task_id"] for row in changes if row["task_id"] not in visible)
+    return {
+        "version": version,
+        "reset": False,
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+    }
+
+
+def prune_task_changes(before_version: int) -> int:
+    """Drop change-feed rows up to and including before_version. Returns rows removed."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM task_changes WHERE change_id <= ?", (before_version,))
         conn.commit()
-        return True, "Task created", task_id
+        return cursor.rowcount
     finally:
         conn.close()
 
 
-def get_tasks_for_user(user_id: int) -> List[dict]:
-    """Return decrypted todos the user is authorized to access."""
+def prune_expired_task_changes(retention_days: float = CHANGE_RETENTION_DAYS) -> int:
+    """Drop change-feed rows older than retention_days. Returns rows removed."""
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     cursor.execute(
-        """
-        SELECT t.task_id, t.title, t.details, t.created_by, t.updated_by,
-               t.created_at, t.updated_at, t.is_complete, ek.encrypted_key
-        FROM todos t
-        JOIN permissions p ON p.task_id = t.task_id
-        JOIN encryption_keys ek
-             ON ek.task_id = t.task_id AND ek.user_id = p.user_id
-        WHERE p.user_id = ?
-        ORDER BY t.created_at ASC
-        """,
-        (user_id,),
+        "SELECT MAX(change_id) FROM task_changes WHERE changed_at < datetime('now', ?)",
+        (f"-{retention_days} days",),
     )
-    rows = cursor.fetchall()
+    cutoff = cursor.fetchone()[0]
     conn.close()
-    
-    todos = []
-    for row in rows:
-        data_key = key_manager.decrypt_data_key_for_user(user_id, row["encrypted_key"])
-        decrypted_details = encryption.decrypt_message(row["details"], data_key)
-        todos.append(
-            {
-                "task_id": row["task_id"],
-                "title": row["title"],
-                "details": decrypted_details,
-                "created_by": row["created_by"],
-                "updated_by": row["updated_by"],
-                "created_at": row["created_at"],
-                "updated_at": row["updated_at"],
-                "is_complete": bool(row["is_complete"]),
-            }
-        )
-    return todos
+    return prune_task_changes(cutoff) if cutoff is not None else 0
+
+
+def get_task_stats(user_id: int) -> dict:
+    """
+    Return the user's task counters (total, completed, pending, shared_with_me,
+    shared_by_me). They are maintained by triggers in user_task_stats, so the
+    dashboard can be drawn without loading or decrypting any task.
+    """
+    conn = get_connection()
+    try:
+        return _read_task_stats(conn.cursor(), user_id)
+    finally:
+        conn.close()
 
 
 def share_task_with_user(task_id: int, owner_id: int, target_user_id: int) -> Tuple[bool, str]:
@@ -106,17 +235,77 @@ def share_task_with_user(task_id: int, owner_id: int, target_user_id: int) -> Tu
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        data_key = _get_data_key_for_user(cursor, owner_id, task_id)
-        if data_key is None:
+        # the wrapped key we copy must still be current when we store it (rekey_tasks)
+        cursor.execute("BEGIN IMMEDIATE")
+        source = _load_access(cursor, owner_id, task_id)
+        if source is None:
             return False, "Owner does not have access to this task"
         
-        _grant_user_access(cursor, target_user_id, task_id, data_key)
+        _store_grant(cursor, task_id, _prepare_share(owner_id, source, target_user_id))
         conn.commit()
         return True, "Task shared"
     finally:
         conn.close()
 
 
+def get_task_shares(task_id: int) -> List[dict]:
+    """Return the users (user_id, username) who can access the task."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT u.user_id, u.username
+        FROM permissions p
+        JOIN users u ON u.user_id = p.user_id
+        WHERE p.task_id = ?
+        ORDER BY u.username ASC
+        """,
+        (task_id,),
+    )
+    rows = cursor.fetchall()
+    conn.close()
+    return [{"user_id": user_id, "username": username} for user_id, username in rows]
+
+
+def get_shares_for_tasks(task_ids: Iterable[int]) -> dict:
+    """Like get_task_shares for many tasks at once: {task_id: [{user_id, username}, ...]}."""
+    task_ids = list(task_ids)
+    shares = {task_id: [] for task_id in task_ids}
+    conn = get_connection()
+    cursor = conn.cursor()
+    for start in range(0, len(task_ids), _ID_BATCH_SIZE):
+        batch = task_ids[start:start + _ID_BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in batch)
+        cursor.execute(
+            f"""
+            SELECT p.task_id, u.user_id, u.username
+            FROM permissions p
+            JOIN users u ON u.user_id = p.user_id
+            WHERE p.task_id IN ({placeholders})
+            ORDER BY u.username ASC
+            """,
+            batch,
+        )
+        for task_id, user_id, username in cursor.fetchall():
+            shares[task_id].append({"user_id": user_id, "username": username})
+    conn.close()
+    return shares
+
+
+def find_user(username: str) -> Optional[dict]:
+    """Look up a user by (case-insensitive) username, without the password hash."""
+    user = User.get_by_username((username or "").strip().lower())
+    if not user:
+        return None
+    return {"user_id": user["user_id"], "username": user["username"]}
+
+
+def get_username(user_id: int) -> Optional[str]:
+    """Return the username for user_id, or None if there is no such user."""
+    user = User.get_by_id(user_id)
+    return user["username"] if user else None
+
+
 def update_task(
     task_id: int,
     user_id: int,
@@ -129,83 +318,303 @@ def update_task(
     if new_title is None and new_details is None and is_complete is None:
         return False, "No updates provided"
     
-    updates = []
-    params: List[object] = []
-    
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        data_key = _get_data_key_for_user(cursor, user_id, task_id)
-        if data_key is None:
-            return False, "User does not have access to this task"
-        
-        if new_title is not None:
-            title = new_title.strip()
-            if not title:
-                return False, "Title cannot be empty"
-            updates.append("title = ?")
-            params.append(title)
-        
         if new_details is not None:
-            encrypted_details = encryption.encrypt_message(new_details, data_key)
-            updates.append("details = ?")
-            params.append(encrypted_details)
-        
-        if is_complete is not None:
-            updates.append("is_complete = ?")
-            params.append(1 if is_complete else 0)
-        
-        if not updates:
-            return False, "No updates provided"
+            # new details are encrypted with the key we load; rekey_tasks must not swap it meanwhile
+            cursor.execute("BEGIN IMMEDIATE")
+        source = _load_update_source(cursor, user_id, task_id, new_details is not None)
+        if source is None:
+            return False, "User does not have access to this task"
         
-        updates.append("updated_by = ?")
-        params.append(user_id)
-        set_clause = ", ".join(updates + ["updated_at = CURRENT_TIMESTAMP"])
-        cursor.execute(
-            f"UPDATE todos SET {set_clause} WHERE task_id = ?",
-            (*params, task_id),
+        ok, message, prepared = _prepare_update(
+            user_id, source, new_title, new_details, is_complete
         )
-        conn.commit()
-        if cursor.rowcount == 0:
-            return False, "Task not found"
-        return True, "Task updated"
+        if not ok:
+            return False, message
+        
+        ok, message = _store_update(cursor, user_id, task_id, prepared)
+        if ok:
+            conn.commit()
+        return ok, message
     finally:
         conn.close()
 
 
-def read_task(task_id: int, user_id: int) -> Optional[dict]:
+def read_task(task_id: int, user_id: int) -> Optional[Task]:
     """Fetch and decrypt a single todo for the specified user."""
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
+    conn.row_factory = _task_factory(user_id)
+    cursor = conn.cursor()
+    cursor.execute(_TASK_ROWS_SQL + " AND t.task_id = ?", (user_id, task_id))
+    task = cursor.fetchone()
+    conn.close()
+    return task
+
+
+def search_titles(user_id: int, query: str, limit: Optional[int] = 20) -> List[dict]:
+    """
+    Prefix-search the titles of the user's tasks, best matches first.
+    Every word in query must match the start of a title word ("gro mil" finds
+    "Groceries: milk"). Uses the todos_fts index; limit=None returns all hits.
+    """
+    words = _TITLE_WORD_RE.findall(query or "")
+    if not words:
+        return []
+    limit = -1 if limit is None else int(limit)
+    
+    # each word becomes a quoted FTS5 string (quotes doubled) with a prefix star
+    match = " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        if _has_title_index(cursor):
+            cursor.execute(
+                f"""
+                WITH hits AS {_MATERIALIZED} (
+                    SELECT rowid AS task_id, rank FROM todos_fts WHERE todos_fts MATCH ?
+                )
+                SELECT t.task_id, t.title, t.is_complete
+                FROM hits h
+                JOIN permissions p ON p.task_id = h.task_id AND p.user_id = ?
+                JOIN todos t ON t.task_id = h.task_id
+                ORDER BY h.rank
+                LIMIT ?
+                """,
+                (match, user_id, limit),
+            )
+        else:
+            # no FTS5 in this SQLite build; fall back to a substring scan
+            like_clauses = " AND ".join("t.title LIKE ?" for _ in words)
+            cursor.execute(
+                f"""
+                SELECT t.task_id, t.title, t.is_complete
+                FROM permissions p
+                JOIN todos t ON t.task_id = p.task_id
+                WHERE p.user_id = ? AND {like_clauses}
+                ORDER BY t.created_at ASC
+                LIMIT ?
+                """,
+                (user_id, *(f"%{word}%" for word in words), limit),
+            )
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    return [
+        {"task_id": task_id, "title": title, "is_complete": bool(is_complete)}
+        for task_id, title, is_complete in rows
+    ]
+
+
+def search_task_ids(user_id: int, query: str) -> List[int]:
+    """
+    Return ids of the user's tasks whose details contain every word of query.
+    Matching happens on blind tokens through the (user_id, token) index, so
+    nothing is decrypted.
+    """
+    words = blind_index.normalize_words(query)
+    if not words:
+        return []
+    tokens = blind_index.blind_tokens(user_id, words)
+    placeholders = ", ".join("?" for _ in tokens)
+    
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        """
-        SELECT t.*, ek.encrypted_key
-        FROM todos t
-        JOIN permissions p ON p.task_id = t.task_id
-        JOIN encryption_keys ek
-             ON ek.task_id = t.task_id AND ek.user_id = p.user_id
-        WHERE t.task_id = ? AND p.user_id = ?
+        f"""
+        SELECT task_id
+        FROM task_search_tokens
+        WHERE user_id = ? AND token IN ({placeholders})
+        GROUP BY task_id
+        HAVING COUNT(*) = ?
+        ORDER BY task_id ASC
         """,
-        (task_id, user_id),
+        (user_id, *tokens, len(tokens)),
     )
-    row = cursor.fetchone()
+    task_ids = [row[0] for row in cursor.fetchall()]
     conn.close()
-    if not row:
-        return None
+    return task_ids
+
+
+def search_tasks(user_id: int, query: str) -> List[Task]:
+    """Return decrypted todos matching query, decrypting only the hits."""
+    task_ids = search_task_ids(user_id, query)
+    if not task_ids:
+        return []
+    conn = get_connection()
+    conn.row_factory = _task_factory(user_id)
+    tasks = _fetch_task_rows(conn.cursor(), user_id, task_ids)
+    conn.close()
+    return tasks
+
+
+def reindex_search_tokens(user_id: int, batch_size: int = _REKEY_BATCH_SIZE) -> int:
+    """
+    Build blind tokens for the user's tasks not indexed yet (e.g. tasks created
+    before the search index existed). Tasks whose details cannot be decrypted
+    are skipped and stay unindexed. Returns the number of tasks indexed.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT t.task_id, t.details, ek.encrypted_key
+            FROM todos t
+            JOIN permissions p ON p.task_id = t.task_id
+            JOIN encryption_keys ek
+                 ON ek.task_id = t.task_id AND ek.user_id = p.user_id
+            WHERE p.user_id = ? AND p.search_indexed = 0
+            """,
+            (user_id,),
+        )
+        rows = cursor.fetchall()
+        indexed = 0
+        for start in range(0, len(rows), batch_size):
+            # decrypt outside the write transaction, then write the batch at once
+            tokens_by_task = {}
+            for task_id, details, encrypted_key in rows[start:start + batch_size]:
+                try:
+                    data_key = key_manager.decrypt_data_key_for_user(user_id, encrypted_key)
+                    plaintext = encryption.decrypt_message(details, data_key)
+                except ValueError:
+                    continue
+                tokens_by_task[task_id] = blind_index.blind_tokens(
+                    user_id, blind_index.normalize_words(plaintext)
+                )
+            for task_id, tokens in tokens_by_task.items():
+                _store_tokens(cursor, user_id, task_id, tokens)
+                _mark_indexed(cursor, user_id, task_id)
+            conn.commit()
+            indexed += len(tokens_by_task)
+        return indexed
+    finally:
+        conn.close()
+
+
+def start_search_backfill(user_id: int) -> threading.Thread:
+    """Run reindex_search_tokens for a user who just logged in, off the caller's thread."""
+    thread = threading.Thread(
+        target=reindex_search_tokens, args=(user_id,), name="planit-search-backfill", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def rekey_tasks(
+    task_ids: Iterable[int],
+    batch_size: int = _REKEY_BATCH_SIZE,
+    max_workers: Optional[int] = None,
+) -> dict:
+    """
+    Give each task a fresh data key: details are re-encrypted and the new key is
+    wrapped for every user who still has permission (stale key rows of revoked
+    users are dropped). Crypto runs on a thread pool outside any transaction;
+    each batch is then committed atomically, skipping tasks whose details or
+    collaborators changed in the meantime (they are retried once).
+    Returns {"rekeyed": int, "skipped": [task_id, ...], "missing": [task_id, ...]}.
+    """
+    pending = list(dict.fromkeys(int(task_id) for task_id in task_ids))
+    result = {"rekeyed": 0, "skipped": [], "missing": []}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for attempt in range(2):
+            skipped = []
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                sources = _load_rekey_sources(batch)
+                result["missing"].extend(task_id for task_id in batch if task_id not in sources)
+                prepared = list(pool.map(_prepare_rekey, sources.values()))
+                rekeyed, conflicts = _store_rekeyed(prepared)
+                result["rekeyed"] += rekeyed
+                skipped.extend(conflicts)
+            pending = skipped
+            if not pending:
+                break
+    result["skipped"] = pending
+    return result
+
+
+def revoke_access(
+    task_id: Union[int, Iterable[int]],
+    owner_id: int,
+    user_ids: Iterable[int],
+    *,
+    rekey: bool = False,
+) -> Tuple[bool, str]:
+    """
+    Remove user_ids' access to a task, or to every task in an iterable of ids,
+    all created by owner_id. Permissions, wrapped keys and blind tokens go in
+    one set-based transaction, whatever the number of tasks and users.
     
-    data_key = key_manager.decrypt_data_key_for_user(user_id, row["encrypted_key"])
-    decrypted_details = encryption.decrypt_message(row["details"], data_key)
-    return {
-        "task_id": row["task_id"],
-        "title": row["title"],
-        "details": decrypted_details,
-        "created_by": row["created_by"],
-        "updated_by": row["updated_by"],
-        "created_at": row["created_at"],
-        "updated_at": row["updated_at"],
-        "is_complete": bool(row["is_complete"]),
-    }
+    Revoked users may have kept the old data key, so rekey=True queues the
+    tasks in pending_rekeys; rekey_pending_tasks() rotates them later.
+    """
+    task_ids = [int(task_id)] if isinstance(task_id, int) else list(dict.fromkeys(map(int, task_id)))
+    revoked = [user_id for user_id in _normalize_shared_users(user_ids) if user_id != owner_id]
+    if not task_ids or not revoked:
+        return False, "No users to revoke"
+    tasks_json = json.dumps(task_ids)
+    users_json = json.dumps(revoked)
+    selection = """
+        task_id IN (SELECT value FROM json_each(?))
+        AND user_id IN (SELECT value FROM json_each(?))
+    """
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            """
+            SELECT COUNT(*) FROM todos
+            WHERE task_id IN (SELECT value FROM json_each(?)) AND created_by = ?
+            """,
+            (tasks_json, owner_id),
+        )
+        if cursor.fetchone()[0] != len(task_ids):
+            return False, "Only the creator can revoke access"
+        
+        if rekey:
+            cursor.execute(
+                f"""
+                INSERT OR IGNORE INTO pending_rekeys (task_id)
+                SELECT DISTINCT task_id FROM encryption_keys WHERE {selection}
+                """,
+                (tasks_json, users_json),
+            )
+        cursor.execute(f"DELETE FROM permissions WHERE {selection}", (tasks_json, users_json))
+        removed = cursor.rowcount
+        cursor.execute(f"DELETE FROM encryption_keys WHERE {selection}", (tasks_json, users_json))
+        conn.commit()
+        return True, f"Access revoked ({removed} grants removed)"
+    finally:
+        conn.close()
+
+
+def rekey_pending_tasks(limit: Optional[int] = None) -> dict:
+    """
+    Rekey tasks queued by revoke_access(rekey=True), oldest first. Tasks that
+    conflicted with concurrent edits stay queued. Returns the rekey_tasks
+    result plus the number still pending.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT task_id FROM pending_rekeys ORDER BY requested_at, task_id LIMIT ?",
+            (-1 if limit is None else limit,),
+        )
+        task_ids = [task_id for (task_id,) in cursor.fetchall()]
+        result = rekey_tasks(task_ids)
+        done = set(task_ids) - set(result["skipped"])
+        cursor.executemany("DELETE FROM pending_rekeys WHERE task_id = ?", [(t,) for t in done])
+        conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM pending_rekeys")
+        result["pending"] = cursor.fetchone()[0]
+        return result
+    finally:
+        conn.close()
 
 
 def delete_task(task_id: int, user_id: int) -> Tuple[bool, str]:
@@ -213,19 +622,10 @@ def delete_task(task_id: int, user_id: int) -> Tuple[bool, str]:
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT created_by FROM todos WHERE task_id = ?", (task_id,))
-        row = cursor.fetchone()
-        if not row:
-            return False, "Task not found"
-        created_by = row[0]
-        if created_by != user_id:
-            return False, "Only the creator can delete this task"
-
-        cursor.execute("DELETE FROM encryption_keys WHERE task_id = ?", (task_id,))
-        cursor.execute("DELETE FROM permissions WHERE task_id = ?", (task_id,))
-        cursor.execute("DELETE FROM todos WHERE task_id = ?", (task_id,))
-        conn.commit()
-        return True, "Task deleted"
+        ok, message = _delete_task(cursor, task_id, user_id)
+        if ok:
+            conn.commit()
+        return ok, message
     finally:
         conn.close()
 
@@ -246,23 +646,94 @@ def _normalize_shared_users(shared_with: Optional[Iterable[int]]) -> Sequence[in
     return unique_ids
 
 
-def _grant_user_access(cursor: sqlite3.Cursor, user_id: int, task_id: int, data_key: bytes) -> None:
-    cursor.execute(
-        "INSERT OR IGNORE INTO permissions (user_id, task_id) VALUES (?, ?)",
-        (user_id, task_id),
-    )
+def _task_user_ids(created_by: int, shared_with: Optional[Iterable[int]]) -> List[int]:
+    return [created_by] + [
+        user_id for user_id in _normalize_shared_users(shared_with) if user_id != created_by
+    ]
+
+
+# Write paths are split into a crypto-only "prepare" step and a cursor-only
+# "store" step so the async manager can run them on separate worker pools.
+# The sync functions above simply call one after the other.
+
+Grant = Tuple[int, str, List[str]]  # (user_id, wrapped data key, blind tokens)
+
+
+def _prepare_grant(user_id: int, data_key: bytes, words) -> Grant:
     encrypted_key = key_manager.encrypt_data_key_for_user(user_id, data_key)
+    tokens = blind_index.blind_tokens(user_id, words) if words else []
+    return user_id, encrypted_key, tokens
+
+
+def _prepare_new_task(details: Optional[str], user_ids: Sequence[int]) -> Tuple[str, List[Grant]]:
+    data_key = encryption.generate_data_key()
+    encrypted_details = encryption.encrypt_message(details, data_key)
+    words = blind_index.normalize_words(details)
+    return encrypted_details, [_prepare_grant(user_id, data_key, words) for user_id in user_ids]
+
+
+def _prepare_share(owner_id: int, source: Tuple[str, str], target_user_id: int) -> Grant:
+    encrypted_key, encrypted_details = source
+    data_key = key_manager.decrypt_data_key_for_user(owner_id, encrypted_key)
+    words = blind_index.normalize_words(encryption.decrypt_message(encrypted_details, data_key))
+    return _prepare_grant(target_user_id, data_key, words)
+
+
+def _prepare_update(
+    user_id: int,
+    source: Tuple[str, Tuple[int, ...]],
+    new_title: Optional[str],
+    new_details: Optional[str],
+    is_complete: Optional[bool],
+) -> Tuple[bool, str, Optional[tuple]]:
+    """Validate and encrypt an update; returns (ok, msg, (assignments, tokens_by_user))."""
+    encrypted_key, permitted_ids = source
+    assignments: List[Tuple[str, object]] = []
+    tokens_by_user = None
+    
+    if new_title is not None:
+        title = new_title.strip()
+        if not title:
+            return False, "Title cannot be empty", None
+        assignments.append(("title", title))
+    
+    if new_details is not None:
+        data_key = key_manager.decrypt_data_key_for_user(user_id, encrypted_key)
+        assignments.append(("details", encryption.encrypt_message(new_details, data_key)))
+        # details changed, so the blind tokens must be re-derived for everyone
+        words = blind_index.normalize_words(new_details)
+        tokens_by_user = {
+            permitted_id: blind_index.blind_tokens(permitted_id, words) if words else []
+            for permitted_id in permitted_ids
+        }
+    
+    if is_complete is not None:
+        assignments.append(("is_complete", 1 if is_complete else 0))
+    
+    if not assignments:
+        return False, "No updates provided", None
+    return True, "", (assignments, tokens_by_user)
+
+
+def _load_access(cursor: sqlite3.Cursor, user_id: int, task_id: int) -> Optional[Tuple[str, str]]:
+    """(wrapped data key, encrypted details) if the user can read the task."""
     cursor.execute(
         """
-        INSERT INTO encryption_keys (user_id, task_id, encrypted_key)
-        VALUES (?, ?, ?)
-        ON CONFLICT(user_id, task_id) DO UPDATE SET encrypted_key = excluded.encrypted_key
+        SELECT ek.encrypted_key, t.details
+        FROM encryption_keys ek
+        JOIN todos t ON t.task_id = ek.task_id
+        WHERE ek.user_id = ? AND ek.task_id = ?
         """,
-        (user_id, task_id, encrypted_key),
+        (user_id, task_id),
     )
+    row = cursor.fetchone()
+    return tuple(row) if row else None
 
 
-def _get_data_key_for_user(cursor: sqlite3.Cursor, user_id: int, task_id: int) -> Optional[bytes]:
+def _load_update_source(
+    cursor: sqlite3.Cursor, user_id: int, task_id: int, with_users: bool
+) -> Optional[Tuple[str, Tuple[int, ...]]]:
+    """(wrapped data key, permitted user ids) for an update, or None without access."""
     cursor.execute(
         "SELECT encrypted_key FROM encryption_keys WHERE user_id = ? AND task_id = ?",
         (user_id, task_id),
@@ -270,4 +741,291 @@ def _get_data_key_for_user(cursor: sqlite3.Cursor, user_id: int, task_id: int) -
     row = cursor.fetchone()
     if not row:
         return None
-    return key_manager.decrypt_data_key_for_user(user_id, row[0])
+    if not with_users:
+        return row[0], ()
+    cursor.execute(
+        "SELECT user_id FROM permissions WHERE task_id = ? ORDER BY user_id", (task_id,)
+    )
+    return row[0], tuple(user for (user,) in cursor.fetchall())
+
+
+def _store_new_task(
+    cursor: sqlite3.Cursor,
+    title: str,
+    encrypted_details: str,
+    created_by: int,
+    grants: Sequence[Grant],
+    is_complete: bool = False,
+    created_at: Optional[str] = None,
+) -> int:
+    cursor.execute(
+        """
+        INSERT INTO todos (title, details, created_by, updated_by, is_complete, created_at)
+        VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        """,
+        (title, encrypted_details, created_by, created_by, 1 if is_complete else 0, created_at),
+    )
+    task_id = cursor.lastrowid
+    for grant in grants:
+        _store_grant(cursor, task_id, grant)
+    return task_id
+
+
+def _store_grant(cursor: sqlite3.Cursor, task_id: int, grant: Grant) -> None:
+    user_id, encrypted_key, tokens = grant
+    cursor.execute(
+        """
+        INSERT INTO permissions (user_id, task_id, search_indexed) VALUES (?, ?, 1)
+        ON CONFLICT(user_id, task_id) DO UPDATE SET search_indexed = 1
+        """,
+        (user_id, task_id),
+    )
+    _store_wrapped_key(cursor, user_id, task_id, encrypted_key)
+    _store_tokens(cursor, user_id, task_id, tokens)
+
+
+def _store_wrapped_key(cursor: sqlite3.Cursor, user_id: int, task_id: int, encrypted_key: str) -> None:
+    cursor.execute(
+        """
+        INSERT INTO encryption_keys (user_id, task_id, encrypted_key, key_version)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(user_id, task_id) DO UPDATE SET
+            encrypted_key = excluded.encrypted_key,
+            key_version = excluded.key_version
+        """,
+        (user_id, task_id, encrypted_key, key_manager.key_version_of(encrypted_key)),
+    )
+
+
+def _store_update(
+    cursor: sqlite3.Cursor, user_id: int, task_id: int, prepared: tuple
+) -> Tuple[bool, str]:
+    assignments, tokens_by_user = prepared
+    columns = [f"{column} = ?" for column, _ in assignments] + ["updated_by = ?"]
+    params = [value for _, value in assignments] + [user_id]
+    set_clause = ", ".join(columns + ["updated_at = CURRENT_TIMESTAMP"])
+    cursor.execute(
+        f"UPDATE todos SET {set_clause} WHERE task_id = ?",
+        (*params, task_id),
+    )
+    if cursor.rowcount == 0:
+        return False, "Task not found"
+    if tokens_by_user is not None:
+        _reindex_task(cursor, task_id, tokens_by_user)
+    return True, "Task updated"
+
+
+def _delete_task(cursor: sqlite3.Cursor, task_id: int, user_id: int) -> Tuple[bool, str]:
+    cursor.execute("SELECT created_by FROM todos WHERE task_id = ?", (task_id,))
+    row = cursor.fetchone()
+    if not row:
+        return False, "Task not found"
+    created_by = row[0]
+    if created_by != user_id:
+        return False, "Only the creator can delete this task"
+    
+    cursor.execute("DELETE FROM encryption_keys WHERE task_id = ?", (task_id,))
+    cursor.execute("DELETE FROM permissions WHERE task_id = ?", (task_id,))
+    cursor.execute("DELETE FROM todos WHERE task_id = ?", (task_id,))
+    return True, "Task deleted"
+
+
+def _read_task_stats(cursor: sqlite3.Cursor, user_id: int) -> dict:
+    cursor.execute(
+        """
+        SELECT total, completed, shared_with_me, shared_by_me
+        FROM user_task_stats
+        WHERE user_id = ?
+        """,
+        (user_id,),
+    )
+    row = cursor.fetchone()
+    total, completed, shared_with_me, shared_by_me = row or (0, 0, 0, 0)
+    return {
+        "total": total,
+        "completed": completed,
+        "pending": total - completed,
+        "shared_with_me": shared_with_me,
+        "shared_by_me": shared_by_me,
+    }
+
+
+def _fetch_task_rows(
+    cursor: sqlite3.Cursor,
+    user_id: int,
+    task_ids: Optional[Sequence[int]] = None,
+) -> list:
+    """
+    Rows of _TASK_ROWS_SQL for all or some accessible todos, built by the
+    cursor's row_factory (sqlite3.Row, or Tasks via _task_factory).
+    """
+    query = _TASK_ROWS_SQL
+    if task_ids is None:
+        cursor.execute(query + " ORDER BY t.created_at ASC", (user_id,))
+        return cursor.fetchall()
+    
+    rows: list = []
+    task_ids = list(task_ids)
+    for start in range(0, len(task_ids), _ID_BATCH_SIZE):
+        batch = task_ids[start:start + _ID_BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in batch)
+        cursor.execute(f"{query} AND t.task_id IN ({placeholders})", (user_id, *batch))
+        rows.extend(cursor.fetchall())
+    rows.sort(key=itemgetter("created_at", "task_id"))
+    return rows
+
+
+def _get_pruned_version(cursor: sqlite3.Cursor) -> int:
+    """Highest change_id that prune_task_changes has already removed."""
+    cursor.execute("SELECT MIN(change_id) FROM task_changes")
+    oldest = cursor.fetchone()[0]
+    if oldest is not None:
+        return oldest - 1
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'task_changes'")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def _has_title_index(cursor: sqlite3.Cursor) -> bool:
+    """Whether this database has todos_fts (initialize_database skips it without FTS5)."""
+    database = db_setup.DATABASE_NAME
+    found = _title_index_by_database.get(database)
+    if found is None:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todos_fts'")
+        found = _title_index_by_database[database] = cursor.fetchone() is not None
+    return found
+
+
+def _decrypt_task_row(user_id: int, row: Sequence) -> Task:
+    """Build a Task from a _TASK_ROWS_SQL row (tuple or sqlite3.Row)."""
+    (task_id, title, details, created_by, updated_by,
+     created_at, updated_at, is_complete, encrypted_key) = row
+    data_key = key_manager.decrypt_data_key_for_user(user_id, encrypted_key)
+    return Task(
+        task_id,
+        title,
+        encryption.decrypt_message(details, data_key),
+        created_by,
+        updated_by,
+        created_at,
+        updated_at,
+        bool(is_complete),
+    )
+
+
+def _task_factory(user_id: int):
+    """row_factory that decrypts _TASK_ROWS_SQL rows straight into Tasks."""
+    return lambda cursor, row: _decrypt_task_row(user_id, row)
+
+
+def _store_tokens(cursor: sqlite3.Cursor, user_id: int, task_id: int, tokens) -> None:
+    if not tokens:
+        return
+    cursor.executemany(
+        "INSERT OR IGNORE INTO task_search_tokens (user_id, token, task_id) VALUES (?, ?, ?)",
+        [(user_id, token, task_id) for token in tokens],
+    )
+
+
+def _reindex_task(cursor: sqlite3.Cursor, task_id: int, tokens_by_user: dict) -> None:
+    cursor.execute("DELETE FROM task_search_tokens WHERE task_id = ?", (task_id,))
+    for user_id, tokens in tokens_by_user.items():
+        _store_tokens(cursor, user_id, task_id, tokens)
+        _mark_indexed(cursor, user_id, task_id)
+
+
+def _mark_indexed(cursor: sqlite3.Cursor, user_id: int, task_id: int) -> None:
+    cursor.execute(
+        "UPDATE permissions SET search_indexed = 1 WHERE user_id = ? AND task_id = ?",
+        (user_id, task_id),
+    )
+
+
+def _load_rekey_sources(task_ids: Sequence[int]) -> dict:
+    """{task_id: (task_id, details, unwrap user, wrapped key, permitted ids)} for tasks someone can read."""
+    placeholders = ", ".join("?" for _ in task_ids)
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"""
+            SELECT t.task_id, t.details, ek.user_id, ek.encrypted_key
+            FROM todos t
+            JOIN encryption_keys ek ON ek.key_id = (
+                SELECT MIN(key_id) FROM encryption_keys WHERE task_id = t.task_id
+            )
+            WHERE t.task_id IN ({placeholders})
+            """,
+            task_ids,
+        )
+        rows = cursor.fetchall()
+        permitted = _load_permitted_users(cursor, task_ids)
+    finally:
+        conn.close()
+    # a task nobody may read any more is left alone: rekeying it would lose it
+    return {
+        row[0]: (*row, permitted[row[0]])
+        for row in rows
+        if permitted.get(row[0])
+    }
+
+
+def _load_permitted_users(cursor: sqlite3.Cursor, task_ids: Sequence[int]) -> dict:
+    placeholders = ", ".join("?" for _ in task_ids)
+    cursor.execute(
+        f"SELECT task_id, user_id FROM permissions WHERE task_id IN ({placeholders}) ORDER BY user_id",
+        task_ids,
+    )
+    permitted: dict = {}
+    for task_id, user_id in cursor.fetchall():
+        permitted.setdefault(task_id, []).append(user_id)
+    return {task_id: tuple(user_ids) for task_id, user_ids in permitted.items()}
+
+
+def _prepare_rekey(source: tuple) -> tuple:
+    task_id, old_details, unwrap_user_id, encrypted_key, permitted_ids = source
+    old_key = key_manager.decrypt_data_key_for_user(unwrap_user_id, encrypted_key)
+    plaintext = encryption.decrypt_message(old_details, old_key)
+    new_key = encryption.generate_data_key()
+    wrapped = [
+        (user_id, key_manager.encrypt_data_key_for_user(user_id, new_key))
+        for user_id in permitted_ids
+    ]
+    return task_id, old_details, encryption.encrypt_message(plaintext, new_key), permitted_ids, wrapped
+
+
+def _store_rekeyed(prepared: Sequence[tuple]) -> Tuple[int, List[int]]:
+    """Write one batch atomically; returns (rekeyed count, conflicting task ids)."""
+    if not prepared:
+        return 0, []
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        permitted = _load_permitted_users(cursor, [item[0] for item in prepared])
+        rekeyed = 0
+        conflicts = []
+        for task_id, old_details, new_details, permitted_ids, wrapped in prepared:
+            if permitted.get(task_id) != permitted_ids:
+                conflicts.append(task_id)
+                continue
+            # compare-and-swap: an edit since we read the details wins
+            cursor.execute(
+                "UPDATE todos SET details = ? WHERE task_id = ? AND details = ?",
+                (new_details, task_id, old_details),
+            )
+            if cursor.rowcount == 0:
+                conflicts.append(task_id)
+                continue
+            for user_id, encrypted_key in wrapped:
+                _store_wrapped_key(cursor, user_id, task_id, encrypted_key)
+            placeholders = ", ".join("?" for _ in permitted_ids)
+            cursor.execute(
+                f"DELETE FROM encryption_keys WHERE task_id = ? AND user_id NOT IN ({placeholders})",
+                (task_id, *permitted_ids),
+            )
+            rekeyed += 1
+        conn.commit()
+        return rekeyed, conflicts
+    finally:
+        conn.close()
@@ -9,6 +9,7 @@ if __package__ in (None, ""):
     # Allow running this module directly by ensuring project root is importable.
     sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+from core import metrics
 from database.models import User
 
 PBKDF2_ALGORITHM = "sha256"
@@ -29,12 +30,13 @@ def hash_password(password: str) -> str:
         raise ValueError("Password cannot be empty")
     
     salt = secrets.token_bytes(PBKDF2_SALT_BYTES)
-    derived_key = hashlib.pbkdf2_hmac(
-        PBKDF2_ALGORITHM,
-        password.encode("utf-8"),
-        salt,
-        PBKDF2_ITERATIONS,
-    )
+    with metrics.timer("auth.pbkdf2"):
+        derived_key = hashlib.pbkdf2_hmac(
+            PBKDF2_ALGORITHM,
+            password.encode("utf-8"),
+            salt,
+            PBKDF2_ITERATIONS,
+        )
     
     return f"{HASH_PREFIX}${PBKDF2_ITERATIONS}${salt.hex()}${derived_key.hex()}"
 
@@ -59,12 +61,13 @@ def verify_password(password: str, stored_value: str) -> Tuple[bool, Optional[st
         except (ValueError, TypeError):
             return False, None
         
-        candidate_hash = hashlib.pbkdf2_hmac(
-            PBKDF2_ALGORITHM,
-            password.encode("utf-8"),
-            salt,
-            iterations,
-        )
+        with metrics.timer("auth.pbkdf2"):
+            candidate_hash = hashlib.pbkdf2_hmac(
+                PBKDF2_ALGORITHM,
+                password.encode("utf-8"),
+                salt,
+                iterations,
+            )
         return hmac.compare_digest(candidate_hash, stored_hash), None
     
     # Legacy plaintext storage fallback
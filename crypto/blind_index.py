@@ -0,0 +1,53 @@
+"""
+Blind keyword tokens for searching encrypted todo details.
+
+Each normalized word is turned into an HMAC-SHA256 token under a per-user search
+key, so the database can match keywords by equality without ever storing the
+words themselves. Tokens are deterministic per user, which means they do reveal
+when two of a user's tasks share a word; they never reveal the word itself.
+"""
+
+from __future__ import annotations
+
+import hmac
+import re
+import unicodedata
+from typing import Iterable, List, Optional, Set
+
+from crypto import key_manager
+
+TOKEN_BYTES = 16  # truncated HMAC, 128 bits is plenty for equality matching
+MIN_WORD_LENGTH = 2
+# details are at most 1000 characters, so at most 334 words of 2+ characters:
+# every word of a valid task is indexed. Longer texts keep their first words.
+MAX_WORDS_PER_TASK = 512
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_words(*texts: Optional[str]) -> Set[str]:
+    """
+    Split text into the set of case-folded, NFKC-normalized search words: the
+    first MAX_WORDS_PER_TASK distinct words in document order.
+    """
+    words: Set[str] = set()
+    for text in texts:
+        if not text:
+            continue
+        normalized = unicodedata.normalize("NFKC", text).casefold()
+        for word in _WORD_RE.findall(normalized):
+            if len(word) >= MIN_WORD_LENGTH:
+                words.add(word)
+                if len(words) == MAX_WORDS_PER_TASK:
+                    return words
+    return words
+
+
+def blind_tokens(user_id: int, words: Iterable[str]) -> List[str]:
+    """Return the hex blind token of every word for the given user."""
+    search_key = key_manager.derive_search_key(user_id)
+    # hmac.digest is the one-shot C path; same tokens as hmac.new(...).digest()
+    return [
+        hmac.digest(search_key, word.encode("utf-8"), "sha256")[:TOKEN_BYTES].hex()
+        for word in words
+    ]
@@ -11,6 +11,8 @@ from typing import Optional
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 
+from core import metrics
+
 DATA_KEY_BYTES = 32  # AES-256
 NONCE_BYTES = 12
 TAG_BYTES = 16
@@ -49,6 +51,7 @@ def encrypt_message(plaintext: Optional[str], data_key: bytes) -> str:
     return base64.urlsafe_b64encode(payload).decode("utf-8")
 
 
+@metrics.timed("crypto.decrypt")
 def decrypt_message(ciphertext: str, data_key: bytes) -> str:
     """Reverse of encrypt_message, returning the original plaintext string."""
     if not ciphertext:
@@ -13,100 +13,222 @@ import base64
 import hashlib
 import hmac
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 
+from core import metrics
+
 MASTER_KEY_ENV_VAR = "TODO_MASTER_KEY_PATH"
 DEFAULT_MASTER_KEY_PATH = Path("crypto/master.key")
+# how long a process trusts its idea of the newest master key version
+KEY_VERSION_RECHECK_SECONDS = 30.0
+# how long to wait for a key file another process has created but not written yet
+MASTER_KEY_WRITE_WAIT_SECONDS = 1.0
 
 NONCE_BYTES = 12
 TAG_BYTES = 16
 
-_master_key_cache: Optional[bytes] = None
+# Master keys are versioned: version 1 lives at the configured path and
+# version n > 1 next to it as "<path>.v<n>". Wrapped data keys made under
+# version n > 1 are stored as "v<n>$<token>"; unprefixed tokens are version 1.
+_master_keys: Dict[int, bytes] = {}
+_current_version: Optional[int] = None
+_current_version_checked_at = 0.0
+_master_key_lock = threading.Lock()  # worker pools may race to create the key
 
 
-def _get_master_key_path() -> Path:
+def _get_master_key_path(version: int = 1) -> Path:
     override = os.getenv(MASTER_KEY_ENV_VAR)
-    if override:
-        return Path(override)
-    return DEFAULT_MASTER_KEY_PATH
+    path = Path(override) if override else DEFAULT_MASTER_KEY_PATH
+    if version == 1:
+        return path
+    return path.with_name(f"{path.name}.v{version}")
 
 
 def reset_master_key_cache() -> None:
-    """Test helper to drop the cached master key so a new one can be loaded."""
-    global _master_key_cache
-    _master_key_cache = None
+    """Test helper to drop the cached master keys so new ones can be loaded."""
+    global _current_version, _current_version_checked_at
+    _master_keys.clear()
+    _current_version = None
+    _current_version_checked_at = 0.0
 
 
-def _load_or_create_master_key() -> bytes:
+def get_master_key(version: int = 1) -> bytes:
     """
-    Load the master key from disk, creating it if the file does not exist yet.
+    Load a master key version from disk. Version 1 is created on first use if
+    no key exists yet; any other missing version is an error.
     The master key is stored in url-safe base64 so the file is text friendly.
     """
-    global _master_key_cache
-    if _master_key_cache is not None:
-        return _master_key_cache
-    
-    path = _get_master_key_path()
-    if path.exists():
-        raw = path.read_bytes()
+    master_key = _master_keys.get(version)
+    if master_key is not None:
+        return master_key
+    with _master_key_lock:
+        if version in _master_keys:
+            return _master_keys[version]
+        
+        path = _get_master_key_path(version)
+        if path.exists():
+            _master_keys[version] = _read_master_key(path)
+            return _master_keys[version]
+        
+        if version != 1 or _latest_version_on_disk() > 1:
+            raise ValueError(f"Master key version {version} not found at {path}")
         try:
-            _master_key_cache = base64.urlsafe_b64decode(raw)
-            return _master_key_cache
-        except Exception as exc:  
-            raise ValueError(f"Failed to load master key from {path}") from exc
-    
+            _master_keys[1] = _write_new_master_key(path)
+        except FileExistsError:
+            # another process created it first: use that key, not ours
+            _master_keys[1] = _read_master_key(path)
+        return _master_keys[1]
+
+
+def current_key_version() -> int:
+    """Newest master key version; new data keys are wrapped under it."""
+    global _current_version, _current_version_checked_at
+    now = time.monotonic()
+    if _current_version is not None and now - _current_version_checked_at < KEY_VERSION_RECHECK_SECONDS:
+        return _current_version
+    with _master_key_lock:
+        _current_version = _latest_version_on_disk()
+        _current_version_checked_at = now
+        return _current_version
+
+
+def create_master_key_version() -> int:
+    """Generate the next master key version, make it current and return it."""
+    global _current_version, _current_version_checked_at
+    get_master_key(1)  # make sure version 1 exists before adding a second
+    with _master_key_lock:
+        while True:
+            version = _latest_version_on_disk() + 1
+            try:
+                _master_keys[version] = _write_new_master_key(_get_master_key_path(version))
+                break
+            except FileExistsError:
+                continue  # another process took this version, try the next one
+        _current_version = version
+        _current_version_checked_at = time.monotonic()
+        return version
+
+
+def _latest_version_on_disk() -> int:
+    version = 1
+    while _get_master_key_path(version + 1).exists():
+        version += 1
+    return version
+
+
+def _read_master_key(path: Path) -> bytes:
+    # a process that just created the file may not have written the key yet
+    deadline = time.monotonic() + MASTER_KEY_WRITE_WAIT_SECONDS
+    raw = path.read_bytes()
+    while not raw and time.monotonic() < deadline:
+        time.sleep(0.01)
+        raw = path.read_bytes()
+    if not raw:
+        raise ValueError(f"Master key file {path} is empty")
+    try:
+        return base64.urlsafe_b64decode(raw)
+    except Exception as exc:
+        raise ValueError(f"Failed to load master key from {path}") from exc
+
+
+def _write_new_master_key(path: Path) -> bytes:
     path.parent.mkdir(parents=True, exist_ok=True)
     master_key = os.urandom(32)
     encoded = base64.urlsafe_b64encode(master_key)
-    path.write_bytes(encoded)
+    # "x" so two processes can never overwrite each other's key
+    with open(path, "xb") as handle:
+        handle.write(encoded)
     try:
         os.chmod(path, 0o600)
     except OSError:
         #on some OS (e.g. Windows) chmod may fail; not critical for functionality.
         pass
-    
-    _master_key_cache = master_key
     return master_key
 
 
-def derive_user_key(user_id: int) -> bytes:
+def derive_user_key(user_id: int, version: int = 1) -> bytes:
     """
-    Derive a stable user specific key
+    Derive a stable user specific key under the given master key version
     """
     if user_id is None:
         raise ValueError("user_id is required to derive a user key")
     
-    master_key = _load_or_create_master_key()
+    master_key = get_master_key(version)
     message = str(int(user_id)).encode("utf-8")
     digest = hmac.new(master_key, message, hashlib.sha256).digest()
     return digest
 
 
-def encrypt_data_key_for_user(user_id: int, data_key: bytes) -> str:
+def derive_search_key(user_id: int) -> bytes:
+    """
+    Derive the per-user key used for blind search tokens.
+    Kept separate from derive_user_key so index tokens never reveal wrapping keys.
+    Pinned to master key version 1, so rotation never invalidates stored tokens.
+    """
+    if user_id is None:
+        raise ValueError("user_id is required to derive a search key")
+    
+    master_key = get_master_key(1)
+    message = b"search:" + str(int(user_id)).encode("utf-8")
+    return hmac.new(master_key, message, hashlib.sha256).digest()
+
+
+def encrypt_data_key_for_user(user_id: int, data_key: bytes, version: Optional[int] = None) -> str:
     """
     Encrypt the todo data key for a specific user so it can be stored safely.
+    Uses the current master key version unless one is given.
     Returns the ciphertext as a UTF-8 string for database storage.
     """
+    if version is None:
+        version = current_key_version()
+    token = wrap_data_key(derive_user_key(user_id, version), data_key)
+    return token if version == 1 else f"v{version}${token}"
+
+
+def decrypt_data_key_for_user(user_id: int, encrypted_key: str) -> bytes:
+    """Decrypt the todo data key for a user, returning the raw key bytes."""
+    version, token = split_key_version(encrypted_key)
+    return unwrap_data_key(derive_user_key(user_id, version), token)
+
+
+def split_key_version(encrypted_key: str) -> Tuple[int, str]:
+    """Return (master key version, bare token) for a stored wrapped key."""
+    # "$" never occurs in url-safe base64, so unprefixed tokens are version 1
+    if "$" not in encrypted_key:
+        return 1, encrypted_key
+    prefix, token = encrypted_key.split("$", 1)
+    if not prefix.startswith("v") or not prefix[1:].isdigit():
+        raise ValueError("Encrypted key has an invalid version prefix")
+    return int(prefix[1:]), token
+
+
+def key_version_of(encrypted_key: str) -> int:
+    return split_key_version(encrypted_key)[0]
+
+
+def wrap_data_key(wrapping_key: bytes, data_key: bytes) -> str:
+    """AES-GCM encrypt a data key under any 256-bit wrapping key (user or archive key)."""
     if isinstance(data_key, str):
         payload = data_key.encode("utf-8")
     else:
         payload = data_key
     
-    user_key = derive_user_key(user_id)
     nonce = get_random_bytes(NONCE_BYTES)
-    cipher = AES.new(user_key, AES.MODE_GCM, nonce=nonce)
+    cipher = AES.new(wrapping_key, AES.MODE_GCM, nonce=nonce)
     ciphertext, tag = cipher.encrypt_and_digest(payload)
     token = base64.urlsafe_b64encode(nonce + tag + ciphertext)
     return token.decode("utf-8")
 
 
-def decrypt_data_key_for_user(user_id: int, encrypted_key: str) -> bytes:
-    """Decrypt the todo data key for a user, returning the raw key bytes."""
-    user_key = derive_user_key(user_id)
+@metrics.timed("crypto.unwrap_key")
+def unwrap_data_key(wrapping_key: bytes, encrypted_key: str) -> bytes:
+    """Reverse of wrap_data_key, returning the raw key bytes."""
     try:
         raw = base64.urlsafe_b64decode(encrypted_key.encode("utf-8"))
     except Exception as exc:
@@ -119,8 +241,8 @@ def decrypt_data_key_for_user(user_id: int, encrypted_key: str) -> bytes:
     tag = raw[NONCE_BYTES:NONCE_BYTES + TAG_BYTES]
     ciphertext = raw[NONCE_BYTES + TAG_BYTES :]
     
-    cipher = AES.new(user_key, AES.MODE_GCM, nonce=nonce)
+    cipher = AES.new(wrapping_key, AES.MODE_GCM, nonce=nonce)
     try:
         return cipher.decrypt_and_verify(ciphertext, tag)
     except ValueError as exc:
-        raise ValueError("Encrypted key cannot be decrypted for this user") from exc
+        raise ValueError("Encrypted key cannot be decrypted with this key") from exc
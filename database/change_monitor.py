@@ -0,0 +1,35 @@
+"""
+Cheap detection of commits made through other database connections.
+
+SQLite bumps PRAGMA data_version on a connection whenever *another* connection
+(in this or any other process) commits to the same database file. Polling it
+on one long-lived connection costs a few microseconds and touches no tables,
+so the GUI can poll often and only run a change-feed query after a real write.
+"""
+
+from database.db_setup import get_connection
+
+
+class DataVersionMonitor:
+    def __init__(self):
+        self._conn = get_connection()
+        self._version = self._read_version()
+
+    def _read_version(self):
+        return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def poll(self):
+        """Return True if another connection has committed since the last poll."""
+        if self._conn is None:
+            return False
+        version = self._read_version()
+        if version == self._version:
+            return False
+        self._version = version
+        return True
+
+    def close(self):
+        """Release the monitor's connection; poll() returns False afterwards."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
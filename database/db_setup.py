@@ -1,6 +1,10 @@
 import sqlite3
 import os
 
+from core import metrics
+from database import sql_trace
+from database.instrumented import TimedConnection
+
 DATABASE_NAME = "todo_database.db"
 
 def initialize_database():
@@ -10,6 +14,10 @@ def initialize_database():
     conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
     
+    # WAL lets readers keep going while a writer (bulk import, rekey, key
+    # rotation) commits; the setting is stored in the database file itself.
+    cursor.execute('PRAGMA journal_mode=WAL')
+    
     # 1. Users table (user accounts so authorized users can contribute)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -54,22 +62,424 @@ def initialize_database():
             user_id INTEGER NOT NULL,
             task_id INTEGER NOT NULL,
             encrypted_key TEXT NOT NULL,
+            key_version INTEGER NOT NULL DEFAULT 1,
             FOREIGN KEY (user_id) REFERENCES users (user_id),
             FOREIGN KEY (task_id) REFERENCES todos (task_id),
             UNIQUE(user_id, task_id)
         )
     ''')
+    # master key version the data key is wrapped under (see crypto/key_manager.py)
+    _ensure_column(cursor, 'encryption_keys', 'key_version', 'INTEGER NOT NULL DEFAULT 1')
+    
+    # Lookup indexes used by the counter triggers below
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_todos_created_by ON todos (created_by)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_permissions_task ON permissions (task_id)')
+    # per-task key lookups (delete, rekey); the UNIQUE index leads with user_id
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_encryption_keys_task ON encryption_keys (task_id)')
+    
+    # 5. Per-user task counters (kept in sync by triggers, read in O(1))
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_task_stats'")
+    stats_existed = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_task_stats (
+            user_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            shared_with_me INTEGER NOT NULL DEFAULT 0,
+            shared_by_me INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    _create_triggers(cursor, STATS_TRIGGERS)
+    if not stats_existed:
+        # Existing databases already hold tasks the triggers never saw
+        rebuild_user_task_stats(cursor)
+    
+    # 6. Blind keyword index over encrypted details (HMAC tokens, never words)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_search_tokens (
+            user_id INTEGER NOT NULL,
+            token TEXT NOT NULL,
+            task_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, token, task_id),
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            FOREIGN KEY (task_id) REFERENCES todos (task_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_tokens_task ON task_search_tokens (task_id, user_id)')
+    _create_triggers(cursor, SEARCH_TRIGGERS)
+    # set once a grant's tokens are written, so tasks with no words are not revisited
+    if _ensure_column(cursor, 'permissions', 'search_indexed', 'INTEGER NOT NULL DEFAULT 0'):
+        cursor.execute('''
+            UPDATE permissions SET search_indexed = 1
+            WHERE EXISTS (
+                SELECT 1 FROM task_search_tokens s
+                WHERE s.user_id = permissions.user_id AND s.task_id = permissions.task_id
+            )
+        ''')
+    
+    # 7. FTS5 index mirroring the plaintext titles (external content = todos)
+    _create_title_index(cursor)
+    
+    # 8. Change feed: one row per (user, task) touched, ordered by change_id
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_changes (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_changes_user ON task_changes (user_id, change_id)')
+    _create_triggers(cursor, CHANGE_FEED_TRIGGERS)
+    
+    # 9. Tasks whose data key should be rotated after a revocation (drained lazily)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pending_rekeys (
+            task_id INTEGER PRIMARY KEY,
+            requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
     
     # Commit changes and close connection
     conn.commit()
     conn.close()
     
     print(f"Database '{DATABASE_NAME}' initialized successfully!")
-    print("Created tables: users, todos, permissions, encryption_keys")
+    print("Created tables: users, todos, permissions, encryption_keys, user_task_stats, "
+          "task_search_tokens, todos_fts, task_changes, pending_rekeys")
+
+# A task counts as complete for any non-zero is_complete value.
+_DONE = "(COALESCE({0}.is_complete, 0) != 0)"
+
+# Counters recomputed from scratch; used to rebuild and to check for drift.
+STATS_RECOMPUTE_SQL = f'''
+    SELECT ids.user_id,
+           (SELECT COUNT(*) FROM permissions p JOIN todos t ON t.task_id = p.task_id
+             WHERE p.user_id = ids.user_id),
+           (SELECT COUNT(*) FROM permissions p JOIN todos t ON t.task_id = p.task_id
+             WHERE p.user_id = ids.user_id AND {_DONE.format("t")}),
+           (SELECT COUNT(*) FROM permissions p JOIN todos t ON t.task_id = p.task_id
+             WHERE p.user_id = ids.user_id AND t.created_by != ids.user_id),
+           (SELECT COUNT(*) FROM todos t
+             WHERE t.created_by = ids.user_id
+               AND EXISTS (SELECT 1 FROM permissions p
+                           WHERE p.task_id = t.task_id AND p.user_id != t.created_by))
+    FROM (SELECT user_id FROM users
+          UNION SELECT user_id FROM permissions
+          UNION SELECT created_by FROM todos) ids
+'''
+
+STATS_COLUMNS = ("total", "completed", "shared_with_me", "shared_by_me")
+
+# shared_by_me for the owner(s) of the given task ids, recomputed in place.
+_RECOUNT_SHARED_BY_ME = '''
+    UPDATE user_task_stats SET shared_by_me = (
+        SELECT COUNT(*) FROM todos t
+        WHERE t.created_by = user_task_stats.user_id
+          AND EXISTS (SELECT 1 FROM permissions p
+                      WHERE p.task_id = t.task_id AND p.user_id != t.created_by))
+    WHERE user_id IN ({owners});
+'''
+
+STATS_TRIGGERS = (
+    ("trg_stats_user_insert", '''
+        CREATE TRIGGER trg_stats_user_insert AFTER INSERT ON users
+        BEGIN
+            INSERT OR IGNORE INTO user_task_stats (user_id) VALUES (NEW.user_id);
+        END
+    '''),
+    ("trg_stats_user_delete", '''
+        CREATE TRIGGER trg_stats_user_delete AFTER DELETE ON users
+        BEGIN
+            DELETE FROM user_task_stats WHERE user_id = OLD.user_id;
+        END
+    '''),
+    ("trg_stats_permission_insert", f'''
+        CREATE TRIGGER trg_stats_permission_insert AFTER INSERT ON permissions
+        BEGIN
+            INSERT OR IGNORE INTO user_task_stats (user_id) VALUES (NEW.user_id);
+            UPDATE user_task_stats SET
+                total = total + 1,
+                completed = completed + (SELECT {_DONE.format("t")} FROM todos t WHERE t.task_id = NEW.task_id),
+                shared_with_me = shared_with_me + (SELECT t.created_by != NEW.user_id FROM todos t WHERE t.task_id = NEW.task_id)
+            WHERE user_id = NEW.user_id
+              AND EXISTS (SELECT 1 FROM todos WHERE task_id = NEW.task_id);
+            INSERT OR IGNORE INTO user_task_stats (user_id)
+                SELECT created_by FROM todos WHERE task_id = NEW.task_id;
+            -- the first collaborator turns the owner's task into a shared one
+            UPDATE user_task_stats SET shared_by_me = shared_by_me + 1
+            WHERE user_id = (SELECT created_by FROM todos WHERE task_id = NEW.task_id)
+              AND user_id != NEW.user_id
+              AND (SELECT COUNT(*) FROM permissions p
+                   WHERE p.task_id = NEW.task_id AND p.user_id != user_task_stats.user_id) = 1;
+        END
+    '''),
+    ("trg_stats_permission_delete", f'''
+        CREATE TRIGGER trg_stats_permission_delete AFTER DELETE ON permissions
+        BEGIN
+            UPDATE user_task_stats SET
+                total = total - 1,
+                completed = completed - (SELECT {_DONE.format("t")} FROM todos t WHERE t.task_id = OLD.task_id),
+                shared_with_me = shared_with_me - (SELECT t.created_by != OLD.user_id FROM todos t WHERE t.task_id = OLD.task_id)
+            WHERE user_id = OLD.user_id
+              AND EXISTS (SELECT 1 FROM todos WHERE task_id = OLD.task_id);
+            -- removing the last collaborator makes the task private again
+            UPDATE user_task_stats SET shared_by_me = shared_by_me - 1
+            WHERE user_id = (SELECT created_by FROM todos WHERE task_id = OLD.task_id)
+              AND user_id != OLD.user_id
+              AND NOT EXISTS (SELECT 1 FROM permissions p
+                              WHERE p.task_id = OLD.task_id AND p.user_id != user_task_stats.user_id);
+        END
+    '''),
+    ("trg_stats_permission_update", f'''
+        CREATE TRIGGER trg_stats_permission_update AFTER UPDATE OF user_id, task_id ON permissions
+        BEGIN
+            UPDATE user_task_stats SET
+                total = total - 1,
+                completed = completed - (SELECT {_DONE.format("t")} FROM todos t WHERE t.task_id = OLD.task_id),
+                shared_with_me = shared_with_me - (SELECT t.created_by != OLD.user_id FROM todos t WHERE t.task_id = OLD.task_id)
+            WHERE user_id = OLD.user_id
+              AND EXISTS (SELECT 1 FROM todos WHERE task_id = OLD.task_id);
+            INSERT OR IGNORE INTO user_task_stats (user_id) VALUES (NEW.user_id);
+            UPDATE user_task_stats SET
+                total = total + 1,
+                completed = completed + (SELECT {_DONE.format("t")} FROM todos t WHERE t.task_id = NEW.task_id),
+                shared_with_me = shared_with_me + (SELECT t.created_by != NEW.user_id FROM todos t WHERE t.task_id = NEW.task_id)
+            WHERE user_id = NEW.user_id
+              AND EXISTS (SELECT 1 FROM todos WHERE task_id = NEW.task_id);
+            {_RECOUNT_SHARED_BY_ME.format(owners="SELECT created_by FROM todos WHERE task_id IN (OLD.task_id, NEW.task_id)")}
+        END
+    '''),
+    ("trg_stats_todo_complete", f'''
+        CREATE TRIGGER trg_stats_todo_complete AFTER UPDATE OF is_complete ON todos
+        WHEN {_DONE.format("OLD")} != {_DONE.format("NEW")}
+        BEGIN
+            UPDATE user_task_stats
+            SET completed = completed + (CASE WHEN {_DONE.format("NEW")} THEN 1 ELSE -1 END)
+            WHERE user_id IN (SELECT user_id FROM permissions WHERE task_id = NEW.task_id);
+        END
+    '''),
+    ("trg_stats_todo_owner", f'''
+        CREATE TRIGGER trg_stats_todo_owner AFTER UPDATE OF created_by ON todos
+        WHEN OLD.created_by != NEW.created_by
+        BEGIN
+            UPDATE user_task_stats
+            SET shared_with_me = shared_with_me
+                + (user_id != NEW.created_by) - (user_id != OLD.created_by)
+            WHERE user_id IN (SELECT user_id FROM permissions WHERE task_id = NEW.task_id);
+            INSERT OR IGNORE INTO user_task_stats (user_id) VALUES (NEW.created_by);
+            {_RECOUNT_SHARED_BY_ME.format(owners="OLD.created_by, NEW.created_by")}
+        END
+    '''),
+    ("trg_stats_todo_delete", f'''
+        CREATE TRIGGER trg_stats_todo_delete AFTER DELETE ON todos
+        BEGIN
+            UPDATE user_task_stats SET
+                total = total - 1,
+                completed = completed - {_DONE.format("OLD")},
+                shared_with_me = shared_with_me - (user_id != OLD.created_by)
+            WHERE user_id IN (SELECT user_id FROM permissions WHERE task_id = OLD.task_id);
+            UPDATE user_task_stats SET shared_by_me = shared_by_me - 1
+            WHERE user_id = OLD.created_by
+              AND EXISTS (SELECT 1 FROM permissions p
+                          WHERE p.task_id = OLD.task_id AND p.user_id != OLD.created_by);
+        END
+    '''),
+)
+
+# Search tokens must disappear together with the access they were issued for.
+SEARCH_TRIGGERS = (
+    ("trg_search_permission_delete", '''
+        CREATE TRIGGER trg_search_permission_delete AFTER DELETE ON permissions
+        BEGIN
+            DELETE FROM task_search_tokens
+            WHERE task_id = OLD.task_id AND user_id = OLD.user_id;
+        END
+    '''),
+    ("trg_search_todo_delete", '''
+        CREATE TRIGGER trg_search_todo_delete AFTER DELETE ON todos
+        BEGIN
+            DELETE FROM task_search_tokens WHERE task_id = OLD.task_id;
+        END
+    '''),
+)
+
+TITLE_INDEX_TRIGGERS = (
+    ("trg_fts_todo_insert", '''
+        CREATE TRIGGER trg_fts_todo_insert AFTER INSERT ON todos
+        BEGIN
+            INSERT INTO todos_fts (rowid, title) VALUES (NEW.task_id, NEW.title);
+        END
+    '''),
+    ("trg_fts_todo_delete", '''
+        CREATE TRIGGER trg_fts_todo_delete AFTER DELETE ON todos
+        BEGIN
+            INSERT INTO todos_fts (todos_fts, rowid, title) VALUES ('delete', OLD.task_id, OLD.title);
+        END
+    '''),
+    ("trg_fts_todo_title", '''
+        CREATE TRIGGER trg_fts_todo_title AFTER UPDATE OF title ON todos
+        BEGIN
+            INSERT INTO todos_fts (todos_fts, rowid, title) VALUES ('delete', OLD.task_id, OLD.title);
+            INSERT INTO todos_fts (rowid, title) VALUES (NEW.task_id, NEW.title);
+        END
+    '''),
+)
+
+
+def _create_title_index(cursor):
+    """Create the title FTS5 table and its triggers; skipped if FTS5 is missing."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todos_fts'")
+    existed = cursor.fetchone() is not None
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+                title,
+                content='todos',
+                content_rowid='task_id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: title search falls back to LIKE
+        return
+    _create_triggers(cursor, TITLE_INDEX_TRIGGERS)
+    if not existed:
+        cursor.execute("INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')")
+
+# Every write that can change what a user sees logs (user_id, task_id, op).
+# op is 'insert' when access is granted, 'delete' when it is lost and
+# 'update' for anything else; readers re-check access when they apply it.
+CHANGE_FEED_TRIGGERS = (
+    ("trg_changes_todo_update", '''
+        CREATE TRIGGER trg_changes_todo_update AFTER UPDATE ON todos
+        BEGIN
+            INSERT INTO task_changes (user_id, task_id, op)
+                SELECT user_id, NEW.task_id, 'update' FROM permissions WHERE task_id = NEW.task_id;
+        END
+    '''),
+    ("trg_changes_todo_delete", '''
+        CREATE TRIGGER trg_changes_todo_delete AFTER DELETE ON todos
+        BEGIN
+            INSERT INTO task_changes (user_id, task_id, op)
+                SELECT user_id, OLD.task_id, 'delete' FROM permissions WHERE task_id = OLD.task_id;
+        END
+    '''),
+    ("trg_changes_permission_insert", '''
+        CREATE TRIGGER trg_changes_permission_insert AFTER INSERT ON permissions
+        BEGIN
+            INSERT INTO task_changes (user_id, task_id, op) VALUES (NEW.user_id, NEW.task_id, 'insert');
+        END
+    '''),
+    ("trg_changes_permission_update", '''
+        CREATE TRIGGER trg_changes_permission_update AFTER UPDATE OF user_id, task_id ON permissions
+        BEGIN
+            INSERT INTO task_changes (user_id, task_id, op) VALUES (OLD.user_id, OLD.task_id, 'delete');
+            INSERT INTO task_changes (user_id, task_id, op) VALUES (NEW.user_id, NEW.task_id, 'insert');
+        END
+    '''),
+    ("trg_changes_permission_delete", '''
+        CREATE TRIGGER trg_changes_permission_delete AFTER DELETE ON permissions
+        BEGIN
+            INSERT INTO task_changes (user_id, task_id, op) VALUES (OLD.user_id, OLD.task_id, 'delete');
+        END
+    '''),
+    ("trg_changes_key_insert", '''
+        CREATE TRIGGER trg_changes_key_insert AFTER INSERT ON encryption_keys
+        BEGIN
+            INSERT INTO task_changes (user_id, task_id, op) VALUES (NEW.user_id, NEW.task_id, 'update');
+        END
+    '''),
+    ("trg_changes_key_update", '''
+        CREATE TRIGGER trg_changes_key_update AFTER UPDATE ON encryption_keys
+        -- master key rotation re-wraps the same data key; readers need not refetch
+        WHEN NEW.key_version = OLD.key_version
+        BEGIN
+            INSERT INTO task_changes (user_id, task_id, op) VALUES (NEW.user_id, NEW.task_id, 'update');
+        END
+    '''),
+    ("trg_changes_key_delete", '''
+        CREATE TRIGGER trg_changes_key_delete AFTER DELETE ON encryption_keys
+        BEGIN
+            INSERT INTO task_changes (user_id, task_id, op) VALUES (OLD.user_id, OLD.task_id, 'delete');
+        END
+    '''),
+)
 
-def get_connection():
+
+def _ensure_column(cursor, table, column, declaration):
+    """Add a column to an existing table created before the column existed; True if added."""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column in {row[1] for row in cursor.fetchall()}:
+        return False
+    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+    return True
+
+
+def _create_triggers(cursor, triggers):
+    """(Re)create triggers so definitions stay current across upgrades."""
+    for name, sql in triggers:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(sql)
+
+
+def rebuild_user_task_stats(cursor):
+    """Recompute every user's counters from the base tables."""
+    cursor.execute('DELETE FROM user_task_stats')
+    cursor.execute(f'''
+        INSERT INTO user_task_stats (user_id, {", ".join(STATS_COLUMNS)})
+        {STATS_RECOMPUTE_SQL}
+    ''')
+
+
+def check_user_task_stats(repair=False):
+    """
+    Compare stored counters with a from-scratch recount.
+    Returns a list of drift dicts (user_id, column, stored, expected); an empty
+    list means the counters are consistent. With repair=True any drift is
+    fixed by rebuilding the table.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(STATS_RECOMPUTE_SQL)
+        expected = {row[0]: row[1:] for row in cursor.fetchall()}
+        cursor.execute(f'SELECT user_id, {", ".join(STATS_COLUMNS)} FROM user_task_stats')
+        stored = {row[0]: row[1:] for row in cursor.fetchall()}
+        
+        drift = []
+        zeros = (0,) * len(STATS_COLUMNS)
+        for user_id in sorted(set(expected) | set(stored)):
+            want = expected.get(user_id, zeros)
+            have = stored.get(user_id, zeros)
+            for column, have_value, want_value in zip(STATS_COLUMNS, have, want):
+                if have_value != want_value:
+                    drift.append({
+                        'user_id': user_id,
+                        'column': column,
+                        'stored': have_value,
+                        'expected': want_value,
+                    })
+        
+        if drift and repair:
+            rebuild_user_task_stats(cursor)
+            conn.commit()
+        return drift
+    finally:
+        conn.close()
+
+def get_connection(check_same_thread=True):
     """Get a connection to the database"""
-    return sqlite3.connect(DATABASE_NAME)
+    if not (metrics.is_enabled() or sql_trace.is_enabled()):
+        return sqlite3.connect(DATABASE_NAME, check_same_thread=check_same_thread)
+    # metrics or tracing on: count checkouts and time every statement
+    metrics.inc("db.connections")
+    with metrics.timer("db.connect"):
+        return sqlite3.connect(
+            DATABASE_NAME, check_same_thread=check_same_thread, factory=TimedConnection
+        )
 
 if __name__ == "__main__":
     # Run this file directly to initialize the database
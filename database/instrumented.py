@@ -0,0 +1,74 @@
+"""
+sqlite3 connection and cursor classes that time every statement.
+
+get_connection() hands these out while metrics (core/metrics.py) or SQL
+tracing (database/sql_trace.py) are enabled. Each execute/executemany/
+executescript is recorded in a histogram named after its leading keyword,
+e.g. "db.statement.select" or "db.statement.insert", and passed on to the
+slow-query log. The time covers preparing the statement and stepping to the
+first row; rows fetched later (and any row_factory work such as decrypting)
+are not included.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+
+from core import metrics
+from database import sql_trace
+
+
+def statement_kind(sql: str) -> str:
+    """Lower-case leading keyword of a statement ("select", "insert", ...)."""
+    head = sql.lstrip()[:16].split(None, 1)
+    return head[0].lower() if head else "empty"
+
+
+def _record(connection, sql: str, parameters, started: float, many: bool = False) -> None:
+    elapsed = time.perf_counter() - started
+    kind = statement_kind(sql)
+    metrics.observe("db.statement." + kind, elapsed)
+    if sql_trace.is_enabled():
+        sql_trace.record(connection, sql, parameters, elapsed, kind, many)
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record(self.connection, sql, parameters, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        if sql_trace.is_enabled() and not isinstance(seq_of_parameters, (list, tuple)):
+            # the trace needs the row count and the first row afterwards
+            seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record(self.connection, sql, seq_of_parameters, started, many=True)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _record(self.connection, sql_script, (), started)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute* would create a plain cursor internally
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
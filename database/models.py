@@ -1,3 +1,6 @@
+from dataclasses import dataclass, fields, replace
+
+
 # Data validation function
 def validate_todo_data(title, details=None):
     """Validate todo input data. Returns (is_valid, message)"""
@@ -124,6 +127,91 @@ class User:
         return success
 
 
+@dataclass(frozen=True, slots=True)
+class Task:
+    """
+    One todo row. Immutable and slotted, so a task costs a fixed handful of
+    pointers instead of a per-row dict; use replace() to derive a changed copy.
+    Item access (task["title"], task.get(...), dict(task)) is kept so code
+    written against the old task dicts keeps working.
+    """
+    task_id: int
+    title: str
+    details: str
+    created_by: int
+    updated_by: int
+    created_at: str
+    updated_at: str
+    is_complete: bool
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row_factory for SELECTs whose first 8 columns follow the field order."""
+        # is_complete is stored as 0/1; Tasks from task_manager carry a bool
+        return cls(*row[:7], bool(row[7]))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) for name in TASK_FIELDS})
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if isinstance(key, str) else default
+
+    def keys(self):
+        return TASK_FIELDS
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in TASK_FIELDS}
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+
+TASK_FIELDS = tuple(f.name for f in fields(Task))
+
+
+class TaskStore:
+    """
+    Tasks indexed by task_id, in insertion order. Lookups, updates and
+    removals are O(1) dict operations instead of scans over a task list.
+    """
+    __slots__ = ("_tasks",)
+
+    def __init__(self, tasks=()):
+        self._tasks = {task["task_id"]: task for task in tasks}
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks.values())
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def __getitem__(self, task_id):
+        return self._tasks[task_id]
+
+    def get(self, task_id, default=None):
+        return self._tasks.get(task_id, default)
+
+    def upsert(self, task):
+        """Insert a task, or replace the stored one in place (keeping its position)."""
+        self._tasks[task["task_id"]] = task
+
+    def remove(self, task_id):
+        return self._tasks.pop(task_id, None)
+
+    def replace_all(self, tasks):
+        self._tasks = {task["task_id"]: task for task in tasks}
+
+
 class Todo:
     @staticmethod
     def create(title, details, created_by):
@@ -149,10 +237,11 @@ class Todo:
     
     @staticmethod
     def get_by_id(task_id):
-        """Get todo data by task_id. Returns todo dict or None if not found."""
+        """Get todo data by task_id. Returns a Task or None if not found."""
         from database.db_setup import get_connection
         
         conn = get_connection()
+        conn.row_factory = Task.from_row
         cursor = conn.cursor()
         
         cursor.execute('''SELECT task_id, title, details, created_by, updated_by, 
@@ -161,45 +250,22 @@ class Todo:
         row = cursor.fetchone()
         conn.close()
         
-        if row:
-            return {
-                'task_id': row[0],
-                'title': row[1],
-                'details': row[2],
-                'created_by': row[3],
-                'updated_by': row[4],
-                'created_at': row[5],
-                'updated_at': row[6],
-                'is_complete': row[7]
-            }
-        return None
+        return row
     
     @staticmethod
     def get_by_user(user_id):
-        """Get all todos created by a user. Returns list of todo dicts."""
+        """Get all todos created by a user. Returns list of Tasks."""
         from database.db_setup import get_connection
         
         conn = get_connection()
+        conn.row_factory = Task.from_row
         cursor = conn.cursor()
         
         cursor.execute('''SELECT task_id, title, details, created_by, updated_by, 
                                 created_at, updated_at, is_complete 
                          FROM todos WHERE created_by = ?''', (user_id,))
-        rows = cursor.fetchall()
+        todos = cursor.fetchall()
         conn.close()
-        
-        todos = []
-        for row in rows:
-            todos.append({
-                'task_id': row[0],
-                'title': row[1],
-                'details': row[2],
-                'created_by': row[3],
-                'updated_by': row[4],
-                'created_at': row[5],
-                'updated_at': row[6],
-                'is_complete': row[7]
-            })
         return todos
     
     @staticmethod
@@ -288,7 +354,7 @@ class Permission:
     
     @staticmethod
     def revoke(user_id, task_id):
-        """Remove user access to a todo. Returns True if successful, False otherwise."""
+        """Remove user access (and their wrapped data key) for a todo. Returns True if successful, False otherwise."""
         from database.db_setup import get_connection
         
         conn = get_connection()
@@ -296,8 +362,10 @@ class Permission:
         
         cursor.execute('DELETE FROM permissions WHERE user_id = ? AND task_id = ?', 
                       (user_id, task_id))
-        conn.commit()
         success = cursor.rowcount > 0
+        cursor.execute('DELETE FROM encryption_keys WHERE user_id = ? AND task_id = ?',
+                      (user_id, task_id))
+        conn.commit()
         conn.close()
         
         return success
@@ -324,10 +392,11 @@ class Permission:
     
     @staticmethod
     def get_user_todos(user_id):
-        """Get all todos accessible to a user (created by them OR shared with them). Returns list of todo dicts."""
+        """Get all todos accessible to a user (created by them OR shared with them). Returns list of Tasks."""
         from database.db_setup import get_connection
         
         conn = get_connection()
+        conn.row_factory = Task.from_row
         cursor = conn.cursor()
         
         # Get todos created by user OR shared with user
@@ -339,21 +408,8 @@ class Permission:
             WHERE t.created_by = ? OR p.user_id = ?
         ''', (user_id, user_id))
         
-        rows = cursor.fetchall()
+        todos = cursor.fetchall()
         conn.close()
-        
-        todos = []
-        for row in rows:
-            todos.append({
-                'task_id': row[0],
-                'title': row[1],
-                'details': row[2],
-                'created_by': row[3],
-                'updated_by': row[4],
-                'created_at': row[5],
-                'updated_at': row[6],
-                'is_complete': row[7]
-            })
         return todos
 
 
@@ -0,0 +1,266 @@
+"""
+SQL tracing and slow-query log.
+
+With PLANIT_SQL_TRACE=1, every statement run through get_connection() is
+timed (see database/instrumented.py). Statements that take at least
+PLANIT_SLOW_QUERY_MS milliseconds (default 50; 0 logs everything) are written
+as JSON lines to PLANIT_SQL_LOG (default planit-sql.log). The file rotates at
+LOG_MAX_BYTES and keeps LOG_BACKUPS old files. A line has:
+
+* the statement, whitespace-collapsed;
+* the shapes of its bound parameters, e.g. ["int", "str[44]", "null"], and
+  never their values, so no plaintext, ciphertext or key reaches the log
+  (executemany logs the number of rows and the first row's shape);
+* the duration, and the first caller outside the database layer.
+
+With PLANIT_SQL_EXPLAIN=1 as well, the first time a statement shape is seen
+its EXPLAIN QUERY PLAN is logged too (whatever its duration). So a new query
+that scans a table shows up without waiting for it to be slow.
+
+Rank the logged statements by total time with:
+
+    python -m database.sql_trace planit-sql.log [planit-sql.log.1 ...] [--top 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+SQL_TRACE_ENV_VAR = "PLANIT_SQL_TRACE"
+SLOW_QUERY_MS_ENV_VAR = "PLANIT_SLOW_QUERY_MS"
+SQL_LOG_ENV_VAR = "PLANIT_SQL_LOG"
+SQL_EXPLAIN_ENV_VAR = "PLANIT_SQL_EXPLAIN"
+DEFAULT_SLOW_QUERY_MS = 50.0
+DEFAULT_LOG_PATH = "planit-sql.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+EXPLAINED_KINDS = frozenset({"select", "insert", "update", "delete", "with", "replace"})
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PLACEHOLDER_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+# frames from these files are the database layer, not the caller we want
+_LAYER_FILES = (
+    os.path.join("database", "instrumented.py"),
+    os.path.join("database", "sql_trace.py"),
+)
+
+_logger = logging.getLogger("planit.sql")
+_logger.propagate = False
+_lock = threading.Lock()
+_explained: set = set()
+_enabled = False
+_threshold = DEFAULT_SLOW_QUERY_MS / 1000
+_explain = False
+
+
+def configure(
+    enabled: bool = True,
+    threshold_ms: float = DEFAULT_SLOW_QUERY_MS,
+    path: str = DEFAULT_LOG_PATH,
+    explain: bool = False,
+) -> None:
+    """(Re)configure tracing; replaces the log file handler."""
+    global _enabled, _threshold, _explain
+    with _lock:
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+            handler.close()
+        _explained.clear()
+        _enabled = enabled
+        _threshold = threshold_ms / 1000
+        _explain = explain
+        if enabled:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _logger.addHandler(handler)
+            _logger.setLevel(logging.INFO)
+
+
+def configure_from_env() -> None:
+    if os.getenv(SQL_TRACE_ENV_VAR) == "1":
+        configure(
+            threshold_ms=float(os.getenv(SLOW_QUERY_MS_ENV_VAR) or DEFAULT_SLOW_QUERY_MS),
+            path=os.getenv(SQL_LOG_ENV_VAR) or DEFAULT_LOG_PATH,
+            explain=os.getenv(SQL_EXPLAIN_ENV_VAR) == "1",
+        )
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def normalize(sql: str) -> str:
+    """Collapse whitespace and IN (?, ?, ...) lists, so batches share one shape."""
+    return _PLACEHOLDER_LIST_RE.sub("IN (?...)", _WHITESPACE_RE.sub(" ", sql).strip())
+
+
+def parameter_shape(parameters) -> object:
+    """Types (and lengths) of bound parameters, never their values."""
+    if isinstance(parameters, dict):
+        return {name: _value_shape(value) for name, value in parameters.items()}
+    return [_value_shape(value) for value in parameters or ()]
+
+
+def _value_shape(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _caller() -> Optional[str]:
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.endswith(_LAYER_FILES):
+            return f"{_short_path(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _short_path(filename: str) -> str:
+    root = str(Path(__file__).resolve().parent.parent) + os.sep
+    return filename[len(root):] if filename.startswith(root) else filename
+
+
+def record(
+    connection: sqlite3.Connection,
+    sql: str,
+    parameters,
+    seconds: float,
+    kind: str,
+    many: bool = False,
+) -> None:
+    """Log a statement if it was slow, and its plan if its shape is new."""
+    statement = None
+    if _explain and kind in EXPLAINED_KINDS:
+        statement = normalize(sql)
+        if statement not in _explained:
+            _explained.add(statement)
+            sample = parameters[0] if many and parameters else parameters
+            plan = _explain_plan(connection, sql, sample)
+            if plan:  # plain INSERT ... VALUES has no plan worth logging
+                _write({"event": "plan", "sql": statement, "plan": plan, "caller": _caller()})
+
+    if seconds < _threshold:
+        return
+    if many:
+        rows = len(parameters) if parameters is not None else 0
+        shape = {"rows": rows, "first": parameter_shape(parameters[0]) if rows else []}
+    else:
+        shape = parameter_shape(parameters)
+    _write({
+        "event": "slow",
+        "ms": round(seconds * 1000, 3),
+        "kind": kind,
+        "sql": statement or normalize(sql),
+        "params": shape,
+        "caller": _caller(),
+    })
+
+
+def _explain_plan(connection: sqlite3.Connection, sql: str, parameters) -> Optional[List[str]]:
+    # a plain cursor (the connection's cursor() would trace this statement too)
+    # with plain tuples (the connection's row_factory may build Tasks)
+    cursor = sqlite3.Cursor(connection)
+    cursor.row_factory = None
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters or ())
+        return [row[3] for row in cursor.fetchall()]
+    except sqlite3.Error:
+        return None  # e.g. statements referring to temp objects that are gone
+    finally:
+        cursor.close()
+
+
+def _write(entry: dict) -> None:
+    entry = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), **entry}
+    _logger.info(json.dumps(entry, separators=(",", ":")))
+
+
+# ---------- summary tool ----------
+
+def summarize(lines: Iterable[str]) -> List[dict]:
+    """Slow-log lines -> one entry per statement, by total time (largest first)."""
+    stats = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "callers": defaultdict(int)})
+    plans = {}
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if entry.get("event") == "plan":
+            plans[entry["sql"]] = entry["plan"]
+            continue
+        if entry.get("event") != "slow":
+            continue
+        item = stats[entry["sql"]]
+        item["count"] += 1
+        item["total_ms"] += entry["ms"]
+        item["max_ms"] = max(item["max_ms"], entry["ms"])
+        if entry.get("caller"):
+            item["callers"][entry["caller"]] += 1
+
+    ranked = []
+    for sql, item in stats.items():
+        callers = sorted(item["callers"].items(), key=lambda pair: -pair[1])
+        ranked.append({
+            "sql": sql,
+            "count": item["count"],
+            "total_ms": item["total_ms"],
+            "mean_ms": item["total_ms"] / item["count"],
+            "max_ms": item["max_ms"],
+            "callers": [caller for caller, _ in callers[:3]],
+            "plan": plans.get(sql),
+        })
+    ranked.sort(key=lambda item: item["total_ms"], reverse=True)
+    return ranked
+
+
+def _read_lines(paths: Iterable[str]) -> Iterable[str]:
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            yield from handle
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank logged SQL statements by total time")
+    parser.add_argument("logs", nargs="+", help="slow-query log files (rotated ones too)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the ranking as JSON")
+    args = parser.parse_args(argv)
+
+    ranked = summarize(_read_lines(args.logs))[:args.top]
+    if args.json:
+        print(json.dumps(ranked, indent=2))
+        return
+    print(f"{'#':>3} {'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}  statement")
+    for rank, item in enumerate(ranked, 1):
+        sql = item["sql"] if len(item["sql"]) <= 110 else item["sql"][:107] + "..."
+        print(f"{rank:>3} {item['count']:>7} {item['total_ms']:>10.1f} "
+              f"{item['mean_ms']:>9.2f} {item['max_ms']:>9.2f}  {sql}")
+        for caller in item["callers"]:
+            print(f"{'':>42}from {caller}")
+        for step in item["plan"] or ():
+            print(f"{'':>42}plan: {step}")
+
+
+configure_from_env()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Animation scheduling for TaskWindow.
+
+Every QPropertyAnimation/animation group the window starts goes through one
+AnimationScheduler, which keeps it alive until it finishes (so it is not
+garbage collected mid-flight) and enforces a few rules:
+
+* effects (button squish, sparkles) share a budget of MAX_EFFECTS running at
+  once; an effect over budget is skipped straight to its end state;
+* effects started with the same key are coalesced: starting a new sparkle
+  jumps the running one to its end (which deletes its label) first;
+* ambient animations (the looping mascot glow) run only while the window is
+  shown, not minimized, and the user has interacted with the app in the last
+  AMBIENT_IDLE_MS; otherwise they are paused, so an idle window does not wake
+  the event loop every frame;
+* reduced-motion mode (PLANIT_REDUCED_MOTION=1, or reduced_motion = True)
+  skips effects and stops ambient animations altogether.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Dict, List, Optional
+
+from gui.qt_compat import QtCore
+
+REDUCED_MOTION_ENV_VAR = "PLANIT_REDUCED_MOTION"
+MAX_EFFECTS = 6
+AMBIENT_IDLE_MS = 30_000
+
+_INPUT_EVENTS = frozenset({
+    QtCore.QEvent.MouseButtonPress,
+    QtCore.QEvent.MouseMove,
+    QtCore.QEvent.KeyPress,
+    QtCore.QEvent.Wheel,
+})
+_VISIBILITY_EVENTS = frozenset({
+    QtCore.QEvent.Show,
+    QtCore.QEvent.Hide,
+    QtCore.QEvent.WindowStateChange,
+})
+
+
+class AnimationScheduler(QtCore.QObject):
+    def __init__(self, window, reduced_motion: Optional[bool] = None):
+        super().__init__(window)
+        self._window = window
+        self._effects: List[QtCore.QAbstractAnimation] = []
+        self._keyed: Dict[str, QtCore.QAbstractAnimation] = {}
+        self._ambient: List[QtCore.QAbstractAnimation] = []
+        if reduced_motion is None:
+            reduced_motion = os.getenv(REDUCED_MOTION_ENV_VAR) == "1"
+        self._reduced_motion = reduced_motion
+        self._last_input = time.monotonic()
+
+        self._idle_timer = QtCore.QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self._check_idle)
+
+        window.installEventFilter(self)
+        app = QtCore.QCoreApplication.instance()
+        if app is not None:
+            # input anywhere in the app counts as activity, not just on the window
+            app.installEventFilter(self)
+
+    # ---------- public API ----------
+
+    @property
+    def reduced_motion(self) -> bool:
+        return self._reduced_motion
+
+    @reduced_motion.setter
+    def reduced_motion(self, enabled: bool) -> None:
+        self._reduced_motion = enabled
+        for anim in list(self._effects):
+            _skip_to_end(anim)
+        self._update_ambient()
+
+    def running_effects(self) -> int:
+        return len(self._effects)
+
+    def start_effect(self, anim: QtCore.QAbstractAnimation, key: Optional[str] = None) -> bool:
+        """
+        Start a one-shot effect. Returns False if it was skipped to its end
+        state (reduced motion or over budget) instead of being animated.
+        """
+        if key is not None:
+            self.finish(key)
+        self._effects.append(anim)
+        anim.finished.connect(lambda: self._forget(anim, key))
+        if key is not None:
+            self._keyed[key] = anim
+        anim.start()
+        if self._reduced_motion or len(self._effects) > MAX_EFFECTS:
+            _skip_to_end(anim)
+            return False
+        return True
+
+    def finish(self, key: str) -> None:
+        """Jump the running effect started with key (if any) to its end state."""
+        anim = self._keyed.pop(key, None)
+        if anim is not None:
+            _skip_to_end(anim)
+
+    def add_ambient(self, anim: QtCore.QAbstractAnimation) -> None:
+        """Register a looping background animation; the scheduler starts and pauses it."""
+        self._ambient.append(anim)
+        self._update_ambient()
+
+    def stop_all(self) -> None:
+        for anim in self._ambient:
+            anim.stop()
+        self._idle_timer.stop()
+        for anim in list(self._effects):
+            _skip_to_end(anim)
+
+    # ---------- internals ----------
+
+    def eventFilter(self, obj, event):
+        event_type = event.type()
+        if event_type in _INPUT_EVENTS:
+            self._last_input = time.monotonic()
+            if self._ambient and not self._ambient_running():
+                self._update_ambient()
+        elif obj is self._window and event_type in _VISIBILITY_EVENTS:
+            self._update_ambient()
+        return False
+
+    def _ambient_allowed(self) -> bool:
+        window = self._window
+        return (
+            not self._reduced_motion
+            and window.isVisible()
+            and not window.isMinimized()
+            and (time.monotonic() - self._last_input) * 1000 < AMBIENT_IDLE_MS
+        )
+
+    def _ambient_running(self) -> bool:
+        return any(a.state() == QtCore.QAbstractAnimation.Running for a in self._ambient)
+
+    def _update_ambient(self) -> None:
+        allowed = self._ambient_allowed()
+        for anim in self._ambient:
+            state = anim.state()
+            if allowed and state == QtCore.QAbstractAnimation.Paused:
+                anim.resume()
+            elif allowed and state == QtCore.QAbstractAnimation.Stopped:
+                anim.start()
+            elif not allowed and state == QtCore.QAbstractAnimation.Running:
+                anim.pause()
+        if allowed and self._ambient:
+            remaining = AMBIENT_IDLE_MS - (time.monotonic() - self._last_input) * 1000
+            self._idle_timer.start(max(int(remaining), 0) + 50)
+        else:
+            self._idle_timer.stop()
+
+    def _check_idle(self) -> None:
+        self._update_ambient()
+
+    def _forget(self, anim: QtCore.QAbstractAnimation, key: Optional[str]) -> None:
+        try:
+            self._effects.remove(anim)
+        except ValueError:
+            pass
+        if key is not None and self._keyed.get(key) is anim:
+            del self._keyed[key]
+
+
+def _skip_to_end(anim: QtCore.QAbstractAnimation) -> None:
+    # jumping a running animation to its end stops it and emits finished(),
+    # so cleanup handlers (e.g. deleting a sparkle label) still run
+    if anim.state() == QtCore.QAbstractAnimation.Stopped:
+        return
+    duration = anim.totalDuration()
+    if duration < 0:  # infinite loop
+        anim.stop()
+    else:
+        anim.setCurrentTime(duration)
@@ -0,0 +1,26 @@
+"""
+Button icons from qtawesome, loaded on first use.
+
+Importing qtawesome loads its icon fonts, which is one of the slowest steps of
+a cold start, so windows call set_icons() (the login window from an idle
+timer) instead of importing it at module level. Icons are optional: if
+qtawesome is missing or fails, buttons simply stay text-only.
+"""
+
+ICON_COLOR = "#7D55D9"
+
+_qta = None
+
+
+def set_icons(buttons, color: str = ICON_COLOR) -> bool:
+    """buttons: iterable of (QAbstractButton, icon name). Returns False if icons are unavailable."""
+    global _qta
+    try:
+        if _qta is None:
+            import qtawesome
+            _qta = qtawesome
+        for button, name in buttons:
+            button.setIcon(_qta.icon(name, color=color))
+    except Exception:
+        return False
+    return True
@@ -1,17 +1,24 @@
 from gui.qt_compat import QtWidgets, QtCore, QtGui
 from core import user_auth
-import qtawesome as qta
+from gui.icons import set_icons
+from gui.style import apply_theme
 from gui.sound_player import sound_player
 
 
 class LoginWindow(QtWidgets.QDialog):
     login_success = QtCore.pyqtSignal(dict)
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, auth=None, prepare=None):
         super().__init__(parent)
+        # core.user_auth, or a remote backend exposing login_user/register_user
+        self.auth = auth or user_auth
+        # called before every auth call, e.g. to finish deferred startup work
+        # (schema checks) that may still be queued when the user is quick
+        self._prepare = prepare
 
         # Object name so the stylesheet can target this dialog
         self.setObjectName("loginDialog")
+        apply_theme(self, "login")
 
         # Remove the Windows "?" help button
         self.setWindowFlags(self.windowFlags() & ~QtCore.Qt.WindowContextHelpButtonHint)
@@ -76,13 +83,12 @@ class LoginWindow(QtWidgets.QDialog):
         register_btn = QtWidgets.QPushButton(" Register")
         register_btn.setObjectName("loginSecondaryBtn")
 
-        # Cute icons
-        try:
-            purple = "#7D55D9"
-            login_btn.setIcon(qta.icon("fa5s.check", color=purple))
-            register_btn.setIcon(qta.icon("fa5s.user-plus", color=purple))
-        except Exception:
-            pass
+        # Cute icons, added once the dialog is up so qtawesome stays off the
+        # startup path
+        QtCore.QTimer.singleShot(0, lambda: set_icons([
+            (login_btn, "fa5s.check"),
+            (register_btn, "fa5s.user-plus"),
+        ]))
 
         btn_row.addWidget(login_btn)
         btn_row.addWidget(register_btn)
@@ -113,18 +119,22 @@ class LoginWindow(QtWidgets.QDialog):
     def _on_register(self):
         username = self.username_input.text().strip()
         password = self.password_input.text()
-        ok, msg, user_id = user_auth.register_user(username, password)
+        if self._prepare:
+            self._prepare()
+        ok, msg, user_id = self.auth.register_user(username, password)
         QtWidgets.QMessageBox.information(self, "Register", msg)
         if ok:
             # Optionally auto-login after register
-            success, _, user_data = user_auth.login_user(username, password)
+            success, _, user_data = self.auth.login_user(username, password)
             if success:
                 self._complete_login(user_data)
 
     def _on_login(self):
         username = self.username_input.text().strip()
         password = self.password_input.text()
-        ok, msg, user_data = user_auth.login_user(username, password)
+        if self._prepare:
+            self._prepare()
+        ok, msg, user_data = self.auth.login_user(username, password)
         if not ok:
             QtWidgets.QMessageBox.warning(self, "Login failed", msg)
             return
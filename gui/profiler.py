@@ -0,0 +1,249 @@
+"""
+Built-in profiler for chasing UI stalls in the field.
+
+Off by default. Press Ctrl+Alt+Shift+P in the task window to start it and
+again to stop it, or launch with PLANIT_PROFILE=1 to profile from the start
+(the report is then written on exit). While it runs:
+
+* every section() (refresh, selecting and ticking tasks, the New / Edit /
+  Share / Delete handlers and the dialogs' own buttons) runs under cProfile,
+  one profile per section name. Nested sections are billed to the outermost
+  one, whose profile already contains them;
+* a lag monitor beats a timer on the GUI thread every HEARTBEAT_MS. When a
+  beat is PLANIT_PROFILE_LAG_MS late (default 200), a watchdog thread grabs
+  the GUI thread's stack: that is the call that froze the window. A modal
+  dialog waiting for input is not a stall, its event loop keeps beating
+  (a handler that waits on a message box does count that time, though).
+
+Stopping writes a plain-text report, planit-profile-<time>.txt in
+PLANIT_PROFILE_DIR (default: the working directory): time per section, each
+stall with its stack and the open sections, then the top functions of each
+section by cumulative time. It has function names and source lines, never
+task data.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from gui.qt_compat import QtCore
+
+PROFILE_ENV_VAR = "PLANIT_PROFILE"
+PROFILE_LAG_MS_ENV_VAR = "PLANIT_PROFILE_LAG_MS"
+PROFILE_DIR_ENV_VAR = "PLANIT_PROFILE_DIR"
+TOGGLE_SHORTCUT = "Ctrl+Alt+Shift+P"
+DEFAULT_LAG_MS = 200.0
+HEARTBEAT_MS = 50
+MAX_STALLS = 200  # a window that keeps freezing should not fill the disk
+REPORT_TOP_FUNCTIONS = 25
+
+_active = False
+_started_at = 0.0
+_report_dir: Optional[Path] = None
+_monitor: Optional["LagMonitor"] = None
+_profiles: Dict[str, cProfile.Profile] = {}
+_timings: Dict[str, List[float]] = {}  # name -> [calls, total seconds, max seconds]
+_open: List[str] = []  # section stack of the GUI thread, read by the watchdog
+
+
+class _Section:
+    __slots__ = ("name", "profile", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.profile = None
+        if not _open:
+            self.profile = _profiles.get(self.name)
+            if self.profile is None:
+                self.profile = _profiles[self.name] = cProfile.Profile()
+            self.profile.enable()
+        _open.append(self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        if self.profile is not None:
+            self.profile.disable()
+        if _open:
+            _open.pop()
+        if _active:
+            timing = _timings.setdefault(self.name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+        return False
+
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class LagMonitor(QtCore.QObject):
+    """Records event-loop stalls of at least threshold_ms, with the GUI thread's stack."""
+
+    def __init__(self, threshold_ms: float = DEFAULT_LAG_MS, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.stalls: List[dict] = []
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._stalled_beat = None  # the beat the current stall is waiting behind
+        self._stall: Optional[dict] = None  # its entry in stalls, if one was kept
+        self._gui_ident = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(HEARTBEAT_MS)
+        self._timer.timeout.connect(self._on_beat)
+
+    def start(self) -> None:
+        """Start beating; call from the GUI thread."""
+        self._gui_ident = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._timer.start()
+        self._thread = threading.Thread(target=self._watch, name="planit-lag-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _on_beat(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._stall is not None:
+                # the stall is over: now we know how long it really was
+                self._stall["ms"] = (now - self._beat) * 1000 - HEARTBEAT_MS
+                self._stall = None
+            self._beat = now
+
+    def _watch(self):
+        while not self._stop.wait(HEARTBEAT_MS / 2000):
+            with self._lock:
+                beat = self._beat
+                late = time.monotonic() - beat - HEARTBEAT_MS / 1000
+                if late < self.threshold or self._stalled_beat == beat:
+                    continue
+                self._stalled_beat = beat
+                if len(self.stalls) >= MAX_STALLS:
+                    continue
+                frame = sys._current_frames().get(self._gui_ident)
+                self._stall = {
+                    "at": time.strftime("%H:%M:%S"),
+                    "ms": late * 1000,
+                    "sections": list(_open),
+                    "stack": traceback.format_stack(frame) if frame is not None else [],
+                }
+                self.stalls.append(self._stall)
+
+
+# ---------- switching on and off ----------
+
+def is_active() -> bool:
+    return _active
+
+
+def section(name: str):
+    """Context manager profiling a GUI handler under name (no-op when off)."""
+    if not _active:
+        return _NULL_SECTION
+    return _Section(name)
+
+
+def start(lag_ms: Optional[float] = None, report_dir: Optional[str] = None) -> None:
+    """Start profiling sections and watching for stalls; call from the GUI thread."""
+    global _active, _started_at, _report_dir, _monitor
+    if _active:
+        return
+    if lag_ms is None:
+        lag_ms = float(os.getenv(PROFILE_LAG_MS_ENV_VAR) or DEFAULT_LAG_MS)
+    _report_dir = Path(report_dir or os.getenv(PROFILE_DIR_ENV_VAR) or ".")
+    _profiles.clear()
+    _timings.clear()
+    _started_at = time.time()
+    _monitor = LagMonitor(lag_ms)
+    _monitor.start()
+    _active = True
+
+
+def stop() -> Optional[Path]:
+    """Stop profiling and write the report; returns its path (None if it was not running)."""
+    global _active, _monitor
+    if not _active:
+        return None
+    _active = False
+    _monitor.stop()
+    path = _report_dir / time.strftime("planit-profile-%Y%m%d-%H%M%S.txt", time.localtime(_started_at))
+    path.write_text(_report(_monitor), encoding="utf-8")
+    _monitor = None
+    return path
+
+
+def toggle() -> Optional[Path]:
+    """Start if stopped, else stop; reports what happened on stderr."""
+    if not _active:
+        start()
+        print(f"profiler: on (stalls over {_monitor.threshold * 1000:.0f} ms are recorded)", file=sys.stderr)
+        return None
+    path = stop()
+    print(f"profiler: report written to {path}", file=sys.stderr)
+    return path
+
+
+def start_from_env() -> None:
+    if os.getenv(PROFILE_ENV_VAR) == "1":
+        start()
+
+
+# ---------- report ----------
+
+def _report(monitor: LagMonitor) -> str:
+    elapsed = time.time() - _started_at
+    lines = [
+        f"PlanIt profile, {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(_started_at))}, "
+        f"{elapsed:.1f} s",
+        "",
+        f"{'section':<28} {'calls':>6} {'total ms':>10} {'max ms':>9}",
+    ]
+    for name, (calls, total, longest) in sorted(_timings.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<28} {calls:>6} {total * 1000:>10.1f} {longest * 1000:>9.1f}")
+
+    lines += ["", f"{len(monitor.stalls)} stall(s) over {monitor.threshold * 1000:.0f} ms"]
+    for stall in sorted(monitor.stalls, key=lambda s: -s["ms"]):
+        where = " > ".join(stall["sections"]) or "outside profiled sections"
+        lines += ["", f"--- {stall['at']}  {stall['ms']:.0f} ms  in {where}"]
+        lines += [line.rstrip("\n") for line in stall["stack"]]
+
+    for name, profile in _profiles.items():
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        if not stats.total_calls:
+            continue
+        stats.sort_stats("cumulative").print_stats(REPORT_TOP_FUNCTIONS)
+        lines += ["", f"=== {name}", out.getvalue().strip("\n")]
+    return "\n".join(lines) + "\n"
@@ -1,10 +1,12 @@
 """Compatibility shim: prefer PyQt5, fall back to PySide6 if needed."""
+import importlib
+
 try:
-    from PyQt5 import QtWidgets, QtCore, QtGui, QtMultimedia
+    from PyQt5 import QtWidgets, QtCore, QtGui
     backend = "PyQt5"
 except Exception:
     try:
-        from PySide6 import QtWidgets, QtCore, QtGui, QtMultimedia
+        from PySide6 import QtWidgets, QtCore, QtGui
         backend = "PySide6"
     except Exception:
         raise ImportError("Requires PyQt5 or PySide6. Install with 'pip install PyQt5' or 'pip install PySide6'.")
@@ -15,4 +17,15 @@ if not hasattr(QtCore, "pyqtSignal") and hasattr(QtCore, "Signal"):
 if not hasattr(QtCore, "pyqtSlot") and hasattr(QtCore, "Slot"):
     QtCore.pyqtSlot = QtCore.Slot
 
+
+def __getattr__(name):
+    # QtMultimedia is slow to load (it pulls in the platform audio stack), so it
+    # is imported on first access instead of with the rest of Qt.
+    if name == "QtMultimedia":
+        module = importlib.import_module(f"{backend}.QtMultimedia")
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = ["QtWidgets", "QtCore", "QtGui", "QtMultimedia", "backend"]
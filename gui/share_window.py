@@ -1,14 +1,16 @@
 from gui.qt_compat import QtWidgets
-from database.models import User
 from core import task_manager
+from gui import profiler
+from gui.icons import set_icons
 from gui.sound_player import sound_player
 
 
 class ShareDialog(QtWidgets.QDialog):
-    def __init__(self, task_id, owner_id, parent=None):
+    def __init__(self, task_id, owner_id, parent=None, backend=None):
         super().__init__(parent)
         self.task_id = task_id
         self.owner_id = owner_id
+        self.backend = backend or task_manager
         self.setWindowTitle("Share Task")
         self.resize(320, 110)
 
@@ -16,7 +18,6 @@ class ShareDialog(QtWidgets.QDialog):
         self.username_input.setObjectName("shareUsername")
         self.username_input.setPlaceholderText("Username to share with")
 
-        import qtawesome as qta
         share_btn = QtWidgets.QPushButton("Share")
         share_btn.setObjectName("shareBtn")
 
@@ -25,20 +26,20 @@ class ShareDialog(QtWidgets.QDialog):
         layout.addWidget(share_btn)
         self.setLayout(layout)
 
-        try:
-            purple = '#7D55D9'
-            share_btn.setIcon(qta.icon('fa5s.share-alt', color=purple))
-        except Exception:
-            pass
+        set_icons([(share_btn, 'fa5s.share-alt')])
         share_btn.clicked.connect(self._on_share)
 
     def _on_share(self):
+        with profiler.section("share.share"):
+            self._share()
+
+    def _share(self):
         username = self.username_input.text().strip().lower()
-        user = User.get_by_username(username)
+        user = self.backend.find_user(username)
         if not user:
             QtWidgets.QMessageBox.warning(self, "Error", "User not found")
             return
-        ok, msg = task_manager.share_task_with_user(self.task_id, self.owner_id, user['user_id'])
+        ok, msg = self.backend.share_task_with_user(self.task_id, self.owner_id, user['user_id'])
         QtWidgets.QMessageBox.information(self, "Share", msg)
         if ok:
             sound_player.play("sharetask.mp3")
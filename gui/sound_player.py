@@ -1,50 +1,231 @@
+"""
+Sound effects.
+
+Sound files and the audio backend are resolved once. With pygame installed,
+every effect is decoded into an in-memory PCM buffer (preload(), run at idle
+time during startup) and played through one long-lived pygame.mixer output
+with MIXER_CHANNELS voices, so an effect starts within a few milliseconds and
+nothing is spawned per click. Without pygame (or without an audio device) it
+falls back to a system player (afplay/ffplay/mpg123) and then QtMultimedia,
+as before.
+
+Every play goes through a small scheduler, whatever the backend:
+
+* a repeat of a sound within its policy's min_interval is merged into the
+  play that just started (rapid ticking gives one "ding", not ten);
+* each sound has at most max_voices overlapping plays; beyond that the new
+  play is dropped, or for on_limit="restart" the oldest one is cut off;
+* at most MAX_VOICES sounds play at once in total;
+* finished system-player processes are reaped (polled) on every play and by
+  a timer while any are still running, so none are left as zombies; a
+  stopped one is terminated without waiting and reaped the same way.
+"""
+
 from __future__ import annotations
 
+import os
 import platform
 import shutil
 import subprocess
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Optional
+
+from gui import qt_compat
+from gui.qt_compat import QtCore
+
+MIXER_FREQUENCY = 44100
+MIXER_BUFFER = 512  # frames; ~12 ms at 44.1 kHz
+MIXER_CHANNELS = 8
+MAX_VOICES = 6  # sounds playing at once, across all backends
+REAP_INTERVAL_MS = 500
+KILL_AFTER_SECONDS = 1.0  # a stopped player process that ignores SIGTERM gets SIGKILL
+
+
+@dataclass(frozen=True)
+class SoundPolicy:
+    max_voices: int = 2
+    min_interval: float = 0.0  # seconds; closer repeats merge into the last play
+    on_limit: str = "drop"  # or "restart": stop the oldest voice and play again
 
-from gui.qt_compat import QtCore, QtMultimedia
+
+DEFAULT_POLICY = SoundPolicy()
+POLICIES = {
+    "onetask.mp3": SoundPolicy(max_voices=2, min_interval=0.1),
+    "completedall.mp3": SoundPolicy(max_voices=1, min_interval=0.5, on_limit="restart"),
+    "createtask.mp3": SoundPolicy(max_voices=1, min_interval=0.1, on_limit="restart"),
+    "deletetask.mp3": SoundPolicy(max_voices=1, min_interval=0.1, on_limit="restart"),
+    "welcome.mp3": SoundPolicy(max_voices=1, on_limit="drop"),
+    "goodbye.mp3": SoundPolicy(max_voices=1, on_limit="drop"),
+}
 
 
 class SoundPlayer:
-    def __init__(self):
+    def __init__(self, policies: Optional[dict] = None, clock: Callable[[], float] = time.monotonic):
         base_dir = Path(__file__).resolve().parent.parent
         sound_dir = base_dir / "sound"
         if not sound_dir.exists():
             sound_dir = base_dir / "sounds"
         self._sound_dir = sound_dir if sound_dir.exists() else None
-        self._players: dict[str, QtMultimedia.QMediaPlayer] = {}
+        # QMediaPlayer per sound; QtMultimedia is only imported for the first one
+        self._players: dict[str, object] = {}
         self._fallbacks = {
             "onetask.mp3": ["done.mp3"],
             "completedall.mp3": ["Completed.mp3", "done.mp3"],
             "deletetask.mp3": ["delete.mp3"],
             "createtask.mp3": ["done.mp3"],
-            "sharetask.mp3": ["done.mp3"],
+            "sharetask.mp3": ["sharing.mp3", "done.mp3"],
         }
+        self._paths: dict[str, Optional[Path]] = {}  # requested name -> file found
+        self._sounds: dict[Path, object] = {}  # decoded pygame Sounds
+        self._mixer = None  # pygame.mixer once initialised, False if unavailable
+        self._native: Optional[str] = None  # system player command, "" if none
+        self._policies = POLICIES if policies is None else policies
+        self._clock = clock
+        self._voices: dict[str, list] = {}  # sound file name -> live voices, oldest first
+        self._last_start: dict[str, float] = {}
+        self._stopped: list = []  # process voices cut off early, until they exit
+        self._reap_scheduled = False
+
+    @property
+    def backend(self) -> str:
+        """'mixer', 'native', 'qt' or 'none' (resolves the backend if needed)."""
+        if self._mixer_ready():
+            return "mixer"
+        if self._native_player():
+            return "native"
+        return "qt" if self._sound_dir else "none"
+
+    def preload(self) -> int:
+        """Decode every sound file into memory. Returns the number of sounds loaded."""
+        if not self._sound_dir or not self._mixer_ready():
+            return 0
+        for path in sorted(self._sound_dir.glob("*.mp3")):
+            self._decoded(path)
+        return len(self._sounds)
 
     def play(self, filename: str) -> bool:
-        """Play a sound from the project's sound directory."""
-        if not self._sound_dir:
+        """
+        Play a sound from the project's sound directory. Returns True if it is
+        audible (including when merged into a play that just started).
+        """
+        sound_path = self._resolve(filename)
+        if sound_path is None:
+            return False
+
+        name = sound_path.name
+        policy = self._policies.get(name, DEFAULT_POLICY)
+        now = self._clock()
+        self.reap()
+        voices = self._voices.setdefault(name, [])
+        if voices and now - self._last_start.get(name, float("-inf")) < policy.min_interval:
+            return True
+
+        if len(voices) >= policy.max_voices or self.voice_count() >= MAX_VOICES:
+            if policy.on_limit != "restart" or not voices:
+                return False
+            oldest = voices.pop(0)
+            oldest.stop()
+            if isinstance(oldest, _ProcessVoice):
+                self._stopped.append(oldest)  # reaped by the timer, not waited for
+
+        voice = self._start(sound_path)
+        if voice is None:
             return False
+        voices.append(voice)
+        self._last_start[name] = now
+        if isinstance(voice, _ProcessVoice):
+            self._schedule_reap()
+        return True
+
+    def voice_count(self) -> int:
+        return sum(len(voices) for voices in self._voices.values())
+
+    def reap(self) -> None:
+        """Forget finished voices (and wait() on finished player processes)."""
+        for name, voices in self._voices.items():
+            if voices:
+                self._voices[name] = [voice for voice in voices if voice.alive()]
+        if self._stopped:
+            self._stopped = [voice for voice in self._stopped if voice.alive()]
+
+    def _start(self, sound_path: Path):
+        if self._mixer_ready():
+            sound = self._decoded(sound_path)
+            if sound is not None:
+                channel = sound.play()
+                return _MixerVoice(channel, sound) if channel is not None else None
+
+        process = self._play_native(sound_path)
+        if process is not None:
+            return _ProcessVoice(process)
+
+        player = self._play_qt(sound_path.name, sound_path)
+        return _QtVoice(player) if player is not None else None
+
+    def _schedule_reap(self) -> None:
+        # finished processes stay zombies until polled, so keep polling while
+        # any are running (only possible once the Qt event loop exists)
+        if self._reap_scheduled or QtCore.QCoreApplication.instance() is None:
+            return
+        self._reap_scheduled = True
+        QtCore.QTimer.singleShot(REAP_INTERVAL_MS, self._reap_tick)
+
+    def _reap_tick(self) -> None:
+        self._reap_scheduled = False
+        self.reap()
+        if self._stopped or any(
+            isinstance(v, _ProcessVoice) for vs in self._voices.values() for v in vs
+        ):
+            self._schedule_reap()
 
-        candidates = [filename] + self._fallbacks.get(filename, [])
-        for name in candidates:
-            sound_path = self._sound_dir / name
-            if not sound_path.exists():
-                continue
+    def _resolve(self, filename: str) -> Optional[Path]:
+        if filename not in self._paths:
+            found = None
+            if self._sound_dir:
+                for name in [filename] + self._fallbacks.get(filename, []):
+                    if (self._sound_dir / name).exists():
+                        found = self._sound_dir / name
+                        break
+            self._paths[filename] = found
+        return self._paths[filename]
 
-            if self._play_native(sound_path):
-                return True
+    def _mixer_ready(self) -> bool:
+        if self._mixer is None:
+            self._mixer = False
+            os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+            try:
+                from pygame import mixer
+                mixer.pre_init(MIXER_FREQUENCY, -16, 2, MIXER_BUFFER)
+                mixer.init()
+                mixer.set_num_channels(MIXER_CHANNELS)
+                self._mixer = mixer
+            except Exception:
+                pass  # no pygame or no audio device: use the fallbacks
+        return bool(self._mixer)
 
-            if self._play_qt(name, sound_path):
-                return True
+    def _decoded(self, sound_path: Path):
+        sound = self._sounds.get(sound_path)
+        if sound is None:
+            try:
+                sound = self._sounds[sound_path] = self._mixer.Sound(str(sound_path))
+            except Exception:
+                return None
+        return sound
 
-        return False
+    def _native_player(self) -> str:
+        if self._native is None:
+            candidates = []
+            if platform.system() == "Darwin":
+                candidates.append("afplay")
+            candidates.extend(["ffplay", "mpg123"])
+            self._native = next((p for p in candidates if shutil.which(p)), "")
+        return self._native
 
     def _create_player(self):
         try:
+            QtMultimedia = qt_compat.QtMultimedia
             player = QtMultimedia.QMediaPlayer()
         except Exception:
             return None
@@ -53,7 +234,7 @@ class SoundPlayer:
             audio = QtMultimedia.QAudioOutput()
             audio.setVolume(1.0)
             player.setAudioOutput(audio)
-            player._audio_output = audio  
+            player._audio_output = audio
         else:
             try:
                 player.setVolume(100)
@@ -61,58 +242,115 @@ class SoundPlayer:
                 pass
         return player
 
-    def _play_qt(self, cache_key: str, sound_path: Path) -> bool:
+    def _play_qt(self, cache_key: str, sound_path: Path):
         url = QtCore.QUrl.fromLocalFile(str(sound_path))
         player = self._players.get(cache_key)
         if player is None:
             player = self._create_player()
             if player is None:
-                return False
+                return None
+            try:
+                self._set_source(player, url)
+            except Exception:
+                return None
             self._players[cache_key] = player
 
         try:
-            self._set_source(player, url)
-            player.stop()
+            # the source is set once; a replay only rewinds the same player
+            player.setPosition(0)
             player.play()
-            return True
+            return player
         except Exception:
-            return False
+            return None
 
-    def _play_native(self, sound_path: Path) -> bool:
+    def _play_native(self, sound_path: Path) -> Optional[subprocess.Popen]:
         """Use lightweight system player (helps on macOS)."""
-        candidates = []
-        if platform.system() == "Darwin":
-            candidates.append("afplay")
-        candidates.extend(["ffplay", "mpg123"])
-
-        player = next((p for p in candidates if shutil.which(p)), None)
+        player = self._native_player()
         if not player:
-            return False
+            return None
 
         try:
             if player == "ffplay":
-                subprocess.Popen(
+                return subprocess.Popen(
                     [player, "-nodisp", "-autoexit", str(sound_path)],
                     stdout=subprocess.DEVNULL,
                     stderr=subprocess.DEVNULL,
                 )
-            else:
-                subprocess.Popen(
-                    [player, str(sound_path)],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                )
-            return True
+            return subprocess.Popen(
+                [player, str(sound_path)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
         except Exception:
-            return False
+            return None
 
     @staticmethod
     def _set_source(player, url: QtCore.QUrl):
         if hasattr(player, "setSource"):
             player.setSource(url)
         else:
-            content = QtMultimedia.QMediaContent(url)
+            content = qt_compat.QtMultimedia.QMediaContent(url)
             player.setMedia(content)
 
 
+class _MixerVoice:
+    __slots__ = ("channel", "sound")
+
+    def __init__(self, channel, sound):
+        self.channel = channel
+        self.sound = sound
+
+    def alive(self) -> bool:
+        # the channel may have been reused for another sound since
+        return self.channel.get_busy() and self.channel.get_sound() is self.sound
+
+    def stop(self) -> None:
+        if self.alive():
+            self.channel.stop()
+
+
+class _ProcessVoice:
+    __slots__ = ("process", "stopped_at")
+
+    def __init__(self, process: subprocess.Popen):
+        self.process = process
+        self.stopped_at: Optional[float] = None
+
+    def alive(self) -> bool:
+        if self.process.poll() is not None:  # poll() also reaps a finished child
+            return False
+        if self.stopped_at is not None and time.monotonic() - self.stopped_at >= KILL_AFTER_SECONDS:
+            self.process.kill()
+            self.stopped_at = None
+        return True
+
+    def stop(self) -> None:
+        # no wait() here (this runs on the GUI thread); the reaping timer
+        # collects the process, and kills it if it ignores the terminate
+        if self.alive():
+            self.process.terminate()
+            self.stopped_at = time.monotonic()
+
+
+class _QtVoice:
+    __slots__ = ("player",)
+
+    def __init__(self, player):
+        self.player = player
+
+    def alive(self) -> bool:
+        try:
+            if hasattr(self.player, "playbackState"):  # Qt 6
+                return self.player.playbackState() == self.player.PlaybackState.PlayingState
+            return self.player.state() == self.player.PlayingState
+        except Exception:
+            return False
+
+    def stop(self) -> None:
+        try:
+            self.player.stop()
+        except Exception:
+            pass
+
+
 sound_player = SoundPlayer()
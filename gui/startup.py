@@ -0,0 +1,108 @@
+"""
+Deferred startup work for the desktop app.
+
+main.py shows the login window as early as it can. Everything the login
+window does not need (schema checks, TaskWindow and its imports, qtawesome,
+decoding sound effects) is registered with Startup.defer() and run one step per
+event-loop turn once the window is up, or all at once by finish() if the user
+gets ahead of it (e.g. logs in before idle time came around).
+
+Set PLANIT_STARTUP_REPORT=1 to print a timeline to stderr, in the spirit of
+python -X importtime: one line per phase with its own and cumulative time and
+the top-level packages it imported.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import traceback
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from gui.qt_compat import QtCore, QtWidgets
+
+STARTUP_REPORT_ENV_VAR = "PLANIT_STARTUP_REPORT"
+
+
+class Startup:
+    def __init__(
+        self,
+        started_at: Optional[float] = None,
+        modules: Optional[Iterable[str]] = None,
+        report: Optional[bool] = None,
+    ):
+        # started_at / modules: time.perf_counter() and sys.modules taken as the
+        # first thing in main.py, so its own imports show up in the report
+        self._started_at = time.perf_counter() if started_at is None else started_at
+        self._last_at = self._started_at
+        self._last_modules = set(sys.modules if modules is None else modules)
+        self._phases: List[Tuple[str, float, float, List[str]]] = []
+        self._pending: List[Tuple[str, Callable[[], object], bool]] = []
+        self._report = os.getenv(STARTUP_REPORT_ENV_VAR) == "1" if report is None else report
+        self._reported = False
+
+    def mark(self, phase: str) -> None:
+        """Close the current phase: everything since the previous mark is billed to it."""
+        now = time.perf_counter()
+        modules = set(sys.modules)
+        packages = sorted({name.split(".")[0] for name in modules - self._last_modules})
+        self._phases.append((phase, now - self._last_at, now - self._started_at, packages))
+        self._last_at = now
+        self._last_modules = modules
+
+    def defer(self, name: str, step: Callable[[], object], required: bool = False) -> None:
+        """
+        Run step later. A failing optional step (icons, audio) is reported on
+        stderr and skipped; a failing required one (the database schema) stops
+        the app with an error dialog, since nothing after it can work.
+        """
+        self._pending.append((name, step, required))
+
+    def run_when_idle(self) -> None:
+        """Start working through deferred steps from the event loop."""
+        QtCore.QTimer.singleShot(0, self._run_next)
+
+    def finish(self) -> None:
+        """Run every remaining deferred step now (cheap when already done)."""
+        while self._pending:
+            self._run_step()
+
+    def report(self) -> str:
+        lines = [f"{'startup phase':<30} {'self ms':>8} {'total ms':>9}  imported"]
+        for phase, own, total, packages in self._phases:
+            imported = ", ".join(packages[:8]) + (" ..." if len(packages) > 8 else "")
+            lines.append(f"{phase:<30} {own * 1000:>8.1f} {total * 1000:>9.1f}  {imported}")
+        return "\n".join(lines)
+
+    def _run_next(self) -> None:
+        if self._pending:
+            self._run_step()
+        if self._pending:
+            QtCore.QTimer.singleShot(0, self._run_next)
+
+    def _fatal(self, name: str, exc: Exception) -> None:
+        traceback.print_exc()
+        if isinstance(QtCore.QCoreApplication.instance(), QtWidgets.QApplication):
+            QtWidgets.QMessageBox.critical(
+                None, "PlanIt", f"PlanIt could not start ({name} failed):\n\n{exc}"
+            )
+        # SystemExit leaves a Qt slot cleanly (and the event loop with it)
+        raise SystemExit(1) from exc
+
+    def _run_step(self) -> None:
+        name, step, required = self._pending.pop(0)
+        # bill whatever the event loop did since the last step (painting,
+        # timers such as the login icons) to its own line
+        if time.perf_counter() - self._last_at >= 0.001:
+            self.mark("event loop")
+        try:
+            step()
+        except Exception as exc:
+            if required:
+                self._fatal(name, exc)
+            print(f"Deferred startup step '{name}' failed: {exc}", file=sys.stderr)
+        self.mark(f"deferred: {name}")
+        if not self._pending and self._report and not self._reported:
+            self._reported = True
+            print(self.report(), file=sys.stderr)
@@ -1,10 +1,45 @@
-def get_stylesheet():
-    """Return a pastel, soft lavender stylesheet for the app.
-
-    The stylesheet aims for a kawaii / pastel aesthetic: light lavender
-    background, rounded boxes, thin purple outlines, and soft gradients.
-    """
-    return r'''
+"""
+Themes for the PlanIt GUI.
+
+The pastel stylesheet is split into chunks, one per part of the UI, and each
+chunk is applied only to the widget that needs it (see SCOPES) instead of
+setting one app-wide sheet that every widget, including every list row, is
+matched against:
+
+* "app"       – QApplication: fonts, buttons, inputs, labels
+* "login"     – LoginWindow
+* "main"      – TaskWindow (and the dialogs it opens, which inherit it)
+* "task_list" – the task QListWidget
+
+Qt prefers a widget's own style sheet over inherited ones regardless of
+selector specificity, so all rules for one widget type live in one chunk.
+
+compile_stylesheet() strips comments and whitespace and caches the result
+per (scope, theme); apply_theme() skips widgets that already carry the
+compiled sheet, so Qt only re-parses when the theme actually changes.
+
+The "lightweight" theme is derived from the pastel one: gradients become the
+solid colour of their last stop, letter spacing is dropped and
+list rows lose their card margins and rounded corners, which makes large
+lists much cheaper to paint. Choose it with PLANIT_THEME=lightweight; by
+default the task list switches to it on its own above
+LIGHTWEIGHT_LIST_THRESHOLD tasks.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from functools import lru_cache
+from typing import Optional
+
+THEME_ENV_VAR = "PLANIT_THEME"
+THEMES = ("pastel", "lightweight")
+DEFAULT_THEME = "pastel"
+LIGHTWEIGHT_LIST_THRESHOLD = 500
+
+# fonts, buttons, inputs and labels used everywhere
+_BASE = r'''
 /* GLOBAL LOGIN-STYLE FONT APPLIED TO ENTIRE APP */
 QWidget, QMainWindow, QDialog, QLabel, QPushButton, QLineEdit, QTextEdit, QListWidget, QListWidget::item {
   font-family: "Segoe UI Semilight", "Segoe UI", "Helvetica Neue", Arial;
@@ -13,32 +48,6 @@ QWidget, QMainWindow, QDialog, QLabel, QPushButton, QLineEdit, QTextEdit, QListW
   letter-spacing: 0.3px;            /* subtle cute spacing */
 }
 
-/* 🌌 Aurora Lights only on the main window background */
-QMainWindow {
-    background:
-        qlineargradient(
-            x1:0, y1:0,
-            x2:1, y2:1,
-            stop:0   rgba(190, 255, 110, 0.25),
-            stop:0.35 rgba(155, 120, 255, 0.32),
-            stop:0.6 rgba(255, 235, 255, 0.30),
-            stop:1   rgba(205, 175, 255, 0.28)
-        );
-}
-
-/* Subtle textured look using radial gradient overlay on main widgets */
-QWidget::before {
-  /* Not a real pseudo-element; kept for reference if using custom painting */
-}
-
-QListWidget#todoList {
-    background: qlineargradient(spread:pad, x1:0, y1:0, x2:0, y2:1,
-        stop:0 #ffffff,
-        stop:1 #faf6ff);     /* soft lavender tint */
-    border: 1px solid rgba(170, 120, 255, 0.25);
-    border-radius: 18px;
-}
-
 /* Frosted-glass panel for the details area */
 QTextEdit {
   background: qlineargradient(
@@ -60,24 +69,6 @@ QLineEdit {
   padding: 6px 10px;
 }
 
-/* List items styled as soft cards */
-QListWidget::item {
-  background: transparent;
-  margin: 6px;
-  padding: 10px;
-  border-radius: 10px;
-}
-QListWidget::item:selected {
-  background: qlineargradient(spread:pad, x1:0, y1:0, x2:1, y2:0, stop:0 #f6ecff, stop:1 #efe0ff);
-  border: 1px solid rgba(170,120,255,0.5);
-  color: #3a2b4a; /* dark lavender text for readability on selection */
-}
-
-/* Make the list area look like stacked cards */
-QListWidget {
-  outline: none;
-}
-
 /* LOGIN STYLE BUTTONS — APPLIED GLOBALLY */
 QPushButton {
   background: qlineargradient(spread:pad, x1:0, y1:0, x2:0, y2:1,
@@ -138,6 +129,45 @@ QLabel#panelTitle {
   margin-bottom: 6px;
 }
 
+QTextEdit {
+    margin: 12px;
+}
+
+/* Bigger details panel text (meta + description) */
+QTextEdit {
+    font-size: 13pt;
+    line-height: 1.35;
+}
+'''
+
+# the task list and its rows
+_TASK_LIST = r'''
+QListWidget#todoList {
+    background: qlineargradient(spread:pad, x1:0, y1:0, x2:0, y2:1,
+        stop:0 #ffffff,
+        stop:1 #faf6ff);     /* soft lavender tint */
+    border: 1px solid rgba(170, 120, 255, 0.25);
+    border-radius: 18px;
+}
+
+/* List items styled as soft cards */
+QListWidget::item {
+  background: transparent;
+  margin: 6px;
+  padding: 10px;
+  border-radius: 10px;
+}
+QListWidget::item:selected {
+  background: qlineargradient(spread:pad, x1:0, y1:0, x2:1, y2:0, stop:0 #f6ecff, stop:1 #efe0ff);
+  border: 1px solid rgba(170,120,255,0.5);
+  color: #3a2b4a; /* dark lavender text for readability on selection */
+}
+
+/* Make the list area look like stacked cards */
+QListWidget {
+  outline: none;
+}
+
 /* --- FIX: VISIBLE PURPLE CHECKBOXES IN TASK LIST --- */
 QListWidget#todoList QCheckBox::indicator {
     width: 18px;
@@ -152,6 +182,40 @@ QListWidget#todoList QCheckBox::indicator:checked {
     border-color: #b07bff;
 }
 
+/* List + details white blocks get extra spacing away from edges */
+QListWidget#todoList {
+    margin: 12px;
+}
+
+/* ================================
+   To-Do List Item & Details Text
+   ================================*/
+
+/* Bigger task list text */
+QListWidget#todoList {
+    font-size: 14pt;
+    font-family: "Segoe UI Semilight";
+}
+
+/* Text specifically inside list items */
+QListWidget#todoList::item {
+    font-size: 14pt;
+    padding: 10px;
+}
+
+/* When selected */
+QListWidget#todoList::item:selected {
+    font-size: 14pt;
+}
+
+/* Checkbox label text size inside list */
+QListWidget#todoList QCheckBox {
+    font-size: 14pt;
+}
+'''
+
+# LoginWindow only
+_LOGIN = r'''
 /* ================================
    Login Dialog
    ================================*/
@@ -229,7 +293,10 @@ QPushButton#loginSecondaryBtn:hover {
   border-color: #b9ff5a;        /* same PlanIt green accent */
   color: #4b2f78;               /* keep the same purple text */
 }
+'''
 
+# New / Edit / Share dialogs
+_DIALOG = r'''
 /* ================================
    ✨ PlanIt Dialog Theme
    (Used for New Task, Edit Task, Share)
@@ -281,10 +348,30 @@ QDialog QPushButton:hover {
     background: #f4ffe6;                         /* soft green glow */
 }
 
+QDialog QPushButton:pressed {
+    background: #e4d4ff;
+}
+
 /* Make dialog look less cramped */
 QDialog QWidget {
     margin-top: 6px;
 }
+'''
+
+# TaskWindow: background, header, chips, footer, progress bar
+_MAIN = r'''
+/* 🌌 Aurora Lights only on the main window background */
+QMainWindow {
+    background:
+        qlineargradient(
+            x1:0, y1:0,
+            x2:1, y2:1,
+            stop:0   rgba(190, 255, 110, 0.25),
+            stop:0.35 rgba(155, 120, 255, 0.32),
+            stop:0.6 rgba(255, 235, 255, 0.30),
+            stop:1   rgba(205, 175, 255, 0.28)
+        );
+}
 
 /* ================================
    Dashboard Header + Chips + Date
@@ -343,15 +430,6 @@ QWidget#centralWidget {
     padding: 20px;
 }
 
-/* List + details white blocks get extra spacing away from edges */
-QListWidget#todoList {
-    margin: 12px;
-}
-
-QTextEdit {
-    margin: 12px;
-}
-
 /* The whole right details column gets breathing space (used if you set objectName) */
 QWidget#rightColumn {
     padding: 10px;
@@ -392,36 +470,103 @@ QLabel#vibeLabel {
     margin-top: 8px;
     margin-bottom: 12px;
 }
-
-/* ================================
-   To-Do List Item & Details Text
-   ================================*/
-
-/* Bigger task list text */
-QListWidget#todoList {
-    font-size: 14pt;
-    font-family: "Segoe UI Semilight";
-}
-
-/* Text specifically inside list items */
-QListWidget#todoList::item {
-    font-size: 14pt;
-    padding: 10px;
-}
-
-/* When selected */
-QListWidget#todoList::item:selected {
-    font-size: 14pt;
-}
-
-/* Checkbox label text size inside list */
-QListWidget#todoList QCheckBox {
-    font-size: 14pt;
-}
-
-/* Bigger details panel text (meta + description) */
-QTextEdit {
-    font-size: 13pt;
-    line-height: 1.35;
-}
 '''
+
+CHUNKS = {
+    "base": _BASE,
+    "task_list": _TASK_LIST,
+    "login": _LOGIN,
+    "dialog": _DIALOG,
+    "main": _MAIN,
+}
+
+# scope -> chunks, in cascade order
+SCOPES = {
+    "app": ("base",),
+    "login": ("dialog", "login"),
+    "main": ("main", "dialog"),
+    "task_list": ("task_list",),
+    # everything at once, as the old single app-wide sheet
+    "all": ("base", "task_list", "login", "dialog", "main"),
+}
+
+_THEME_PROPERTY = "planitTheme"
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_STOP_COLOR_RE = re.compile(r"stop:\s*[\d.]+\s+(rgba?\([^)]*\)|#[0-9a-fA-F]+)")
+_UNSUPPORTED = {"box-shadow"}  # not QSS; Qt only warns "Unknown property"
+_LIGHTWEIGHT_DROPPED = {"letter-spacing"}
+_LIGHTWEIGHT_ITEM_DROPPED = {"margin", "border-radius"}
+
+
+def get_stylesheet(theme: Optional[str] = None) -> str:
+    """Return the complete stylesheet (all scopes) for one app-wide setStyleSheet."""
+    return compile_stylesheet("all", theme or current_theme())
+
+
+def current_theme() -> str:
+    theme = os.getenv(THEME_ENV_VAR, DEFAULT_THEME)
+    return theme if theme in THEMES else DEFAULT_THEME
+
+
+def list_theme(task_count: int) -> str:
+    """Theme for the task list: PLANIT_THEME if set, else lightweight for large lists."""
+    if os.getenv(THEME_ENV_VAR) in THEMES:
+        return os.environ[THEME_ENV_VAR]
+    return "lightweight" if task_count > LIGHTWEIGHT_LIST_THRESHOLD else DEFAULT_THEME
+
+
+@lru_cache(maxsize=None)
+def compile_stylesheet(scope: str, theme: str = DEFAULT_THEME) -> str:
+    """Minified QSS for a scope, with theme transforms applied. Cached."""
+    if theme not in THEMES:
+        raise ValueError(f"Unknown theme: {theme}")
+    rules = []
+    for chunk in SCOPES[scope]:
+        source = _COMMENT_RE.sub("", CHUNKS[chunk])
+        for selector, body in _RULE_RE.findall(source):
+            selector = " ".join(selector.split())
+            declarations = [d for d in _parse_declarations(body) if d[0] not in _UNSUPPORTED]
+            if theme == "lightweight":
+                declarations = _lightweight(selector, declarations)
+            if declarations:
+                rules.append(selector + "{" + ";".join(f"{p}:{v}" for p, v in declarations) + "}")
+    return "\n".join(rules)
+
+
+def apply_theme(widget, scope: str, theme: Optional[str] = None) -> bool:
+    """
+    Set the compiled sheet for scope on widget (or QApplication). Returns
+    False without touching the widget when it already has that sheet.
+    """
+    theme = theme or current_theme()
+    key = f"{scope}:{theme}"
+    if widget.property(_THEME_PROPERTY) == key:
+        return False
+    widget.setStyleSheet(compile_stylesheet(scope, theme))
+    widget.setProperty(_THEME_PROPERTY, key)
+    return True
+
+
+def _parse_declarations(body: str):
+    declarations = []
+    for declaration in body.split(";"):
+        prop, sep, value = declaration.partition(":")
+        if sep and prop.strip():
+            declarations.append((prop.strip(), " ".join(value.split())))
+    return declarations
+
+
+def _lightweight(selector: str, declarations):
+    is_item = "::item" in selector
+    result = []
+    for prop, value in declarations:
+        if prop in _LIGHTWEIGHT_DROPPED or (is_item and prop in _LIGHTWEIGHT_ITEM_DROPPED):
+            continue
+        if "gradient(" in value:
+            stops = _STOP_COLOR_RE.findall(value)
+            if not stops:
+                continue
+            value = stops[-1]
+        result.append((prop, value))
+    return result
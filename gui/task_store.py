@@ -0,0 +1,95 @@
+"""
+In-memory task store for TaskWindow.
+
+TaskViewStore extends database.models.TaskStore (tasks by task_id) with one
+ordered array of task ids per filter view ("all", "done", "pending",
+"shared"), kept in load order and updated incrementally when a task is
+toggled, added or removed. The list widget is rebuilt from rows(), whose
+index is exactly the widget row, so row -> task stays correct however many
+tasks a filter or search hides.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from typing import Iterable, List, Optional
+
+from database.models import TaskStore
+
+FILTERS = ("all", "done", "pending", "shared")
+
+
+class TaskViewStore(TaskStore):
+    __slots__ = ("_user_id", "_position", "_task_ids", "_next_position", "_views")
+
+    def __init__(self, user_id: int, tasks: Iterable = ()):
+        super().__init__()
+        self._user_id = user_id
+        self.replace_all(tasks)
+
+    def replace_all(self, tasks) -> None:
+        super().replace_all(tasks)
+        # views hold load positions (sortable ints) rather than task ids, so a
+        # task moving between views is a bisect instead of a scan
+        self._position = {}
+        self._task_ids = {}
+        self._views = {name: [] for name in FILTERS}
+        self._next_position = 0
+        for task in self._tasks.values():
+            self._append(task)
+
+    def upsert(self, task) -> None:
+        task_id = task["task_id"]
+        old = self._tasks.get(task_id)
+        super().upsert(task)
+        if old is None:
+            self._append(task)
+            return
+        before, after = self._views_of(old), self._views_of(task)
+        if before != after:
+            position = self._position[task_id]
+            for name in before - after:
+                _discard(self._views[name], position)
+            for name in after - before:
+                insort(self._views[name], position)
+
+    def remove(self, task_id):
+        task = super().remove(task_id)
+        if task is not None:
+            position = self._position.pop(task_id)
+            del self._task_ids[position]
+            for name in self._views_of(task):
+                _discard(self._views[name], position)
+        return task
+
+    def count(self, view: str = "all") -> int:
+        return len(self._views[view])
+
+    def rows(self, view: str = "all", task_ids: Optional[set] = None) -> List[int]:
+        """Task ids shown under a filter (and optional search hits), in display order."""
+        task_at = self._task_ids
+        rows = [task_at[position] for position in self._views[view]]
+        if task_ids is not None:
+            rows = [task_id for task_id in rows if task_id in task_ids]
+        return rows
+
+    def _append(self, task) -> None:
+        position = self._next_position
+        self._next_position += 1
+        self._position[task["task_id"]] = position
+        self._task_ids[position] = task["task_id"]
+        for name in self._views_of(task):
+            self._views[name].append(position)
+
+    def _views_of(self, task) -> frozenset:
+        views = {"all", "done" if task["is_complete"] else "pending"}
+        if task["created_by"] != self._user_id:
+            # tasks CREATED BY someone else count as "shared with me"
+            views.add("shared")
+        return frozenset(views)
+
+
+def _discard(view: List[int], position: int) -> None:
+    index = bisect_left(view, position)
+    if index < len(view) and view[index] == position:
+        del view[index]
@@ -1,34 +1,50 @@
 from pathlib import Path
 
 from gui.qt_compat import QtWidgets, QtCore, QtGui
-from core import task_manager
-from database.models import User
+from core import metrics, task_manager
+from database.change_monitor import DataVersionMonitor
 from gui.share_window import ShareDialog
-import qtawesome as qta
+from gui.task_store import TaskViewStore
 from datetime import datetime
+from operator import itemgetter
+from gui.animations import AnimationScheduler
+from gui import profiler
+from gui.icons import set_icons
 from gui.sound_player import sound_player
+from gui.style import apply_theme, list_theme
 
 QPropertyAnimation = QtCore.QPropertyAnimation
 QParallelAnimationGroup = QtCore.QParallelAnimationGroup
 
+WATCH_INTERVAL_MS = 500  # how often to check whether anyone committed
+
 
 class TaskWindow(QtWidgets.QMainWindow):
     logout_requested = QtCore.pyqtSignal()
+    # emitted from the sync client's reader thread, delivered on the GUI thread
+    remote_changed = QtCore.pyqtSignal()
 
-    def __init__(self, user_data, parent=None):
+    def __init__(self, user_data, parent=None, backend=None):
         super().__init__(parent)
         self.user = user_data
+        # core.task_manager, or anything with the same API (e.g. RemoteTaskManager)
+        self.backend = backend or task_manager
         self.setWindowTitle(f"PlanIt — {self.user['username']}")
         self.resize(800, 480)
         self._closing_with_sound = False
 
-        self._tasks = []
-        # keep animations alive so they don’t get GC’d
-        self._active_anims: list[QtCore.QAbstractAnimation] = []
+        self._tasks = TaskViewStore(self.user["user_id"])
+        self._rows = []  # task_id per list widget row, rebuilt by _populate_list
+        # keeps animations alive, budgets effects and pauses the mascot when idle
+        self._animations = AnimationScheduler(self)
 
         self.current_filter = "all"  # "all", "done", "pending", "shared"
+        self._search_ids = None  # task_ids matching the search box, None = no search
+        self._change_version = 0  # change-feed watermark of the loaded tasks
         self._all_done_announced = False
 
+        apply_theme(self, "main")
+
         # ---------- MAIN LAYOUT ----------
         central = QtWidgets.QWidget()
         central.setObjectName("centralWidget")
@@ -67,6 +83,19 @@ class TaskWindow(QtWidgets.QMainWindow):
 
         left_layout.addLayout(filter_row)
 
+        # title prefix search (FTS5) + keyword search over encrypted details
+        self.search_input = QtWidgets.QLineEdit()
+        self.search_input.setObjectName("searchInput")
+        self.search_input.setPlaceholderText("🔍 Search tasks…")
+        self.search_input.setClearButtonEnabled(True)
+        left_layout.addWidget(self.search_input)
+
+        # search-as-you-type: wait for a short pause in typing before querying
+        self._search_timer = QtCore.QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(150)
+        self._search_timer.timeout.connect(self._on_search)
+
         # task list widget
         self.list_widget = QtWidgets.QListWidget()
         self.list_widget.setObjectName("todoList")
@@ -180,16 +209,14 @@ class TaskWindow(QtWidgets.QMainWindow):
         logout_btn = QtWidgets.QPushButton("Logout")
 
         # icons (safe if qtawesome installed)
-        try:
-            purple = "#7D55D9"
-            new_btn.setIcon(qta.icon("fa5s.plus", color=purple))
-            edit_btn.setIcon(qta.icon("fa5s.edit", color=purple))
-            delete_btn.setIcon(qta.icon("fa5s.trash", color=purple))
-            share_btn.setIcon(qta.icon("fa5s.share-alt", color=purple))
-            refresh_btn.setIcon(qta.icon("fa5s.sync", color=purple))
-            logout_btn.setIcon(qta.icon("fa5s.sign-out-alt", color=purple))
-        except Exception:
-            pass
+        set_icons([
+            (new_btn, "fa5s.plus"),
+            (edit_btn, "fa5s.edit"),
+            (delete_btn, "fa5s.trash"),
+            (share_btn, "fa5s.share-alt"),
+            (refresh_btn, "fa5s.sync"),
+            (logout_btn, "fa5s.sign-out-alt"),
+        ])
 
         btn_row.addWidget(new_btn)
         btn_row.addWidget(edit_btn)
@@ -200,8 +227,11 @@ class TaskWindow(QtWidgets.QMainWindow):
 
         right_layout.addWidget(footer_bar)
 
-        # button squish animation (visible bounce + opacity blink)
-        for b in (new_btn, edit_btn, delete_btn, share_btn, refresh_btn, logout_btn):
+        # button squish animation (visible bounce + opacity blink); with reduced
+        # motion the buttons get no opacity effect, which also saves an
+        # offscreen render per button paint
+        squish_buttons = (new_btn, edit_btn, delete_btn, share_btn, refresh_btn, logout_btn)
+        for b in () if self._animations.reduced_motion else squish_buttons:
             eff = QtWidgets.QGraphicsOpacityEffect(b)
             b.setGraphicsEffect(eff)
             # capture both button and effect in the lambda
@@ -219,30 +249,43 @@ class TaskWindow(QtWidgets.QMainWindow):
         share_btn.clicked.connect(self._on_share)
         logout_btn.clicked.connect(self._on_logout)
 
+        self.search_input.returnPressed.connect(self._on_search)
+        self.search_input.textChanged.connect(self._on_search_text_changed)
+
         # filter buttons
         self.filter_all_btn.clicked.connect(lambda: self._set_filter("all"))
         self.filter_done_btn.clicked.connect(lambda: self._set_filter("done"))
         self.filter_pending_btn.clicked.connect(lambda: self._set_filter("pending"))
         self.filter_shared_btn.clicked.connect(lambda: self._set_filter("shared"))
 
+        # hidden debug toggle: profile the handlers and record UI stalls
+        # (see gui/profiler.py)
+        profiler_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence(profiler.TOGGLE_SHORTCUT), self)
+        profiler_shortcut.activated.connect(profiler.toggle)
+
         self.refresh()
+
+        # live updates: poll PRAGMA data_version and pull deltas only after
+        # some connection (another instance, a collaborator) has committed.
+        # A remote backend pushes change notifications instead.
+        self._db_monitor = None
+        self._remote_listener = None
+        self._sync_timer = QtCore.QTimer(self)
+        self._sync_timer.setInterval(WATCH_INTERVAL_MS)
+        self._sync_timer.timeout.connect(self._on_watch_tick)
+        if hasattr(self.backend, "subscribe"):
+            self.remote_changed.connect(self._sync_changes)
+            self._remote_listener = lambda _version: self.remote_changed.emit()
+            self.backend.subscribe(self._remote_listener)
+        else:
+            self._db_monitor = DataVersionMonitor()
+            self._sync_timer.start()
+
         # start the soft idle animation on the mascot
         self._start_mascot_idle_animation()
 
     # ================= ANIMATION HELPERS =================
 
-    def _register_anim(self, anim: QtCore.QAbstractAnimation):
-        """Keep animation alive until finished (avoid GC killing it early)."""
-        self._active_anims.append(anim)
-
-        def _cleanup():
-            try:
-                self._active_anims.remove(anim)
-            except ValueError:
-                pass
-
-        anim.finished.connect(_cleanup)
-
     def _set_filter(self, mode: str):
         """Change current filter and update buttons + list."""
         self.current_filter = mode
@@ -254,8 +297,8 @@ class TaskWindow(QtWidgets.QMainWindow):
             self.filter_pending_btn.setChecked(mode == "pending")
             self.filter_shared_btn.setChecked(mode == "shared")
 
-        # rebuild list with new filter
-        self.refresh()
+        # rebuild list with new filter (tasks are already loaded)
+        self._populate_list()
 
     def _update_date_label(self):
         """Set the cute 'Today • Friday, Nov 22' text."""
@@ -277,10 +320,9 @@ class TaskWindow(QtWidgets.QMainWindow):
         anim.setKeyValueAt(0.5, 1.0)
         anim.setEndValue(0.75)
         anim.setEasingCurve(QtCore.QEasingCurve.InOutQuad)
-        anim.setLoopCount(-1)  # infinite loop
+        anim.setLoopCount(-1)  # infinite loop, paused by the scheduler when idle
 
-        self._register_anim(anim)
-        anim.start()
+        self._animations.add_ambient(anim)
 
     def _animate_button_press(
         self,
@@ -288,6 +330,11 @@ class TaskWindow(QtWidgets.QMainWindow):
         effect: QtWidgets.QGraphicsOpacityEffect,
     ):
         """Squish + opacity blink animation on button press."""
+        if self._animations.reduced_motion:
+            return
+        key = f"press:{id(btn)}"
+        # settle a squish still running on this button before reading its geometry
+        self._animations.finish(key)
         try:
             # Opacity animation
             fade = QPropertyAnimation(effect, b"opacity")
@@ -311,8 +358,7 @@ class TaskWindow(QtWidgets.QMainWindow):
             group.addAnimation(fade)
             group.addAnimation(squish)
 
-            self._register_anim(group)
-            group.start()
+            self._animations.start_effect(group, key=key)
         except Exception:
             pass
 
@@ -333,6 +379,8 @@ class TaskWindow(QtWidgets.QMainWindow):
 
     def _play_complete_effect(self, item: QtWidgets.QListWidgetItem):
         """Sparkle + soft bounce next to the checkbox when a task is completed."""
+        if self._animations.reduced_motion:
+            return
         try:
             rect = self.list_widget.visualItemRect(item)
             if not rect.isValid():
@@ -387,63 +435,20 @@ class TaskWindow(QtWidgets.QMainWindow):
                 sparkle.deleteLater()
 
             group.finished.connect(_delete_sparkle)
-            self._register_anim(group)
-            group.start()
+            # a burst of completions shows one sparkle (the latest), not a pile
+            self._animations.start_effect(group, key="sparkle")
         except Exception:
             # If anything fails, just skip the effect (no crash)
             pass
 
     # ================= CORE BEHAVIOR =================
 
-    def refresh(self):
-        """Reload tasks and rebuild the list with native checkable items."""
-        self.list_widget.blockSignals(True)
-        self.list_widget.clear()
-
-        tasks = task_manager.get_tasks_for_user(self.user["user_id"])
-        self._tasks = tasks
-
-        # helper to decide if a task should be visible under current filter
-        def _visible(t):
-            if self.current_filter == "done":
-                return t["is_complete"]
-            if self.current_filter == "pending":
-                return not t["is_complete"]
-            if self.current_filter == "shared":
-                # treat tasks CREATED BY someone else as "shared with me"
-                return t["created_by"] != self.user["user_id"]
-            return True  # "all"
-
-        for t in tasks:
-            if not _visible(t):
-                continue
-
-            # build title (add shared badge if not created by me)
-            title = t["title"]
-            if t["created_by"] != self.user["user_id"]:
-                title += "   🤝"
-
-            item = QtWidgets.QListWidgetItem(title)
-            item.setData(QtCore.Qt.UserRole, t["task_id"])
-
-            flags = (
-                item.flags()
-                | QtCore.Qt.ItemIsUserCheckable
-                | QtCore.Qt.ItemIsSelectable
-                | QtCore.Qt.ItemIsEnabled
-            )
-            item.setFlags(flags)
-            item.setCheckState(
-                QtCore.Qt.Checked if t["is_complete"] else QtCore.Qt.Unchecked
-            )
-            self.list_widget.addItem(item)
-
-        self.list_widget.blockSignals(False)
-
-        # --- UPDATE SUMMARY CHIPS (always based on ALL tasks) ---
-        total = len(tasks)
-        completed = sum(1 for t in tasks if t["is_complete"])
-        pending = total - completed
+    def _update_summary(self):
+        """Refresh chips, progress bar and vibe text from the task counters."""
+        stats = self.backend.get_task_stats(self.user["user_id"])
+        total = stats["total"]
+        completed = stats["completed"]
+        pending = stats["pending"]
 
         if hasattr(self, "total_chip"):
             self.total_chip.setText(f"🌟 Total: {total}")
@@ -472,35 +477,165 @@ class TaskWindow(QtWidgets.QMainWindow):
 
         self._maybe_play_all_done(total, completed)
 
+    def refresh(self):
+        """Reload tasks and rebuild the list with native checkable items."""
+        # a plain method, not @metrics.timed: Qt passes clicked(bool) to
+        # slots that accept *args
+        with metrics.timer("gui.refresh"), profiler.section("refresh"):
+            self._reload()
+
+    def _reload(self):
+        # summary chips come from one aggregate query, so draw them before
+        # the (slower) decrypt-everything list load below
+        self._update_summary()
+
+        # take the watermark first so nothing committed during the load is missed
+        self._change_version = self.backend.get_change_version()
+        with metrics.timer("gui.load_tasks"):
+            self._tasks.replace_all(self.backend.get_tasks_for_user(self.user["user_id"]))
+        if self._search_ids is not None:
+            # tasks may have changed, so re-run the active search
+            self._search_ids = self._find_matching_ids(self.search_input.text())
+
         # keep date fresh (in case app stays open over midnight)
         self._update_date_label()
 
-        if self.list_widget.count() > 0:
-            self.list_widget.setCurrentRow(0)
+        self._populate_list()
+
+    def _sync_changes(self):
+        """Apply only the tasks changed since the last load (full reload if needed)."""
+        with metrics.timer("gui.sync_changes"), profiler.section("sync_changes"):
+            self._apply_changes()
+
+    def _apply_changes(self):
+        changes = self.backend.get_task_changes(self.user["user_id"], self._change_version)
+        if changes["reset"]:
+            self.refresh()
+            return
+
+        self._change_version = changes["version"]
+        fresh = {t["task_id"]: t for t in changes["inserted"] + changes["updated"]}
+        gone = set(changes["deleted"])
+        if not fresh and not gone:
+            return
+
+        for task_id in gone:
+            self._tasks.remove(task_id)
+        added = False
+        for task_id, task in fresh.items():
+            added = added or task_id not in self._tasks
+            self._tasks.upsert(task)
+        if added:
+            # newly visible tasks; keep the created_at order of a full load
+            self._tasks.replace_all(sorted(self._tasks, key=itemgetter("created_at", "task_id")))
+
+        if self._search_ids is not None:
+            self._search_ids = self._find_matching_ids(self.search_input.text())
+
+        self._update_summary()
+        self._populate_list(select_task_id=self._current_task_id())
+
+    def _on_watch_tick(self):
+        if self._db_monitor.poll():
+            self._sync_changes()
+
+    def _current_task_id(self):
+        row = self.list_widget.currentRow()
+        return self._rows[row] if 0 <= row < len(self._rows) else None
+
+    @metrics.timed("gui.populate_list")
+    def _populate_list(self, select_task_id=None):
+        """Rebuild the list widget from the loaded tasks, filter and search."""
+        self.list_widget.blockSignals(True)
+        self.list_widget.clear()
+        # big lists switch to the flat theme (no-op when it is already set)
+        apply_theme(self.list_widget, "task_list", list_theme(len(self._tasks)))
+
+        self._rows = self._tasks.rows(self.current_filter, self._search_ids)
+        for task_id in self._rows:
+            t = self._tasks[task_id]
+
+            # build title (add shared badge if not created by me)
+            title = t["title"]
+            if t["created_by"] != self.user["user_id"]:
+                title += "   🤝"
+
+            item = QtWidgets.QListWidgetItem(title)
+            item.setData(QtCore.Qt.UserRole, t["task_id"])
+
+            flags = (
+                item.flags()
+                | QtCore.Qt.ItemIsUserCheckable
+                | QtCore.Qt.ItemIsSelectable
+                | QtCore.Qt.ItemIsEnabled
+            )
+            item.setFlags(flags)
+            item.setCheckState(
+                QtCore.Qt.Checked if t["is_complete"] else QtCore.Qt.Unchecked
+            )
+            self.list_widget.addItem(item)
+
+        self.list_widget.blockSignals(False)
+
+        if self._rows:
+            try:
+                row = self._rows.index(select_task_id)
+            except ValueError:
+                row = 0
+            self.list_widget.setCurrentRow(row)
             self._on_select()
+        elif self._search_ids is not None:
+            self.details.setPlainText("No tasks match your search 🔭")
         else:
             self.details.setPlainText(
                 "No tasks yet!\n\nStart your first mission by clicking “New” 🌙"
             )
 
+    def _find_matching_ids(self, query: str) -> set:
+        """Tasks whose title words start with the query or whose details contain it."""
+        user_id = self.user["user_id"]
+        ids = {hit["task_id"] for hit in self.backend.search_titles(user_id, query, None)}
+        ids.update(self.backend.search_task_ids(user_id, query))
+        return ids
+
+    def _on_search(self):
+        """Filter the list to tasks matching the search box."""
+        self._search_timer.stop()
+        query = self.search_input.text().strip()
+        if query:
+            self._search_ids = self._find_matching_ids(query)
+        else:
+            self._search_ids = None
+        self._populate_list()
+
+    def _on_search_text_changed(self, text: str):
+        text = text.strip()
+        if not text:
+            # clearing the box (e.g. via the clear button) shows everything again
+            self._search_timer.stop()
+            if self._search_ids is not None:
+                self._on_search()
+        elif len(text) >= 2:
+            self._search_timer.start()
+
     def _on_select(self):
-        sel = self.list_widget.currentRow()
-        if sel < 0 or sel >= len(self._tasks):
+        with profiler.section("select"):
+            self._show_selected()
+
+    def _show_selected(self):
+        t = self._tasks.get(self._current_task_id())
+        if t is None:
             self.details.clear()
             return
 
-        t = self._tasks[sel]
-
         # Resolve numeric user ids to usernames for nicer display
         try:
-            creator = User.get_by_id(t["created_by"])
-            creator_label = creator["username"] if creator else str(t["created_by"])
+            creator_label = self.backend.get_username(t["created_by"]) or str(t["created_by"])
         except Exception:
             creator_label = str(t["created_by"])
 
         try:
-            updater = User.get_by_id(t["updated_by"])
-            updater_label = updater["username"] if updater else str(t["updated_by"])
+            updater_label = self.backend.get_username(t["updated_by"]) or str(t["updated_by"])
         except Exception:
             updater_label = str(t["updated_by"])
 
@@ -515,7 +650,7 @@ class TaskWindow(QtWidgets.QMainWindow):
         shared_extra = ""
         try:
             # uses same helper as ShareDialog
-            shares = task_manager.get_task_shares(t["task_id"])  # list of {user_id, username}
+            shares = self.backend.get_task_shares(t["task_id"])  # list of {user_id, username}
         except Exception:
             shares = []
 
@@ -541,6 +676,10 @@ class TaskWindow(QtWidgets.QMainWindow):
 
     def _on_item_changed(self, item: QtWidgets.QListWidgetItem):
         """Called when the user ticks/unticks the checkbox in the list."""
+        with profiler.section("item_changed"):
+            self._toggle_complete(item)
+
+    def _toggle_complete(self, item: QtWidgets.QListWidgetItem):
         try:
             task_id = int(item.data(QtCore.Qt.UserRole))
         except Exception:
@@ -548,16 +687,15 @@ class TaskWindow(QtWidgets.QMainWindow):
 
         checked = item.checkState() == QtCore.Qt.Checked
         # use encrypted-safe update helper
-        task_manager.update_task(
+        self.backend.update_task(
             task_id,
             self.user["user_id"],
             is_complete=checked,
         )
 
-        for t in self._tasks:
-            if t["task_id"] == task_id:
-                t["is_complete"] = checked
-                break
+        t = self._tasks.get(task_id)
+        if t is not None:
+            self._tasks.upsert(t.replace(is_complete=checked))
 
         if self.list_widget.currentItem() is item:
             self._on_select()
@@ -566,35 +704,18 @@ class TaskWindow(QtWidgets.QMainWindow):
             sound_player.play("onetask.mp3")
             self._play_complete_effect(item)
 
-        # --- UPDATE PROGRESS BAR + VIBE IMMEDIATELY ---
-        total = len(self._tasks)
-        completed = sum(1 for t in self._tasks if t["is_complete"])
-
-        if hasattr(self, "progress_bar"):
-            pct = int((completed / total) * 100) if total > 0 else 0
-            self.progress_bar.setValue(pct)
-
-        if hasattr(self, "vibe_label"):
-            if total == 0:
-                vibe = "No tasks yet — start a mission ✨"
-            elif pct == 0:
-                vibe = "Let’s start with one task 🌱"
-            elif pct < 50:
-                vibe = "Nice, you’re getting into orbit 🚀"
-            elif pct < 100:
-                vibe = "So close, keep going ⭐"
-            else:
-                vibe = "All done — mission complete 🌙"
-
-            self.vibe_label.setText(vibe)
-
-        self._maybe_play_all_done(total, completed)
+        # --- UPDATE CHIPS + PROGRESS BAR + VIBE IMMEDIATELY ---
+        self._update_summary()
 
     def _on_new(self):
-        dialog = NewTaskDialog(self.user["user_id"], self)
+        # profile building the dialog and applying its result, not the
+        # time it sits open waiting for input
+        with profiler.section("new_task.open"):
+            dialog = NewTaskDialog(self.user["user_id"], self, backend=self.backend)
         if dialog.exec_():
-            self.refresh()
-            sound_player.play("createtask.mp3")
+            with profiler.section("new_task.apply"):
+                self._sync_changes()
+                sound_player.play("createtask.mp3")
 
     def _on_share(self):
         row = self.list_widget.currentRow()
@@ -605,7 +726,8 @@ class TaskWindow(QtWidgets.QMainWindow):
         item = self.list_widget.currentItem()
         task_id = item.data(QtCore.Qt.UserRole)
 
-        dlg = ShareDialog(task_id, self.user["user_id"], self)
+        with profiler.section("share.open"):
+            dlg = ShareDialog(task_id, self.user["user_id"], self, backend=self.backend)
         dlg.exec_()
 
     def _on_edit(self):
@@ -614,25 +736,23 @@ class TaskWindow(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.warning(self, "Edit Task", "Select a task first")
             return
 
-        item = self.list_widget.currentItem()
-        task_id = item.data(QtCore.Qt.UserRole)
-
-        task = None
-        for t in self._tasks:
-            if t["task_id"] == task_id:
-                task = t
-                break
-
+        task = self._tasks.get(self._rows[row])
         if task is None:
             QtWidgets.QMessageBox.warning(self, "Edit Task", "Task not found.")
             return
 
-        dlg = EditTaskDialog(task, self.user["user_id"], self)
+        with profiler.section("edit_task.open"):
+            dlg = EditTaskDialog(task, self.user["user_id"], self, backend=self.backend)
         if dlg.exec_():
-            # reload tasks so list + details show updated text
-            self.refresh()
+            # pull the edit so list + details show updated text
+            with profiler.section("edit_task.apply"):
+                self._sync_changes()
 
     def _on_delete(self):
+        with profiler.section("delete"):
+            self._delete_selected()
+
+    def _delete_selected(self):
         row = self.list_widget.currentRow()
         if row < 0:
             QtWidgets.QMessageBox.warning(self, "Delete Task", "Select a task first")
@@ -650,11 +770,11 @@ class TaskWindow(QtWidgets.QMainWindow):
         if confirm != QtWidgets.QMessageBox.Yes:
             return
 
-        ok, msg = task_manager.delete_task(task_id, self.user["user_id"])
+        ok, msg = self.backend.delete_task(task_id, self.user["user_id"])
         QtWidgets.QMessageBox.information(self, "Delete Task", msg)
         if ok:
             sound_player.play("deletetask.mp3")
-            self.refresh()
+            self._sync_changes()
 
     def _on_logout(self):
         self.logout_requested.emit()
@@ -662,6 +782,7 @@ class TaskWindow(QtWidgets.QMainWindow):
 
     def closeEvent(self, event):
         if self._closing_with_sound:
+            self._stop_watching()
             return super().closeEvent(event)
 
         played = sound_player.play("goodbye.mp3")
@@ -671,15 +792,27 @@ class TaskWindow(QtWidgets.QMainWindow):
             QtCore.QTimer.singleShot(600, self.close)
             return
 
+        self._stop_watching()
         super().closeEvent(event)
 
+    def _stop_watching(self):
+        self._animations.stop_all()
+        self._sync_timer.stop()
+        if self._remote_listener is not None:
+            # the backend outlives this window (logout keeps the connection)
+            self.backend.unsubscribe(self._remote_listener)
+            self._remote_listener = None
+        if self._db_monitor is not None:
+            self._db_monitor.close()
+
 
 class NewTaskDialog(QtWidgets.QDialog):
     """Dialog to create a brand-new task."""
 
-    def __init__(self, owner_id, parent=None):
+    def __init__(self, owner_id, parent=None, backend=None):
         super().__init__(parent)
         self.owner_id = owner_id
+        self.backend = backend or task_manager
 
         self.setWindowTitle("New Task")
         self.resize(480, 360)
@@ -708,6 +841,10 @@ class NewTaskDialog(QtWidgets.QDialog):
         create_btn.clicked.connect(self._on_create)
 
     def _on_create(self):
+        with profiler.section("new_task.create"):
+            self._create()
+
+    def _create(self):
         title = self.title_input.text().strip()
         details = self.details_input.toPlainText()
 
@@ -724,7 +861,7 @@ class NewTaskDialog(QtWidgets.QDialog):
 
         shared_ids = []
         for uname in collab_usernames:
-            user = User.get_by_username(uname)
+            user = self.backend.find_user(uname)
             if user:
                 if user["user_id"] != self.owner_id:
                     shared_ids.append(user["user_id"])
@@ -733,7 +870,7 @@ class NewTaskDialog(QtWidgets.QDialog):
                     self, "Create Task", f"User '{uname}' not found; skipping"
                 )
 
-        ok, msg, task_id = task_manager.create_encrypted_task(
+        ok, msg, task_id = self.backend.create_encrypted_task(
             title, details, self.owner_id, shared_with=shared_ids
         )
 
@@ -745,10 +882,11 @@ class NewTaskDialog(QtWidgets.QDialog):
 class EditTaskDialog(QtWidgets.QDialog):
     """Dialog to edit an existing task's title & details."""
 
-    def __init__(self, task_data, editor_id, parent=None):
+    def __init__(self, task_data, editor_id, parent=None, backend=None):
         super().__init__(parent)
         self.task_data = task_data
         self.editor_id = editor_id
+        self.backend = backend or task_manager
 
         self.setWindowTitle("Edit Task")
         self.resize(480, 360)
@@ -771,6 +909,10 @@ class EditTaskDialog(QtWidgets.QDialog):
         save_btn.clicked.connect(self._on_save)
 
     def _on_save(self):
+        with profiler.section("edit_task.save"):
+            self._save()
+
+    def _save(self):
         new_title = self.title_input.text().strip()
         new_details = self.details_input.toPlainText()
 
@@ -780,7 +922,7 @@ class EditTaskDialog(QtWidgets.QDialog):
 
         task_id = self.task_data["task_id"]
 
-        ok, msg = task_manager.update_task(
+        ok, msg = self.backend.update_task(
             task_id,
             self.editor_id,
             new_title=new_title,
@@ -1,34 +1,87 @@
 import sys
+import time
+
+_STARTED_AT = time.perf_counter()
+_MODULES_AT_START = set(sys.modules)
+
 import os
 import platform
 from PyQt5 import QtCore
-from gui.qt_compat import QtWidgets, backend
-from database.db_setup import initialize_database
+from gui.qt_compat import QtWidgets, backend as qt_backend
+from gui.startup import Startup
 from gui.login_window import LoginWindow
-from gui.task_window import TaskWindow
-from gui.style import get_stylesheet
+from gui.style import apply_theme
+from gui import profiler
+from core import metrics
+
+# Set to "host:port" or a Unix socket path to use a running sync server
+# (python -m sync.server) instead of opening the database file directly.
+SYNC_SERVER_ENV_VAR = "PLANIT_SYNC_SERVER"
+
+
+def _load_task_window():
+    from gui.task_window import TaskWindow
+    return TaskWindow
+
+
+def _prune_change_feed():
+    from core import task_manager
+    task_manager.prune_expired_task_changes()
+
+
+def _warm_icons():
+    from gui.icons import set_icons
+    set_icons([])
+
+
+def _preload_sounds():
+    from gui.sound_player import sound_player
+    sound_player.preload()
 
 
 def main():
+    startup = Startup(_STARTED_AT, _MODULES_AT_START)
+    metrics.start_from_env()
+    startup.mark("imports")
+
     # --- High DPI scaling (helps on macOS + HiDPI displays) ---
     os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "1"
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
     QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_EnableHighDpiScaling, True)
     QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_UseHighDpiPixmaps, True)
 
-    initialize_database()
+    backend = None
+    sync_address = os.getenv(SYNC_SERVER_ENV_VAR)
+    if sync_address:
+        from sync.client import RemoteTaskManager
+        backend = RemoteTaskManager(sync_address)
+    else:
+        # schema checks wait until the login window is up (or a login needs them)
+        from database.db_setup import initialize_database
+        startup.defer("database schema", initialize_database, required=True)
+        startup.defer("change feed", _prune_change_feed)
+    startup.defer("task window", _load_task_window)
+    startup.defer("icons", _warm_icons)
+    startup.defer("sounds", _preload_sounds)
+
     app = QtWidgets.QApplication(sys.argv)
+    startup.mark("QApplication")
 
     # Informational: which Qt backend is in use
-    print(f"Using Qt backend: {backend}")
+    print(f"Using Qt backend: {qt_backend}")
+
+    # Apply the pastel kawaii stylesheet (only the app-wide part; windows
+    # apply their own chunks)
+    apply_theme(app, "app")
 
-    # Apply the pastel kawaii stylesheet
-    app.setStyleSheet(get_stylesheet())
+    # PLANIT_PROFILE=1: profile from the start, report on exit
+    profiler.start_from_env()
+    app.aboutToQuit.connect(profiler.stop)
 
     windows = {}
 
     def show_login():
-        login = LoginWindow()
+        login = LoginWindow(auth=backend, prepare=startup.finish)
         login.login_success.connect(on_login)
         login.show()
         windows["login"] = login
@@ -42,7 +95,12 @@ def main():
             except Exception:
                 pass
 
-        win = TaskWindow(user)
+        startup.finish()
+        if backend is None:
+            # index tasks from before the search index (the sync server does its own)
+            from core import task_manager
+            task_manager.start_search_backfill(user["user_id"])
+        win = _load_task_window()(user, backend=backend)
         win.logout_requested.connect(on_logout)
 
         # --- Window mode depending on OS ---
@@ -66,6 +124,8 @@ def main():
         show_login()
 
     show_login()
+    startup.mark("login window shown")
+    startup.run_when_idle()
     sys.exit(app.exec_())
 
 
@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+if __package__ in (None, ""):
+    # Allow running this file directly by ensuring project root is importable.
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from planit.cli import main
+
+sys.exit(main())
@@ -0,0 +1,411 @@
+"""
+Command-line interface for PlanIt, for scripting and cron jobs.
+
+It talks to core.task_manager and core.user_auth directly and never imports a
+Qt module, so it runs without a display server. Results are written to stdout
+as JSON lines (one object per task or result) and errors go to stderr.
+
+Run with:  python -m planit --user ella list --status pending
+
+The password comes from the PLANIT_PASSWORD environment variable, or is
+prompted for when stdin is a terminal.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import getpass
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core import archive, key_rotation, task_manager, user_auth
+from crypto import key_manager
+from database import db_setup
+
+PASSWORD_ENV_VAR = "PLANIT_PASSWORD"
+PASSPHRASE_ENV_VAR = "PLANIT_ARCHIVE_PASSPHRASE"
+IMPORT_BATCH_SIZE = 500  # tasks per transaction on import
+
+
+class CliError(Exception):
+    """A user-facing failure; printed to stderr with exit status 1."""
+
+
+def main(argv=None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.db:
+        db_setup.DATABASE_NAME = args.db
+    try:
+        if args.command != "bench":
+            # keep stdout clean for JSON lines
+            with contextlib.redirect_stdout(sys.stderr):
+                db_setup.initialize_database()
+        args.handler(args)
+    except CliError as exc:
+        print(f"planit: {exc}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # e.g. `python -m planit ... list | head`
+        sys.stderr.close()
+    return 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="planit", description="PlanIt command-line interface")
+    parser.add_argument("--db", help="database file (default: %s)" % db_setup.DATABASE_NAME)
+    parser.add_argument("--user", help="username to act as")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("list", help="print tasks as JSON lines")
+    cmd.add_argument("--status", choices=("all", "done", "pending"), default="all")
+    cmd.set_defaults(handler=cmd_list)
+
+    cmd = commands.add_parser("add", help="create a task")
+    cmd.add_argument("title")
+    cmd.add_argument("--details", default="")
+    cmd.add_argument("--share", nargs="*", default=[], metavar="USERNAME")
+    cmd.set_defaults(handler=cmd_add)
+
+    cmd = commands.add_parser("import", help="create tasks from JSON lines")
+    cmd.add_argument("file", nargs="?", default="-", help="JSON-lines file, or - for stdin")
+    cmd.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    cmd.set_defaults(handler=cmd_import)
+
+    cmd = commands.add_parser("export", help="write tasks as JSON lines (plaintext)")
+    cmd.add_argument("file", nargs="?", default="-", help="output file, or - for stdout")
+    cmd.set_defaults(handler=cmd_export)
+
+    cmd = commands.add_parser("backup", help="write an encrypted archive of your tasks")
+    cmd.add_argument("file", help="archive file, or - for stdout")
+    cmd.set_defaults(handler=cmd_backup)
+
+    cmd = commands.add_parser("restore", help="import tasks from an encrypted archive")
+    cmd.add_argument("file", help="archive file, or - for stdin")
+    cmd.add_argument("--chunk-size", type=int, default=archive.IMPORT_CHUNK_SIZE)
+    cmd.set_defaults(handler=cmd_restore)
+
+    cmd = commands.add_parser("share", help="share a task with other users")
+    cmd.add_argument("task_id", type=int)
+    cmd.add_argument("usernames", nargs="+")
+    cmd.set_defaults(handler=cmd_share)
+
+    cmd = commands.add_parser("revoke", help="remove users' access to your tasks")
+    cmd.add_argument("task_ids", type=int, nargs="+")
+    cmd.add_argument("--from", dest="usernames", nargs="+", required=True, metavar="USERNAME")
+    cmd.add_argument("--rekey", action="store_true",
+                     help="queue the tasks for a data key rotation (see rekey-pending)")
+    cmd.set_defaults(handler=cmd_revoke)
+
+    cmd = commands.add_parser("rekey-pending", help="rotate data keys queued by revoke --rekey")
+    cmd.add_argument("--limit", type=int, default=None)
+    cmd.set_defaults(handler=cmd_rekey_pending)
+
+    cmd = commands.add_parser("complete", help="mark tasks as done")
+    cmd.add_argument("task_ids", type=int, nargs="+")
+    cmd.add_argument("--undo", action="store_true", help="mark as pending instead")
+    cmd.set_defaults(handler=cmd_complete)
+
+    cmd = commands.add_parser("stats", help="print the task counters")
+    cmd.set_defaults(handler=cmd_stats)
+
+    cmd = commands.add_parser("rotate-keys", help="re-wrap data keys under the newest master key")
+    cmd.add_argument("--new-version", action="store_true",
+                     help="generate the next master key version first")
+    cmd.add_argument("--batch-size", type=int, default=key_rotation.BATCH_SIZE)
+    cmd.add_argument("--pause", type=float, default=key_rotation.PAUSE_SECONDS,
+                     help="seconds to sleep between batches (default: %(default)s)")
+    cmd.set_defaults(handler=cmd_rotate_keys)
+
+    cmd = commands.add_parser("bench", help="measure throughput on a scratch database")
+    cmd.add_argument("--tasks", type=int, default=2000)
+    cmd.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    cmd.set_defaults(handler=cmd_bench)
+    return parser
+
+
+def cmd_list(args) -> None:
+    user = _login(args)
+    for task in task_manager.iter_tasks_for_user(user["user_id"]):
+        if args.status == "done" and not task["is_complete"]:
+            continue
+        if args.status == "pending" and task["is_complete"]:
+            continue
+        _emit(task.to_dict())
+
+
+def cmd_add(args) -> None:
+    user = _login(args)
+    shared_with = [_resolve_user(name) for name in args.share]
+    ok, message, task_id = task_manager.create_encrypted_task(
+        args.title, args.details, user["user_id"], shared_with
+    )
+    if not ok:
+        raise CliError(message)
+    _emit({"task_id": task_id, "message": message})
+
+
+def cmd_import(args) -> None:
+    user = _login(args)
+    started = time.perf_counter()
+    created = 0
+    with _open_input(args.file) as stream:
+        records = (_parse_import_line(number, line) for number, line in enumerate(stream, 1))
+        for batch in _chunks(filter(None, records), args.batch_size):
+            ok, message, task_ids = task_manager.create_encrypted_tasks(user["user_id"], batch)
+            if not ok:
+                raise CliError(f"{message}; {created} tasks were imported before this batch")
+            created += len(task_ids)
+    elapsed = time.perf_counter() - started
+    _emit({"imported": created, "seconds": round(elapsed, 3), "tasks_per_sec": _rate(created, elapsed)})
+
+
+def cmd_export(args) -> None:
+    user = _login(args)
+    with _open_output(args.file) as stream:
+        tasks = task_manager.iter_tasks_for_user(user["user_id"])
+        # shares are looked up per chunk so memory stays flat on large exports
+        for chunk in _chunks(tasks, IMPORT_BATCH_SIZE):
+            shares = task_manager.get_shares_for_tasks(task["task_id"] for task in chunk)
+            for task in chunk:
+                record = {
+                    "title": task["title"],
+                    "details": task["details"],
+                    "is_complete": task["is_complete"],
+                    "shared_with": [
+                        share["username"]
+                        for share in shares[task["task_id"]]
+                        if share["user_id"] != user["user_id"]
+                    ],
+                    "task_id": task["task_id"],
+                    "created_at": task["created_at"],
+                    "updated_at": task["updated_at"],
+                }
+                stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def cmd_backup(args) -> None:
+    user = _login(args)
+    passphrase = _secret(PASSPHRASE_ENV_VAR, "Archive passphrase: ")
+    if args.file == "-":
+        stats = archive.export_tasks(user["user_id"], sys.stdout.buffer, passphrase, _progress)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.file, "wb") as stream:
+            stats = archive.export_tasks(user["user_id"], stream, passphrase, _progress)
+    print(json.dumps({"backup": stats}), file=sys.stderr)
+
+
+def cmd_restore(args) -> None:
+    user = _login(args)
+    passphrase = _secret(PASSPHRASE_ENV_VAR, "Archive passphrase: ")
+    try:
+        if args.file == "-":
+            stats = archive.import_tasks(
+                user["user_id"], sys.stdin.buffer, passphrase, args.chunk_size, _progress
+            )
+        else:
+            with open(args.file, "rb") as stream:
+                stats = archive.import_tasks(
+                    user["user_id"], stream, passphrase, args.chunk_size, _progress
+                )
+    except archive.ArchiveError as exc:
+        raise CliError(str(exc)) from exc
+    _emit({"restore": stats})
+
+
+def cmd_share(args) -> None:
+    user = _login(args)
+    failed = False
+    for username in args.usernames:
+        ok, message = task_manager.share_task_with_user(
+            args.task_id, user["user_id"], _resolve_user(username)
+        )
+        failed = failed or not ok
+        _emit({"task_id": args.task_id, "username": username, "ok": ok, "message": message})
+    if failed:
+        raise CliError("some shares failed")
+
+
+def cmd_revoke(args) -> None:
+    user = _login(args)
+    ok, message = task_manager.revoke_access(
+        args.task_ids,
+        user["user_id"],
+        [_resolve_user(username) for username in args.usernames],
+        rekey=args.rekey,
+    )
+    if not ok:
+        raise CliError(message)
+    _emit({"task_ids": args.task_ids, "message": message})
+
+
+def cmd_rekey_pending(args) -> None:
+    result = task_manager.rekey_pending_tasks(args.limit)
+    _emit({
+        "rekeyed": result["rekeyed"],
+        "skipped": len(result["skipped"]),
+        "missing": len(result["missing"]),
+        "pending": result["pending"],
+    })
+
+
+def cmd_complete(args) -> None:
+    user = _login(args)
+    failed = False
+    for task_id in args.task_ids:
+        ok, message = task_manager.update_task(task_id, user["user_id"], is_complete=not args.undo)
+        failed = failed or not ok
+        _emit({"task_id": task_id, "ok": ok, "message": message})
+    if failed:
+        raise CliError("some updates failed")
+
+
+def cmd_stats(args) -> None:
+    user = _login(args)
+    _emit(task_manager.get_task_stats(user["user_id"]))
+
+
+def cmd_rotate_keys(args) -> None:
+    # operates on the key files directly, so no --user login
+    if args.new_version:
+        _emit({"created_key_version": key_manager.create_master_key_version()})
+    stats = key_rotation.rotate_keys(
+        batch_size=args.batch_size, pause=args.pause, progress=_progress
+    )
+    _emit(stats)
+    if stats["failed"]:
+        raise CliError(f"{stats['failed']} keys could not be unwrapped")
+
+
+def cmd_bench(args) -> None:
+    """Time bulk vs per-task creates, streaming reads and updates on a scratch DB."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_setup.DATABASE_NAME = str(Path(tmp) / "bench.db")
+        os.environ[key_manager.MASTER_KEY_ENV_VAR] = str(Path(tmp) / "bench.key")
+        key_manager.reset_master_key_cache()
+        with contextlib.redirect_stdout(sys.stderr):
+            db_setup.initialize_database()
+        _, _, user_id = user_auth.register_user("bench", "benchmark")
+        tasks = [{"title": f"Task {n}", "details": f"details for task {n}"} for n in range(args.tasks)]
+
+        def single():
+            for task in tasks:
+                task_manager.create_encrypted_task(task["title"], task["details"], user_id)
+
+        def batched():
+            for chunk in _chunks(iter(tasks), args.batch_size):
+                task_manager.create_encrypted_tasks(user_id, chunk)
+
+        def read_all():
+            for _ in task_manager.iter_tasks_for_user(user_id):
+                pass
+
+        def complete_some():
+            for task_id in range(1, min(args.tasks, 200) + 1):
+                task_manager.update_task(task_id, user_id, is_complete=True)
+
+        for name, func, count in (
+            ("create", single, args.tasks),
+            ("create_batched", batched, args.tasks),
+            ("list", read_all, args.tasks * 2),
+            ("complete", complete_some, min(args.tasks, 200)),
+        ):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            _emit({"op": name, "count": count, "seconds": round(elapsed, 3),
+                   "ops_per_sec": _rate(count, elapsed)})
+
+
+def _login(args) -> dict:
+    if not args.user:
+        raise CliError("--user is required for this command")
+    password = _secret(PASSWORD_ENV_VAR, f"Password for {args.user}: ")
+    ok, message, user = user_auth.login_user(args.user, password)
+    if not ok:
+        raise CliError(message)
+    return user
+
+
+def _secret(env_var: str, prompt: str) -> str:
+    value = os.getenv(env_var)
+    if value is None:
+        if not sys.stdin.isatty():
+            raise CliError(f"set {env_var} when running non-interactively")
+        value = getpass.getpass(prompt)
+    if not value:
+        raise CliError(f"{prompt.rstrip(': ')} cannot be empty")
+    return value
+
+
+def _progress(stats: dict) -> None:
+    # progress goes to stderr so archives can be piped through stdout
+    print(json.dumps({"progress": stats}), file=sys.stderr)
+
+
+def _resolve_user(username: str) -> int:
+    user = task_manager.find_user(username)
+    if not user:
+        raise CliError(f"unknown user: {username}")
+    return user["user_id"]
+
+
+def _parse_import_line(number: int, line: str):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise CliError(f"line {number}: invalid JSON ({exc.msg})") from exc
+    if not isinstance(record, dict):
+        raise CliError(f"line {number}: expected a JSON object")
+    return {
+        "title": record.get("title"),
+        "details": record.get("details") or "",
+        "is_complete": bool(record.get("is_complete")),
+        "shared_with": [_resolve_user(name) for name in record.get("shared_with") or []],
+    }
+
+
+def _chunks(iterable, size):
+    while True:
+        chunk = list(itertools.islice(iterable, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _emit(obj) -> None:
+    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def _rate(count, elapsed) -> float:
+    return round(count / elapsed, 1) if elapsed > 0 else 0.0
+
+
+@contextlib.contextmanager
+def _open_input(path):
+    if path == "-":
+        yield sys.stdin
+    else:
+        with open(path, encoding="utf-8") as stream:
+            yield stream
+
+
+@contextlib.contextmanager
+def _open_output(path):
+    if path == "-":
+        yield sys.stdout
+        sys.stdout.flush()
+    else:
+        with open(path, "w", encoding="utf-8") as stream:
+            yield stream
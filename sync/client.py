@@ -0,0 +1,163 @@
+"""
+RemoteTaskManager: a drop-in stand-in for core.task_manager (and the login /
+register calls of core.user_auth) that forwards every call to a sync server.
+
+    backend = RemoteTaskManager("127.0.0.1:8765")
+    ok, msg, user = backend.login_user("alice", password)  # binds the connection
+    user_id = user["user_id"]
+    ok, msg, task_id = backend.create_encrypted_task("Title", "details", user_id)
+    results = backend.call_many([("get_task_stats", (user_id,), {}), ...])
+
+Calls are thread-safe and may be issued concurrently over the one connection;
+a reader thread routes each RESULT frame back to its caller by request id.
+"""
+
+from __future__ import annotations
+
+import itertools
+import socket
+import threading
+from typing import Any, Callable, Iterable, List, Sequence, Tuple
+
+from database.models import Task
+from sync import protocol
+
+DEFAULT_TIMEOUT_SECONDS = 30.0
+
+
+class RemoteError(Exception):
+    """Raised when the server reports that an operation failed."""
+
+
+class RemoteTaskManager:
+    def __init__(self, address: str, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        parsed = protocol.parse_address(address)
+        family = socket.AF_INET if isinstance(parsed, tuple) else socket.AF_UNIX
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.connect(parsed)
+        if family == socket.AF_INET:
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._timeout = timeout
+        self._ids = itertools.count()
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._listeners: List[Callable[[int], None]] = []
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    # ---------- calls ----------
+
+    def call(self, op: str, *args, **kwargs) -> Any:
+        """Run one operation on the server and return its result."""
+        return self._unwrap(op, self._request(protocol.CALL, [op, list(args), kwargs]))
+
+    def call_many(self, calls: Iterable[Tuple[str, Sequence, dict]]) -> List[Any]:
+        """Run several operations in one round trip; results come back in order."""
+        calls = [(op, list(args), dict(kwargs)) for op, args, kwargs in calls]
+        replies = self._request(protocol.BATCH, [list(call) for call in calls])
+        return [self._unwrap(call[0], reply) for call, reply in zip(calls, replies)]
+
+    def subscribe(self, listener: Callable[[int], None]) -> None:
+        """
+        Call listener(version) whenever the server reports a database change.
+        Listeners run on the reader thread; GUI code must hop back to its own
+        thread (e.g. by emitting a Qt signal).
+        """
+        if not self._listeners:
+            # refused until this connection has logged in
+            self._unwrap("subscribe", self._request(protocol.SUBSCRIBE, {}))
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[int], None]) -> None:
+        """Stop calling listener; e.g. when the window it updates closes."""
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def close(self) -> None:
+        self._closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def __getattr__(self, name: str):
+        if name in protocol.OPERATIONS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    # ---------- plumbing ----------
+
+    @staticmethod
+    def _unwrap(op: str, reply: dict) -> Any:
+        if not reply.get("ok"):
+            raise RemoteError(reply.get("error", "Remote call failed"))
+        result = reply.get("result")
+        if op in protocol.TUPLE_RESULTS and isinstance(result, list):
+            return tuple(result)
+        if op in protocol.TASK_RESULTS and result is not None:
+            return _to_tasks(result)
+        return result
+
+    def _request(self, frame_type: int, payload: Any) -> Any:
+        if self._closed:
+            raise ConnectionError("RemoteTaskManager is closed")
+        request_id = next(self._ids) % 0xFFFFFFFF + 1  # 0 is reserved for NOTIFY
+        slot = [threading.Event(), None]
+        with self._pending_lock:
+            self._pending[request_id] = slot
+        try:
+            data = protocol.encode_frame(frame_type, request_id, payload)
+            with self._send_lock:
+                self._sock.sendall(data)
+            if not slot[0].wait(self._timeout):
+                raise TimeoutError("Sync server did not answer in time")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+        if slot[1] is None:
+            raise ConnectionError("Connection to sync server lost")
+        return slot[1]
+
+    def _read_loop(self) -> None:
+        try:
+            while True:
+                frame = protocol.read_frame(self._sock)
+                if frame is None:
+                    break
+                frame_type, request_id, payload = frame
+                if frame_type == protocol.NOTIFY:
+                    for listener in list(self._listeners):
+                        try:
+                            listener(payload.get("version", 0))
+                        except Exception:
+                            pass
+                    continue
+                with self._pending_lock:
+                    slot = self._pending.get(request_id)
+                if slot is not None:
+                    slot[1] = payload
+                    slot[0].set()
+        except (protocol.ProtocolError, OSError):
+            pass
+        finally:
+            # wake every waiter; a None result means the connection is gone
+            with self._pending_lock:
+                for slot in self._pending.values():
+                    slot[0].set()
+
+
+def _to_tasks(result: Any) -> Any:
+    if isinstance(result, list):
+        return [Task.from_dict(task) for task in result]
+    if "inserted" in result:  # get_task_changes
+        return dict(
+            result,
+            inserted=_to_tasks(result["inserted"]),
+            updated=_to_tasks(result["updated"]),
+        )
+    return Task.from_dict(result)
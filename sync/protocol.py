@@ -0,0 +1,161 @@
+"""
+Wire format shared by the sync server and RemoteTaskManager.
+
+Every message is one frame: a 9-byte header (payload length as uint32, frame
+type as uint8, request id as uint32, all big-endian) followed by a compact
+UTF-8 JSON payload. Responses reuse the request id of the call they answer;
+server-pushed NOTIFY frames use request id 0.
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+import struct
+from typing import Any, Optional, Tuple
+
+HEADER = struct.Struct(">IBI")
+MAX_PAYLOAD_BYTES = 16 * 1024 * 1024
+
+# frame types
+CALL = 1       # payload: [op, args, kwargs]
+BATCH = 2      # payload: [[op, args, kwargs], ...] executed in order
+RESULT = 3     # payload: {"ok": true, "result": ...} or {"ok": false, "error": str}
+SUBSCRIBE = 4  # payload: {} – ask for NOTIFY frames on this connection
+NOTIFY = 5     # payload: {"version": change-feed watermark}
+
+# operations the server exposes, mapped to their module
+OPERATIONS = {
+    "create_encrypted_task": "task_manager",
+    "get_tasks_for_user": "task_manager",
+    "get_change_version": "task_manager",
+    "get_task_changes": "task_manager",
+    "get_task_stats": "task_manager",
+    "share_task_with_user": "task_manager",
+    "get_task_shares": "task_manager",
+    "update_task": "task_manager",
+    "read_task": "task_manager",
+    "delete_task": "task_manager",
+    "revoke_access": "task_manager",
+    "search_titles": "task_manager",
+    "search_task_ids": "task_manager",
+    "search_tasks": "task_manager",
+    "find_user": "task_manager",
+    "get_username": "task_manager",
+    "login_user": "user_auth",
+    "register_user": "user_auth",
+}
+
+# operations a connection may call before it has logged in
+PUBLIC_OPERATIONS = frozenset({"login_user", "register_user"})
+
+# the parameter naming the acting user: the server only runs these for the
+# user the connection logged in as (through login_user)
+USER_PARAMETERS = {
+    "create_encrypted_task": "created_by",
+    "get_tasks_for_user": "user_id",
+    "get_task_changes": "user_id",
+    "get_task_stats": "user_id",
+    "share_task_with_user": "owner_id",
+    "update_task": "user_id",
+    "read_task": "user_id",
+    "delete_task": "user_id",
+    "revoke_access": "owner_id",
+    "search_titles": "user_id",
+    "search_task_ids": "user_id",
+    "search_tasks": "user_id",
+}
+
+# task-scoped operations without a user parameter: the logged-in user must
+# have access to the task
+TASK_PARAMETERS = {"get_task_shares": "task_id"}
+
+# operations that write; the server runs these one at a time and notifies
+MUTATING_OPERATIONS = frozenset({
+    "create_encrypted_task",
+    "share_task_with_user",
+    "update_task",
+    "delete_task",
+    "revoke_access",
+    "register_user",
+    "login_user",  # may upgrade a legacy password hash
+})
+
+# operations whose Python API returns a tuple (JSON only has arrays)
+TUPLE_RESULTS = frozenset({
+    "create_encrypted_task",
+    "share_task_with_user",
+    "update_task",
+    "delete_task",
+    "revoke_access",
+    "login_user",
+    "register_user",
+})
+
+
+# operations whose result holds Task objects; they travel as plain dicts and
+# RemoteTaskManager rebuilds the Tasks
+TASK_RESULTS = frozenset({
+    "get_tasks_for_user",
+    "get_task_changes",
+    "search_tasks",
+    "read_task",
+})
+
+
+class ProtocolError(Exception):
+    """Raised for malformed frames or a connection closed mid-frame."""
+
+
+def encode_frame(frame_type: int, request_id: int, payload: Any) -> bytes:
+    body = json.dumps(payload, separators=(",", ":"), default=_encode_object).encode("utf-8")
+    if len(body) > MAX_PAYLOAD_BYTES:
+        raise ProtocolError("Frame payload too large")
+    return HEADER.pack(len(body), frame_type, request_id) + body
+
+
+def _encode_object(obj: Any) -> Any:
+    # Tasks (and anything else exposing to_dict) go over the wire as objects
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 65536))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ProtocolError("Connection closed mid-frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame(sock: socket.socket) -> Optional[Tuple[int, int, Any]]:
+    """Read one frame; returns (frame_type, request_id, payload) or None on EOF."""
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    length, frame_type, request_id = HEADER.unpack(header)
+    if length > MAX_PAYLOAD_BYTES:
+        raise ProtocolError("Frame payload too large")
+    body = _recv_exact(sock, length) if length else b""
+    if body is None:
+        raise ProtocolError("Connection closed mid-frame")
+    try:
+        payload = json.loads(body.decode("utf-8")) if body else None
+    except ValueError as exc:
+        raise ProtocolError("Frame payload is not valid JSON") from exc
+    return frame_type, request_id, payload
+
+
+def parse_address(address: str):
+    """'host:port' -> (host, port) for TCP, anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
@@ -0,0 +1,250 @@
+"""
+Local sync server that owns the PlanIt database.
+
+Clients talk to it through RemoteTaskManager instead of opening the SQLite
+file themselves. The server serializes writers in-process (instead of having
+every client fight over file locks), executes BATCH frames in one round trip
+and pushes NOTIFY frames to subscribed clients whenever the database changes,
+whether the commit came from a client call or from another process.
+
+Each connection starts anonymous and may only call login_user or
+register_user. A successful login_user binds the connection to that user;
+after that, calls naming another user (user_id, owner_id, created_by) or a
+task the user cannot access are refused. Still bind to loopback (the
+default) or a Unix socket, which is created with 0600 permissions: frames
+are not encrypted.
+
+Run with:  python -m sync.server [--listen 127.0.0.1:8765 | --listen /tmp/planit.sock]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import inspect
+import os
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    # Allow running this module directly by ensuring project root is importable.
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from core import metrics
+from database.change_monitor import DataVersionMonitor
+from database.db_setup import initialize_database
+from database.models import Permission
+from sync import protocol
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+WATCH_INTERVAL_SECONDS = 0.25
+PRUNE_INTERVAL_SECONDS = 3600  # how often the watcher trims the change feed
+
+
+def _resolve_operations():
+    modules = {}
+    operations = {}
+    for name, module_name in protocol.OPERATIONS.items():
+        if module_name not in modules:
+            modules[module_name] = importlib.import_module(f"core.{module_name}")
+        operations[name] = getattr(modules[module_name], name)
+    return operations
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self._send_lock = threading.Lock()
+        self.user_id = None  # set by a successful login_user on this connection
+
+    def send(self, frame_type, request_id, payload):
+        data = protocol.encode_frame(frame_type, request_id, payload)
+        with self._send_lock:
+            self.request.sendall(data)
+
+    def handle(self):
+        server = self.server
+        try:
+            while True:
+                frame = protocol.read_frame(self.request)
+                if frame is None:
+                    return
+                frame_type, request_id, payload = frame
+                if frame_type == protocol.CALL:
+                    self.send(protocol.RESULT, request_id, server.execute(payload, self))
+                elif frame_type == protocol.BATCH:
+                    results = [server.execute(call, self) for call in payload or []]
+                    self.send(protocol.RESULT, request_id, results)
+                elif frame_type == protocol.SUBSCRIBE:
+                    if self.user_id is None:
+                        self.send(protocol.RESULT, request_id, {"ok": False, "error": "Not logged in"})
+                        continue
+                    server.subscribe(self)
+                    self.send(protocol.RESULT, request_id, {"ok": True, "result": None})
+                else:
+                    self.send(protocol.RESULT, request_id, {"ok": False, "error": "Unknown frame type"})
+        except (protocol.ProtocolError, OSError):
+            return
+        finally:
+            server.unsubscribe(self)
+
+
+class _SyncServerMixin:
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def init_sync(self):
+        self.operations = _resolve_operations()
+        self._signatures = {name: inspect.signature(func) for name, func in self.operations.items()}
+        self._write_lock = threading.Lock()
+        self._subscribers = set()
+        self._subscribers_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(target=self._watch_database, daemon=True)
+        self._watcher.start()
+
+    def execute(self, call, session):
+        """Run one [op, args, kwargs] call for session (the connection handler)."""
+        try:
+            op, args, kwargs = call
+            func = self.operations[op]
+        except (TypeError, ValueError, KeyError):
+            return {"ok": False, "error": "Unknown operation"}
+        denied = self._authorize(op, args or (), kwargs or {}, session.user_id)
+        if denied:
+            return {"ok": False, "error": denied}
+        try:
+            if op in protocol.MUTATING_OPERATIONS:
+                with self._write_lock:
+                    result = func(*(args or ()), **(kwargs or {}))
+            else:
+                result = func(*(args or ()), **(kwargs or {}))
+        except Exception as exc:
+            return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        if op == "login_user":
+            ok, _, user = result
+            session.user_id = user["user_id"] if ok else None
+            if ok:
+                # tasks from before the search index get their tokens in the background
+                from core import task_manager
+                task_manager.start_search_backfill(session.user_id)
+        return {"ok": True, "result": result}
+
+    def _authorize(self, op, args, kwargs, user_id):
+        """None if user_id may make this call, else the error to send back."""
+        if op in protocol.PUBLIC_OPERATIONS:
+            return None
+        if user_id is None:
+            return "Not logged in"
+        name = protocol.USER_PARAMETERS.get(op) or protocol.TASK_PARAMETERS.get(op)
+        if name is None:
+            return None
+        try:
+            value = self._signatures[op].bind(*args, **kwargs).arguments.get(name)
+        except TypeError as exc:
+            return f"TypeError: {exc}"
+        if op in protocol.USER_PARAMETERS:
+            allowed = type(value) is int and value == user_id
+        else:
+            allowed = Permission.check(user_id, value)
+        return None if allowed else "Permission denied"
+
+    def subscribe(self, handler):
+        with self._subscribers_lock:
+            self._subscribers.add(handler)
+
+    def unsubscribe(self, handler):
+        with self._subscribers_lock:
+            self._subscribers.discard(handler)
+
+    def broadcast(self, version):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for handler in subscribers:
+            try:
+                handler.send(protocol.NOTIFY, 0, {"version": version})
+            except OSError:
+                self.unsubscribe(handler)
+
+    def _watch_database(self):
+        # owns its own connection, so it sees every commit (ours and others')
+        from core import task_manager
+
+        monitor = DataVersionMonitor()
+        next_prune = 0.0
+        try:
+            while not self._stop.wait(WATCH_INTERVAL_SECONDS):
+                if time.monotonic() >= next_prune:
+                    try:
+                        task_manager.prune_expired_task_changes()
+                        next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+                    except sqlite3.OperationalError:
+                        pass  # e.g. locked by a long writer; try again next tick
+                if monitor.poll() and self._subscribers:
+                    self.broadcast(task_manager.get_change_version())
+        finally:
+            monitor.close()
+
+    def server_close(self):
+        self._stop.set()
+        super().server_close()
+
+
+class TCPSyncServer(_SyncServerMixin, socketserver.ThreadingTCPServer):
+    def __init__(self, address):
+        super().__init__(address, _ConnectionHandler)
+        self.init_sync()
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class UnixSyncServer(_SyncServerMixin, socketserver.ThreadingUnixStreamServer):
+        def __init__(self, path):
+            if os.path.exists(path):
+                os.unlink(path)
+            old_umask = os.umask(0o177)
+            try:
+                super().__init__(path, _ConnectionHandler)
+            finally:
+                os.umask(old_umask)
+            self.init_sync()
+
+        def server_close(self):
+            super().server_close()
+            try:
+                os.unlink(self.server_address)
+            except OSError:
+                pass
+
+
+def create_server(address=DEFAULT_ADDRESS):
+    """Bind a sync server to 'host:port' or a Unix socket path (not yet serving)."""
+    parsed = protocol.parse_address(address)
+    if isinstance(parsed, tuple):
+        return TCPSyncServer(parsed)
+    return UnixSyncServer(parsed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PlanIt local sync server")
+    parser.add_argument("--listen", default=DEFAULT_ADDRESS,
+                        help="host:port or Unix socket path (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    initialize_database()
+    metrics.start_from_env()
+    server = create_server(args.listen)
+    print(f"PlanIt sync server listening on {args.listen}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import pytest
+
+from crypto import key_manager
+from database import db_setup
+
+
+@pytest.fixture
+def temp_environment(tmp_path, monkeypatch):
+    """Isolate the SQLite DB and master key for every test run."""
+    db_path = tmp_path / "todo.db"
+    monkeypatch.setattr(db_setup, "DATABASE_NAME", str(db_path))
+    db_setup.initialize_database()
+
+    key_path = tmp_path / "master.key"
+    monkeypatch.setenv(key_manager.MASTER_KEY_ENV_VAR, str(key_path))
+    key_manager.reset_master_key_cache()
+    yield
@@ -0,0 +1,72 @@
+from gui import animations
+from gui.qt_compat import QtCore
+
+Running = QtCore.QAbstractAnimation.Running
+Paused = QtCore.QAbstractAnimation.Paused
+Stopped = QtCore.QAbstractAnimation.Stopped
+
+
+class _Window(QtCore.QObject):
+    def __init__(self):
+        super().__init__()
+        self.visible = True
+        self.minimized = False
+
+    def isVisible(self):
+        return self.visible
+
+    def isMinimized(self):
+        return self.minimized
+
+
+def _anim(parent, duration=200, loops=1):
+    anim = QtCore.QVariantAnimation(parent)
+    anim.setDuration(duration)
+    anim.setStartValue(0.0)
+    anim.setEndValue(1.0)
+    anim.setLoopCount(loops)
+    return anim
+
+
+def test_scheduler_budgets_coalesces_and_pauses(monkeypatch):
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    monkeypatch.setattr(animations, "MAX_EFFECTS", 2)
+    window = _Window()
+    scheduler = animations.AnimationScheduler(window, reduced_motion=False)
+
+    finished = []
+    first = _anim(window)
+    first.finished.connect(lambda: finished.append("first"))
+    assert scheduler.start_effect(first, key="sparkle") is True
+    second = _anim(window)
+    assert scheduler.start_effect(second, key="sparkle") is True
+    # the new sparkle replaced the old one, which still ran its cleanup
+    assert finished == ["first"] and first.state() == Stopped
+    assert scheduler.running_effects() == 1
+
+    assert scheduler.start_effect(_anim(window)) is True
+    over = _anim(window)
+    assert scheduler.start_effect(over) is False  # over budget: skipped to the end
+    assert over.state() == Stopped and over.currentValue() == 1.0
+    assert scheduler.running_effects() == 2
+
+    mascot = _anim(window, 1800, loops=-1)
+    scheduler.add_ambient(mascot)
+    assert mascot.state() == Running
+    window.minimized = True
+    scheduler.eventFilter(window, QtCore.QEvent(QtCore.QEvent.WindowStateChange))
+    assert mascot.state() == Paused
+    window.minimized = False
+    scheduler.eventFilter(window, QtCore.QEvent(QtCore.QEvent.WindowStateChange))
+    assert mascot.state() == Running
+
+    # no input for AMBIENT_IDLE_MS pauses it; any input resumes it
+    scheduler._last_input -= animations.AMBIENT_IDLE_MS / 1000
+    scheduler._check_idle()
+    assert mascot.state() == Paused
+    scheduler.eventFilter(app, QtCore.QEvent(QtCore.QEvent.KeyPress))
+    assert mascot.state() == Running
+
+    scheduler.reduced_motion = True
+    assert mascot.state() == Paused and scheduler.running_effects() == 0
+    assert scheduler.start_effect(_anim(window)) is False
@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+from core import archive, task_manager
+from database import db_setup
+from database.models import User
+
+
+@pytest.fixture(autouse=True)
+def fast_kdf(temp_environment, monkeypatch):
+    monkeypatch.setattr(archive, "KDF_ITERATIONS", 1000)
+
+
+def _stored_details():
+    conn = db_setup.get_connection()
+    rows = conn.execute("SELECT details FROM todos ORDER BY task_id").fetchall()
+    conn.close()
+    return [details for (details,) in rows]
+
+
+def test_archive_round_trip_keeps_ciphertext_and_rewraps_keys():
+    owner_id = User.create("owner", "pw")
+    other_id = User.create("other", "pw")
+    task_manager.create_encrypted_tasks(owner_id, [
+        {"title": f"Task {n}", "details": f"secret notes {n}", "is_complete": n == 2}
+        for n in range(5)
+    ])
+    buffer = io.BytesIO()
+    stats = archive.export_tasks(owner_id, buffer, "correct horse")
+    assert stats["tasks"] == 5 and stats["bytes"] == len(buffer.getvalue())
+    assert b"secret notes" not in buffer.getvalue()
+
+    progress = []
+    buffer.seek(0)
+    stats = archive.import_tasks(other_id, buffer, "correct horse", chunk_size=2,
+                                 progress=progress.append)
+    assert stats["tasks"] == 5
+    assert [p["tasks"] for p in progress] == [2, 4]
+
+    restored = task_manager.get_tasks_for_user(other_id)
+    assert [t["details"] for t in restored] == [f"secret notes {n}" for n in range(5)]
+    assert [t["is_complete"] for t in restored] == [False, False, True, False, False]
+    details = _stored_details()
+    assert details[5:] == details[:5]  # same ciphertext, only the key was re-wrapped
+    assert task_manager.search_task_ids(other_id, "notes") == [t["task_id"] for t in restored]
+
+
+def test_wrong_passphrase_and_truncation_write_nothing():
+    owner_id = User.create("owner", "pw")
+    task_manager.create_encrypted_task("Plan", "notes", owner_id)
+    buffer = io.BytesIO()
+    archive.export_tasks(owner_id, buffer, "right")
+
+    with pytest.raises(archive.ArchiveError, match="wrong passphrase"):
+        archive.import_tasks(owner_id, io.BytesIO(buffer.getvalue()), "wrong")
+    with pytest.raises(archive.ArchiveError, match="truncated"):
+        archive.import_tasks(owner_id, io.BytesIO(buffer.getvalue()[:-2]), "right")
+    with pytest.raises(archive.ArchiveError, match="Not a PlanIt archive"):
+        archive.import_tasks(owner_id, io.BytesIO(b"not an archive"), "right")
+    assert len(task_manager.get_tasks_for_user(owner_id)) == 1
+
+
+@pytest.mark.parametrize("changes, message", [
+    ({"title": None}, "has no title"),
+    ({"title": "   "}, "Title cannot be empty"),
+    ({"title": "x" * 201}, "Title too long"),
+    ({"created_at": "yesterday"}, "invalid created_at"),
+])
+def test_invalid_records_raise_archive_errors(changes, message):
+    owner_id = User.create("owner", "pw")
+    task_manager.create_encrypted_task("Plan", "notes", owner_id)
+    buffer = io.BytesIO()
+    archive.export_tasks(owner_id, buffer, "right")
+
+    # rewrite the one record with the bad field
+    source = io.BytesIO(buffer.getvalue())
+    header, record = list(archive._read_records(source, archive._Stats()))
+    tampered = io.BytesIO()
+    tampered.write(archive.MAGIC)
+    archive._write_record(tampered, header)
+    archive._write_record(tampered, dict(record, **changes))
+    tampered.write(archive.LENGTH.pack(0))
+
+    with pytest.raises(archive.ArchiveError, match=message):
+        archive.import_tasks(owner_id, io.BytesIO(tampered.getvalue()), "right")
+    assert len(task_manager.get_tasks_for_user(owner_id)) == 1
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+
+from core import task_manager
+from core.async_task_manager import AsyncTaskManager
+from database.models import User
+
+
+pytestmark = pytest.mark.usefixtures("temp_environment")
+
+
+def test_async_calls_match_sync_api():
+    owner_id = User.create("owner", "pw")
+    collab_id = User.create("collab", "pw")
+
+    async def scenario():
+        async with AsyncTaskManager(db_pool_size=2, crypto_workers=2) as manager:
+            ok, _, task_id = await manager.create_encrypted_task("Plan", "alpha notes", owner_id)
+            assert ok
+            assert await manager.share_task_with_user(task_id, owner_id, collab_id) == (True, "Task shared")
+            assert await manager.update_task(task_id, collab_id, new_details="beta notes") == (True, "Task updated")
+            assert await manager.update_task(task_id, owner_id, is_complete=True) == (True, "Task updated")
+            assert await manager.update_task(task_id, owner_id, new_title=" ") == (False, "Title cannot be empty")
+            tasks = await manager.get_tasks_for_user(collab_id)
+            stats = await manager.get_task_stats(owner_id)
+            assert await manager.delete_task(task_id, collab_id) == (False, "Only the creator can delete this task")
+            return task_id, tasks, stats
+
+    task_id, tasks, stats = asyncio.run(scenario())
+    assert tasks == task_manager.get_tasks_for_user(collab_id)
+    assert tasks[0]["details"] == "beta notes" and tasks[0]["is_complete"] is True
+    assert stats["completed"] == 1 and stats["shared_by_me"] == 1
+    # blind tokens were re-derived for every user with access
+    assert task_manager.search_task_ids(owner_id, "beta") == [task_id]
+    assert task_manager.search_task_ids(collab_id, "alpha") == []
+
+
+def test_concurrent_users_with_backpressure():
+    user_ids = [User.create(f"user{i}", "pw") for i in range(4)]
+
+    async def scenario():
+        async with AsyncTaskManager(max_pending=3) as manager:
+            results = await asyncio.gather(*(
+                manager.create_encrypted_task(f"Task {n}", f"notes {n}", user_id)
+                for user_id in user_ids
+                for n in range(10)
+            ))
+            assert all(ok for ok, _, _ in results)
+            return await asyncio.gather(*(manager.get_tasks_for_user(u) for u in user_ids))
+
+    per_user = asyncio.run(scenario())
+    assert [len(tasks) for tasks in per_user] == [10, 10, 10, 10]
+    # concurrent creates commit in any order, so compare contents only
+    assert {task["details"] for task in per_user[0]} == {f"notes {n}" for n in range(10)}
+
+
+def test_cancelled_create_leaves_no_partial_rows():
+    owner_id = User.create("owner", "pw")
+
+    async def scenario():
+        async with AsyncTaskManager(max_pending=1) as manager:
+            blocker = asyncio.create_task(manager.get_tasks_for_user(owner_id))
+            pending = asyncio.create_task(manager.create_encrypted_task("Never", "x", owner_id))
+            await asyncio.sleep(0)
+            pending.cancel()
+            await blocker
+            with pytest.raises(asyncio.CancelledError):
+                await pending
+
+    asyncio.run(scenario())
+    assert task_manager.get_tasks_for_user(owner_id) == []
+    assert task_manager.get_task_stats(owner_id)["total"] == 0
+
+
+def test_closing_does_not_block_the_event_loop():
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        manager = AsyncTaskManager(db_pool_size=1)
+        manager._db_executor.submit(time.sleep, 0.3)  # in-flight DB work
+        ticking = asyncio.create_task(ticker())
+        await manager.aclose()
+        ticking.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
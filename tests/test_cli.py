@@ -0,0 +1,68 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from core import task_manager, user_auth
+from planit import cli
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(autouse=True)
+def users(temp_environment, monkeypatch):
+    """alice and bob, with the password the CLI reads from the environment."""
+    monkeypatch.setenv(cli.PASSWORD_ENV_VAR, "secret123")
+    user_auth.register_user("alice", "secret123")
+    user_auth.register_user("bob", "secret123")
+
+
+def _run(capsys, *argv):
+    code = cli.main(["--user", "alice", *argv])
+    out = capsys.readouterr().out
+    return code, [json.loads(line) for line in out.splitlines()]
+
+
+def test_import_export_round_trip_in_batches(tmp_path, capsys):
+    source = tmp_path / "in.jsonl"
+    source.write_text(
+        "\n".join(json.dumps({"title": f"Task {n}", "details": f"notes {n}",
+                              "is_complete": n % 2 == 0, "shared_with": ["bob"] if n == 1 else []})
+                  for n in range(5)) + "\n",
+        encoding="utf-8",
+    )
+    code, lines = _run(capsys, "import", str(source), "--batch-size", "2")
+    assert code == 0 and lines[0]["imported"] == 5
+
+    code, exported = _run(capsys, "export")
+    assert [task["title"] for task in exported] == [f"Task {n}" for n in range(5)]
+    assert exported[1]["shared_with"] == ["bob"] and exported[1]["details"] == "notes 1"
+
+    code, pending = _run(capsys, "list", "--status", "pending")
+    assert [task["title"] for task in pending] == ["Task 1", "Task 3"]
+    bob = task_manager.find_user("bob")["user_id"]
+    assert task_manager.get_task_stats(bob)["shared_with_me"] == 1
+
+
+def test_invalid_batch_is_not_written(tmp_path, capsys):
+    source = tmp_path / "in.jsonl"
+    source.write_text('{"title": "ok"}\n{"title": "  "}\n', encoding="utf-8")
+    assert cli.main(["--user", "alice", "import", str(source)]) == 1
+    assert "Title is required" in capsys.readouterr().err
+    alice = task_manager.find_user("alice")["user_id"]
+    assert task_manager.get_tasks_for_user(alice) == []
+
+
+def test_cli_does_not_import_qt(tmp_path):
+    code = (
+        "import sys\n"
+        "from planit import cli\n"
+        f"cli.main(['--db', {str(tmp_path / 'todo.db')!r}, '--user', 'alice', 'stats'])\n"
+        "assert not [m for m in sys.modules if m.startswith(('PyQt5', 'qtawesome', 'gui'))]\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)["total"] == 0
@@ -1,6 +1,6 @@
 import pytest
 
-from crypto import encryption, key_manager
+from crypto import blind_index, encryption, key_manager
 
 
 @pytest.fixture(autouse=True)
@@ -40,3 +40,19 @@ def test_encrypted_data_key_round_trip():
     
     with pytest.raises(ValueError):
         key_manager.decrypt_data_key_for_user(6, encrypted_key)
+
+
+def test_blind_tokens_are_normalized_and_user_specific():
+    words = blind_index.normalize_words("Buy MILK, buy milk!")
+    assert words == {"buy", "milk"}
+
+    # the longest valid details: every word is kept, whatever its letter
+    long_words = [f"{chr(97 + n % 26)}{chr(97 + n // 26)}" for n in range(333)]
+    long_details = " ".join(long_words)
+    assert len(long_details) <= 1000
+    assert blind_index.normalize_words(long_details) == set(long_words)  # "zl" too
+    
+    tokens_1 = blind_index.blind_tokens(1, sorted(words))
+    assert tokens_1 == blind_index.blind_tokens(1, sorted(words))
+    assert tokens_1 != blind_index.blind_tokens(2, sorted(words))
+    assert "milk" not in tokens_1
@@ -0,0 +1,106 @@
+import base64
+import threading
+
+import pytest
+
+from core import key_rotation, task_manager
+from crypto import key_manager
+from database import db_setup
+from database.models import User
+
+
+pytestmark = pytest.mark.usefixtures("temp_environment")
+
+
+def _key_versions():
+    conn = db_setup.get_connection()
+    rows = conn.execute("SELECT key_version, encrypted_key FROM encryption_keys ORDER BY key_id").fetchall()
+    conn.close()
+    return rows
+
+
+def test_old_and_new_master_keys_work_side_by_side(tmp_path):
+    owner_id = User.create("owner", "pw")
+    _, _, old_task = task_manager.create_encrypted_task("Old", "before rotation", owner_id)
+    assert key_manager.create_master_key_version() == 2
+    assert (tmp_path / "master.key.v2").exists()
+    _, _, new_task = task_manager.create_encrypted_task("New", "after rotation", owner_id)
+
+    versions = _key_versions()
+    assert [version for version, _ in versions] == [1, 2]
+    assert versions[1][1].startswith("v2$")
+    assert [t["details"] for t in task_manager.get_tasks_for_user(owner_id)] == [
+        "before rotation",
+        "after rotation",
+    ]
+
+
+def test_rotation_is_batched_resumable_and_silent_in_change_feed():
+    owner_id = User.create("owner", "pw")
+    collab_id = User.create("collab", "pw")
+    task_manager.create_encrypted_tasks(owner_id, [
+        {"title": f"Task {n}", "details": f"notes {n}", "shared_with": [collab_id]}
+        for n in range(10)
+    ])
+    key_manager.create_master_key_version()
+    version_before = task_manager.get_change_version()
+
+    stop = threading.Event()
+    batches = []
+
+    def stop_after_first_batch(stats):
+        batches.append(stats)
+        stop.set()
+
+    first = key_rotation.rotate_keys(batch_size=4, pause=0, progress=stop_after_first_batch,
+                                     stop_event=stop)
+    assert first["rotated"] == 4 and first["remaining"] == 16
+
+    second = key_rotation.rotate_keys(batch_size=4, pause=0)
+    assert second["rotated"] == 16 and second["remaining"] == 0 and second["failed"] == 0
+    assert {version for version, _ in _key_versions()} == {2}
+
+    assert task_manager.get_change_version() == version_before
+    assert [t["details"] for t in task_manager.get_tasks_for_user(collab_id)] == [
+        f"notes {n}" for n in range(10)
+    ]
+
+
+def test_missing_key_version_is_not_silently_recreated(tmp_path):
+    key_manager.create_master_key_version()
+    (tmp_path / "master.key").unlink()
+    key_manager.reset_master_key_cache()
+    with pytest.raises(ValueError, match="version 1 not found"):
+        key_manager.derive_user_key(1)
+
+
+def _lose_race_once(monkeypatch, other_key):
+    """Make the next key file write find the file already created by another process."""
+    original = key_manager._write_new_master_key
+    raced = []
+
+    def write(path):
+        if not raced:
+            raced.append(path)
+            path.write_bytes(base64.urlsafe_b64encode(other_key))
+        return original(path)
+
+    monkeypatch.setattr(key_manager, "_write_new_master_key", write)
+    return raced
+
+
+def test_losing_the_race_to_create_the_master_key_uses_the_winners_key(tmp_path, monkeypatch):
+    other_key = bytes(range(32))
+    raced = _lose_race_once(monkeypatch, other_key)
+
+    assert key_manager.get_master_key() == other_key
+    assert raced == [tmp_path / "master.key"]
+
+
+def test_losing_the_race_for_a_key_version_takes_the_next_one(tmp_path, monkeypatch):
+    key_manager.get_master_key()
+    raced = _lose_race_once(monkeypatch, bytes(32))
+
+    assert key_manager.create_master_key_version() == 3
+    assert raced == [tmp_path / "master.key.v2"]
+    assert key_manager.current_key_version() == 3
@@ -0,0 +1,51 @@
+import pytest
+
+from core import metrics, task_manager
+from database.models import User
+
+
+@pytest.fixture(autouse=True)
+def metrics_off(temp_environment):
+    """A fresh metrics registry, off whatever PLANIT_METRICS says."""
+    was_enabled = metrics.is_enabled()
+    metrics.enable(False)
+    metrics.reset()
+    yield
+    metrics.enable(was_enabled)
+    metrics.reset()
+
+
+def test_hot_paths_record_only_when_enabled():
+    owner_id = User.create("owner", "pw")
+    task_manager.create_encrypted_task("Secret", "Hidden notes", owner_id)
+    task_manager.get_tasks_for_user(owner_id)
+    assert metrics.snapshot() == {"enabled": False, "counters": {}, "histograms": {}}
+
+    metrics.enable()
+    tasks = task_manager.get_tasks_for_user(owner_id)
+    assert tasks[0]["details"] == "Hidden notes"
+
+    snap = metrics.snapshot()
+    assert snap["counters"]["db.connections"] == 1
+    histograms = snap["histograms"]
+    assert histograms["db.statement.select"]["count"] == 1
+    assert histograms["crypto.unwrap_key"]["count"] == 1
+    assert histograms["crypto.decrypt"]["count"] == 1
+    decrypt = histograms["crypto.decrypt"]
+    assert 0 < decrypt["p50_ms"] <= decrypt["p99_ms"] <= decrypt["max_ms"]
+    assert metrics.summary_line().startswith("metrics: ")
+
+
+def test_prometheus_text_has_cumulative_buckets():
+    metrics.enable()
+    metrics.inc("db.connections", 3)
+    for seconds in (0.000001, 0.003, 0.003, 20.0):
+        metrics.observe("gui.refresh", seconds)
+
+    text = metrics.render_prometheus()
+    assert "# TYPE planit_db_connections_total counter\nplanit_db_connections_total 3\n" in text
+    assert 'planit_gui_refresh_seconds_bucket{le="1e-06"} 1\n' in text
+    assert 'planit_gui_refresh_seconds_bucket{le="0.004096"} 3\n' in text
+    assert 'planit_gui_refresh_seconds_bucket{le="+Inf"} 4\n' in text
+    assert "planit_gui_refresh_seconds_count 4\n" in text
+    assert metrics.histogram("gui.refresh").percentile(99) == 20.0
@@ -0,0 +1,32 @@
+import time
+
+from gui import profiler
+from gui.qt_compat import QtCore
+
+
+def _stall():
+    time.sleep(0.3)
+
+
+def test_sections_and_stalls_are_reported(tmp_path):
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    assert profiler.section("refresh").__class__.__name__ == "_NullSection"
+    assert profiler.stop() is None
+
+    # no event loop runs here, so the heartbeat cannot beat while we sleep
+    profiler.start(lag_ms=100, report_dir=str(tmp_path))
+    try:
+        with profiler.section("refresh"):
+            with profiler.section("select"):
+                _stall()
+    finally:
+        path = profiler.stop()
+
+    assert not profiler.is_active()
+    text = path.read_text(encoding="utf-8")
+    assert path.parent == tmp_path and path.name.startswith("planit-profile-")
+    assert "refresh" in text and "select" in text
+    assert "1 stall(s) over 100 ms" in text
+    assert "in refresh > select" in text
+    assert "in _stall" in text  # the stack shows the call that froze the loop
+    assert "=== refresh" in text and "=== select" not in text  # nested: one profile
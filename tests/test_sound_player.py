@@ -0,0 +1,108 @@
+import subprocess
+
+import pytest
+
+pytest.importorskip("pygame")
+
+from gui import sound_player
+from gui.sound_player import SoundPlayer
+
+
+@pytest.fixture
+def player(monkeypatch):
+    monkeypatch.setenv("SDL_AUDIODRIVER", "dummy")
+    player = SoundPlayer()
+    if player.backend != "mixer":
+        pytest.skip("pygame.mixer could not open an audio device")
+    return player
+
+
+def test_sounds_are_preloaded_and_played_without_subprocesses(player, monkeypatch):
+    def no_spawn(*args, **kwargs):
+        raise AssertionError("effects must not spawn a player process")
+
+    monkeypatch.setattr(subprocess, "Popen", no_spawn)
+    assert player.preload() >= 5
+    assert player.play("onetask.mp3") is True
+    assert player.play("sharetask.mp3") is True  # falls back to sharing.mp3
+    assert player.play("missing.mp3") is False
+
+
+class _FakeProcess:
+    def __init__(self):
+        self.running = True
+        self.polls = 0
+
+    def poll(self):
+        self.polls += 1
+        return None if self.running else 0
+
+    def terminate(self):
+        self.running = False
+
+    def kill(self):
+        self.running = False
+
+    def wait(self, timeout=None):
+        raise AssertionError("must not block the GUI thread")
+
+
+def test_scheduler_merges_caps_and_reaps(monkeypatch):
+    now = [0.0]
+    processes = []
+
+    def spawn(*args, **kwargs):
+        processes.append(_FakeProcess())
+        return processes[-1]
+
+    player = SoundPlayer(clock=lambda: now[0])
+    monkeypatch.setattr(player, "_mixer", False)
+    monkeypatch.setattr(player, "_native", "mpg123")
+    monkeypatch.setattr(subprocess, "Popen", spawn)
+    monkeypatch.setattr(sound_player, "MAX_VOICES", 3)
+
+    assert player.play("onetask.mp3") and player.play("onetask.mp3")  # second is merged
+    assert len(processes) == 1
+    now[0] = 0.2
+    assert player.play("onetask.mp3")
+    now[0] = 0.4
+    assert player.play("onetask.mp3") is False  # onetask allows 2 voices
+    assert player.play("welcome.mp3") and player.voice_count() == 3
+    assert player.play("deletetask.mp3") is False  # global cap reached
+
+    processes[0].running = False
+    assert player.play("deletetask.mp3") and player.voice_count() == 3
+    assert all(process.polls for process in processes[:3])  # finished one was reaped
+
+    now[0] = 1.0
+    assert player.play("deletetask.mp3")  # "restart": replaces its own voice
+    assert processes[3].running is False and len(processes) == 5
+
+
+def test_stopped_processes_are_reaped_without_waiting(monkeypatch):
+    now = [0.0]
+    processes = []
+
+    class Stubborn(_FakeProcess):
+        def terminate(self):
+            pass  # ignores SIGTERM
+
+    def spawn(*args, **kwargs):
+        processes.append(Stubborn())
+        return processes[-1]
+
+    player = SoundPlayer(clock=lambda: now[0])
+    monkeypatch.setattr(player, "_mixer", False)
+    monkeypatch.setattr(player, "_native", "mpg123")
+    monkeypatch.setattr(subprocess, "Popen", spawn)
+
+    assert player.play("deletetask.mp3")
+    now[0] = 1.0
+    assert player.play("deletetask.mp3")  # "restart" stops the first at once
+    assert processes[0].running and player._stopped
+
+    monkeypatch.setattr(sound_player, "KILL_AFTER_SECONDS", 0)
+    player.reap()  # overdue: killed
+    assert processes[0].running is False
+    player.reap()  # and collected
+    assert player._stopped == [] and player.voice_count() == 1
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from core import task_manager
+from database import db_setup, sql_trace
+from database.models import User
+
+
+@pytest.fixture(autouse=True)
+def trace_off(temp_environment):
+    """Switch tracing back off after each test."""
+    yield
+    sql_trace.configure(enabled=False)
+
+
+def test_slow_log_has_shapes_plans_and_no_secrets(tmp_path):
+    owner_id = User.create("owner", "pw")
+    friend_id = User.create("friend", "pw")
+    log_path = tmp_path / "sql.log"
+    sql_trace.configure(threshold_ms=0, path=str(log_path), explain=True)
+
+    _, _, task_id = task_manager.create_encrypted_task("Plan", "my secret notes", owner_id, [friend_id])
+    task_manager.get_tasks_for_user(friend_id)
+    task_manager.get_tasks_for_user(friend_id)
+    sql_trace.configure(enabled=False)
+
+    text = log_path.read_text(encoding="utf-8")
+    conn = db_setup.get_connection()
+    details, wrapped = conn.execute(
+        "SELECT t.details, ek.encrypted_key FROM todos t JOIN encryption_keys ek ON ek.task_id = t.task_id "
+        "WHERE t.task_id = ? AND ek.user_id = ?", (task_id, friend_id)
+    ).fetchone()
+    conn.close()
+    for secret in ("my secret notes", "secret", details, wrapped):
+        assert secret not in text
+
+    entries = [json.loads(line) for line in text.splitlines()]
+    todo_insert = next(e for e in entries if e["event"] == "slow" and e["sql"].startswith("INSERT INTO todos"))
+    assert todo_insert["params"] == ["str[4]", f"str[{len(details)}]", "int", "int", "int", "null"]
+    assert todo_insert["caller"].startswith("core/task_manager.py:")
+
+    listing = [e for e in entries if "JOIN permissions p" in e["sql"] and e["sql"].startswith("SELECT t.task_id")]
+    assert [e["event"] for e in listing] == ["plan", "slow", "slow"]  # plan once per shape
+    assert any("encryption_keys" in step for step in listing[0]["plan"])
+
+    ranked = sql_trace.summarize(text.splitlines())
+    assert ranked[0]["total_ms"] >= ranked[-1]["total_ms"]
+    listing_rank = next(item for item in ranked if item["sql"] == listing[0]["sql"])
+    assert listing_rank["count"] == 2 and listing_rank["plan"] == listing[0]["plan"]
+
+
+def test_normalize_groups_in_lists():
+    assert sql_trace.normalize("SELECT *\n  FROM t WHERE id IN (?, ?,?)") == "SELECT * FROM t WHERE id IN (?...)"
+    assert sql_trace.normalize("SELECT * FROM t WHERE id in (?)") == "SELECT * FROM t WHERE id IN (?...)"
+    assert sql_trace.normalize("INSERT INTO t (a) VALUES (?)") == "INSERT INTO t (a) VALUES (?)"
@@ -0,0 +1,23 @@
+import pytest
+
+from gui.startup import Startup
+
+
+def test_failing_optional_steps_are_skipped_but_required_ones_stop_startup(capsys):
+    ran = []
+
+    def broken():
+        raise RuntimeError("no audio device")
+
+    startup = Startup(report=False)
+    startup.defer("sounds", broken)
+    startup.defer("icons", lambda: ran.append("icons"))
+    startup.finish()
+    assert ran == ["icons"]
+    assert "Deferred startup step 'sounds' failed: no audio device" in capsys.readouterr().err
+
+    startup.defer("database schema", broken, required=True)
+    startup.defer("task window", lambda: ran.append("task window"))
+    with pytest.raises(SystemExit):
+        startup.finish()
+    assert ran == ["icons"]
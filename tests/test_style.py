@@ -0,0 +1,44 @@
+from gui import style
+
+
+class _Widget:
+    def __init__(self):
+        self.sheets = []
+        self.properties = {}
+
+    def setStyleSheet(self, sheet):
+        self.sheets.append(sheet)
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def property(self, name):
+        return self.properties.get(name)
+
+
+def test_scopes_split_the_sheet_and_lightweight_is_flat():
+    full = style.compile_stylesheet("all", "pastel")
+    for scope in ("app", "login", "main", "task_list"):
+        sheet = style.compile_stylesheet(scope, "pastel")
+        assert sheet and len(sheet) < len(full) and "/*" not in sheet
+    assert "QListWidget#todoList" not in style.compile_stylesheet("app", "pastel")
+    assert "QDialog#loginDialog" in style.compile_stylesheet("login", "pastel")
+
+    light = style.compile_stylesheet("all", "lightweight")
+    assert "gradient" not in light and "box-shadow" not in light
+    assert "QMainWindow{background:rgba(205, 175, 255, 0.28)}" in light  # last gradient stop
+    assert "QListWidget::item{background:transparent;padding:10px}" in light
+
+
+def test_apply_theme_sets_each_sheet_once(monkeypatch):
+    monkeypatch.delenv(style.THEME_ENV_VAR, raising=False)
+    widget = _Widget()
+    assert style.apply_theme(widget, "task_list", style.list_theme(10)) is True
+    assert style.apply_theme(widget, "task_list", style.list_theme(20)) is False
+    assert style.apply_theme(widget, "task_list", style.list_theme(10_000)) is True
+    assert widget.sheets == [
+        style.compile_stylesheet("task_list", "pastel"),
+        style.compile_stylesheet("task_list", "lightweight"),
+    ]
+    monkeypatch.setenv(style.THEME_ENV_VAR, "pastel")
+    assert style.list_theme(10_000) == "pastel"
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from core import task_manager
+from database import db_setup
+from database.models import User
+from sync import server as sync_server
+from sync.client import RemoteError, RemoteTaskManager
+
+
+@pytest.fixture(autouse=True)
+def fast_watcher(temp_environment, monkeypatch):
+    monkeypatch.setattr(sync_server, "WATCH_INTERVAL_SECONDS", 0.02)
+
+
+@pytest.fixture
+def server_address():
+    server = sync_server.create_server("127.0.0.1:0")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    yield f"{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _login(address, username):
+    remote = RemoteTaskManager(address)
+    ok, _, user = remote.login_user(username, "pw")
+    assert ok is True
+    return remote, user["user_id"]
+
+
+def test_remote_backend_round_trips_task_manager_calls(server_address):
+    owner_id = User.create("owner", "pw")
+    collab_id = User.create("collab", "pw")
+    remote, _ = _login(server_address, "owner")
+    collab, _ = _login(server_address, "collab")
+    try:
+        ok, _, task_id = remote.create_encrypted_task("Remote", "secret", owner_id)
+        assert ok is True
+        assert remote.share_task_with_user(task_id, owner_id, collab_id) == (True, "Task shared")
+        
+        stats, tasks, user = collab.call_many([
+            ("get_task_stats", (collab_id,), {}),
+            ("get_tasks_for_user", (collab_id,), {}),
+            ("find_user", ("COLLAB",), {}),
+        ])
+        assert stats["shared_with_me"] == 1
+        assert tasks[0]["details"] == "secret"
+        assert tasks == task_manager.get_tasks_for_user(collab_id)  # rebuilt as Tasks
+        assert user == {"user_id": collab_id, "username": "collab"}
+        
+        with pytest.raises(RemoteError):
+            remote.call("get_tasks_for_user")
+    finally:
+        remote.close()
+        collab.close()
+
+
+def test_connections_only_act_as_their_logged_in_user(server_address):
+    owner_id = User.create("owner", "pw")
+    User.create("other", "pw")
+    ok, _, task_id = task_manager.create_encrypted_task("Private", "secret", owner_id)
+    anonymous = RemoteTaskManager(server_address)
+    other, other_id = _login(server_address, "other")
+    try:
+        with pytest.raises(RemoteError, match="Not logged in"):
+            anonymous.get_tasks_for_user(owner_id)
+        with pytest.raises(RemoteError, match="Not logged in"):
+            anonymous.subscribe(lambda version: None)
+
+        assert other.get_tasks_for_user(other_id) == []
+        for op, args in [
+            ("get_tasks_for_user", (owner_id,)),
+            ("search_tasks", (owner_id, "secret")),
+            ("read_task", (task_id, owner_id)),
+            ("get_task_changes", (owner_id, 0)),
+            ("get_task_shares", (task_id,)),
+            ("share_task_with_user", (task_id, owner_id, other_id)),
+        ]:
+            with pytest.raises(RemoteError, match="Permission denied"):
+                other.call(op, *args)
+        # a failed login drops the session instead of keeping the old user
+        assert other.login_user("owner", "wrong")[0] is False
+        with pytest.raises(RemoteError, match="Not logged in"):
+            other.get_tasks_for_user(other_id)
+    finally:
+        anonymous.close()
+        other.close()
+
+
+def test_login_indexes_older_tasks_for_search(server_address):
+    owner_id = User.create("owner", "pw")
+    _, _, task_id = task_manager.create_encrypted_task("Old", "renew passport", owner_id)
+    conn = db_setup.get_connection()
+    conn.execute("DELETE FROM task_search_tokens")  # as in a pre-index database
+    conn.execute("UPDATE permissions SET search_indexed = 0")
+    conn.commit()
+    conn.close()
+
+    remote, _ = _login(server_address, "owner")
+    try:
+        deadline = time.monotonic() + 5
+        while not remote.search_task_ids(owner_id, "passport") and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert remote.search_task_ids(owner_id, "passport") == [task_id]
+    finally:
+        remote.close()
+
+
+def test_subscribers_are_notified_of_other_writers(server_address):
+    owner_id = User.create("owner", "pw")
+    remote, _ = _login(server_address, "owner")
+    notified = threading.Event()
+    try:
+        remote.subscribe(lambda version: notified.set())
+        # a write that bypasses the server entirely
+        task_manager.create_encrypted_task("Direct", "x", owner_id)
+        assert notified.wait(5)
+        assert remote.get_task_changes(owner_id, 0)["inserted"][0]["title"] == "Direct"
+    finally:
+        remote.close()
+
+
+def test_unsubscribed_listeners_are_not_called(server_address):
+    owner_id = User.create("owner", "pw")
+    remote, _ = _login(server_address, "owner")
+    stale, live = [], threading.Event()
+    try:
+        listener = stale.append
+        remote.subscribe(listener)
+        remote.subscribe(lambda version: live.set())
+        remote.unsubscribe(listener)
+        task_manager.create_encrypted_task("Direct", "x", owner_id)
+        assert live.wait(5)
+        assert stale == []
+    finally:
+        remote.close()
@@ -1,22 +1,14 @@
+import sqlite3
+
 import pytest
 
 from core import task_manager
-from crypto import key_manager
 from database import db_setup
-from database.models import User
+from database.change_monitor import DataVersionMonitor
+from database.models import Permission, Task, TaskStore, Todo, User
 
 
-@pytest.fixture(autouse=True)
-def temp_environment(tmp_path, monkeypatch):
-    """Isolate the SQLite DB and master key for every test run."""
-    db_path = tmp_path / "todo.db"
-    monkeypatch.setattr(db_setup, "DATABASE_NAME", str(db_path))
-    db_setup.initialize_database()
-    
-    key_path = tmp_path / "master.key"
-    monkeypatch.setenv(key_manager.MASTER_KEY_ENV_VAR, str(key_path))
-    key_manager.reset_master_key_cache()
-    yield
+pytestmark = pytest.mark.usefixtures("temp_environment")
 
 
 def test_create_task_encrypts_details_and_returns_plaintext_for_owner():
@@ -75,3 +67,355 @@ def test_update_task_reencrypts_payload_for_all_users():
     
     tasks_collab = task_manager.get_tasks_for_user(collaborator_id)
     assert tasks_collab[0]["details"] == "New shared value"
+
+
+def test_get_task_stats_counts_shared_and_completed_tasks():
+    owner_id = User.create("owner", "pw")
+    collaborator_id = User.create("collab", "pw")
+    _, _, first_id = task_manager.create_encrypted_task("One", "a", owner_id)
+    task_manager.create_encrypted_task("Two", "b", owner_id, shared_with=[collaborator_id])
+    task_manager.update_task(first_id, owner_id, is_complete=True)
+    
+    assert task_manager.get_task_stats(owner_id) == {
+        "total": 2, "completed": 1, "pending": 1, "shared_with_me": 0, "shared_by_me": 1,
+    }
+    assert task_manager.get_task_stats(collaborator_id) == {
+        "total": 1, "completed": 0, "pending": 1, "shared_with_me": 1, "shared_by_me": 0,
+    }
+
+
+def test_stats_triggers_stay_consistent_through_mutations():
+    owner_id = User.create("owner", "pw")
+    collab_id = User.create("collab", "pw")
+    other_id = User.create("other", "pw")
+    _, _, task_id = task_manager.create_encrypted_task("Joint", "x", owner_id, shared_with=[collab_id])
+    task_manager.share_task_with_user(task_id, owner_id, other_id)
+    task_manager.update_task(task_id, collab_id, is_complete=True)
+    Permission.revoke(collab_id, task_id)
+    assert task_manager.get_task_stats(other_id)["completed"] == 1
+    assert db_setup.check_user_task_stats() == []
+    
+    task_manager.delete_task(task_id, owner_id)
+    assert task_manager.get_task_stats(owner_id)["total"] == 0
+    assert task_manager.get_task_stats(owner_id)["shared_by_me"] == 0
+    assert db_setup.check_user_task_stats() == []
+
+
+def test_check_user_task_stats_reports_and_repairs_drift():
+    owner_id = User.create("owner", "pw")
+    task_manager.create_encrypted_task("Solo", "x", owner_id)
+    conn = db_setup.get_connection()
+    conn.execute("UPDATE user_task_stats SET total = 7 WHERE user_id = ?", (owner_id,))
+    conn.commit()
+    conn.close()
+    
+    drift = db_setup.check_user_task_stats(repair=True)
+    assert drift == [{"user_id": owner_id, "column": "total", "stored": 7, "expected": 1}]
+    assert db_setup.check_user_task_stats() == []
+
+
+def test_search_matches_encrypted_details_without_storing_words():
+    owner_id = User.create("owner", "pw")
+    collab_id = User.create("collab", "pw")
+    _, _, milk_id = task_manager.create_encrypted_task("Groceries", "Buy oat MILK", owner_id)
+    _, _, eggs_id = task_manager.create_encrypted_task("Breakfast", "eggs and milk", owner_id)
+    
+    assert task_manager.search_task_ids(owner_id, "milk") == [milk_id, eggs_id]
+    assert task_manager.search_task_ids(owner_id, "milk eggs") == [eggs_id]
+    assert [t["details"] for t in task_manager.search_tasks(owner_id, "oat")] == ["Buy oat MILK"]
+    assert task_manager.search_task_ids(collab_id, "milk") == []
+    
+    conn = db_setup.get_connection()
+    stored = [row[0] for row in conn.execute("SELECT token FROM task_search_tokens")]
+    conn.close()
+    assert "milk" not in stored
+    
+    task_manager.share_task_with_user(milk_id, owner_id, collab_id)
+    assert task_manager.search_task_ids(collab_id, "milk") == [milk_id]
+    
+    task_manager.update_task(milk_id, collab_id, new_details="Buy bread")
+    assert task_manager.search_task_ids(owner_id, "milk") == [eggs_id]
+    assert task_manager.search_task_ids(owner_id, "bread") == [milk_id]
+    
+    Permission.revoke(collab_id, milk_id)
+    assert task_manager.search_task_ids(collab_id, "bread") == []
+
+
+def _forget_search_index():
+    conn = db_setup.get_connection()
+    conn.execute("DELETE FROM task_search_tokens")  # as in a pre-index database
+    conn.execute("UPDATE permissions SET search_indexed = 0")
+    conn.commit()
+    conn.close()
+
+
+def test_backfill_indexes_tasks_created_before_the_search_index():
+    owner_id = User.create("owner", "pw")
+    _, _, task_id = task_manager.create_encrypted_task("Old", "renew passport", owner_id)
+    _forget_search_index()
+    assert task_manager.search_task_ids(owner_id, "passport") == []
+
+    task_manager.start_search_backfill(owner_id).join()
+    assert task_manager.search_task_ids(owner_id, "passport") == [task_id]
+    assert task_manager.reindex_search_tokens(owner_id) == 0  # nothing left to do
+
+
+def test_tasks_without_searchable_words_are_indexed_once():
+    from core import user_auth
+
+    owner_id = User.create("owner", "pw")
+    for details in ("", None, "a b c"):  # no tokens to store for any of them
+        task_manager.create_encrypted_task("Old", details, owner_id)
+    _forget_search_index()
+
+    indexed = []
+    for _ in range(2):
+        assert user_auth.login_user("owner", "pw")[0] is True
+        indexed.append(task_manager.reindex_search_tokens(owner_id))
+    assert indexed == [3, 0]
+
+
+def test_undecryptable_tasks_neither_block_login_nor_the_backfill():
+    from core import user_auth
+
+    owner_id = User.create("owner", "pw")
+    _, _, broken_id = task_manager.create_encrypted_task("Broken", "lost words", owner_id)
+    _, _, task_id = task_manager.create_encrypted_task("Fine", "renew passport", owner_id)
+    _forget_search_index()
+    conn = db_setup.get_connection()
+    conn.execute("UPDATE todos SET details = 'not base64!' WHERE task_id = ?", (broken_id,))
+    conn.commit()
+    conn.close()
+
+    assert user_auth.login_user("owner", "pw")[0] is True
+    assert task_manager.reindex_search_tokens(owner_id) == 1
+    assert task_manager.search_task_ids(owner_id, "passport") == [task_id]
+
+
+def test_search_titles_prefix_matches_only_accessible_tasks():
+    owner_id = User.create("owner", "pw")
+    other_id = User.create("other", "pw")
+    _, _, groceries_id = task_manager.create_encrypted_task("Groceries: milk", None, owner_id)
+    _, _, garden_id = task_manager.create_encrypted_task("Garden groceries", None, owner_id)
+    task_manager.create_encrypted_task("Groceries for other", None, other_id)
+    
+    hits = task_manager.search_titles(owner_id, "gro mil", limit=10)
+    assert [hit["task_id"] for hit in hits] == [groceries_id]
+    assert {hit["task_id"] for hit in task_manager.search_titles(owner_id, "groc", None)} == {
+        groceries_id,
+        garden_id,
+    }
+    
+    task_manager.update_task(garden_id, owner_id, new_title="Garden weeds")
+    assert [hit["task_id"] for hit in task_manager.search_titles(owner_id, "groc")] == [groceries_id]
+    task_manager.delete_task(groceries_id, owner_id)
+    assert task_manager.search_titles(owner_id, "groc") == []
+    assert task_manager.search_titles(owner_id, "'\"*") == []
+
+
+def test_search_titles_falls_back_to_like_only_without_the_fts_table(monkeypatch):
+    owner_id = User.create("owner", "pw")
+    _, _, task_id = task_manager.create_encrypted_task("Groceries", None, owner_id)
+    assert [hit["task_id"] for hit in task_manager.search_titles(owner_id, "groc")] == [task_id]
+
+    conn = db_setup.get_connection()
+    conn.execute("DROP TABLE todos_fts")
+    conn.commit()
+    conn.close()
+    # the table was there when probed: a failing FTS query is an error, not a
+    # silent switch to substring matching
+    with pytest.raises(sqlite3.OperationalError):
+        task_manager.search_titles(owner_id, "groc")
+
+    monkeypatch.setattr(task_manager, "_title_index_by_database", {})
+    assert [hit["task_id"] for hit in task_manager.search_titles(owner_id, "roce")] == [task_id]
+
+
+def test_task_changes_return_only_deltas_since_version():
+    owner_id = User.create("owner", "pw")
+    collab_id = User.create("collab", "pw")
+    _, _, kept_id = task_manager.create_encrypted_task("Kept", "same", owner_id)
+    _, _, edited_id = task_manager.create_encrypted_task("Edited", "old", owner_id)
+    _, _, removed_id = task_manager.create_encrypted_task("Removed", "bye", owner_id)
+    version = task_manager.get_change_version()
+    
+    assert task_manager.get_task_changes(owner_id, version)["version"] == version
+    
+    task_manager.update_task(edited_id, owner_id, new_details="new")
+    task_manager.delete_task(removed_id, owner_id)
+    _, _, added_id = task_manager.create_encrypted_task("Added", "hi", owner_id)
+    task_manager.share_task_with_user(kept_id, owner_id, collab_id)
+    
+    changes = task_manager.get_task_changes(owner_id, version)
+    assert [t["task_id"] for t in changes["inserted"]] == [added_id]
+    assert [(t["task_id"], t["details"]) for t in changes["updated"]] == [(edited_id, "new")]
+    assert changes["deleted"] == [removed_id]
+    assert changes["reset"] is False
+    assert task_manager.get_task_changes(owner_id, changes["version"])["inserted"] == []
+    
+    collab_changes = task_manager.get_task_changes(collab_id, version)
+    assert [t["details"] for t in collab_changes["inserted"]] == ["same"]
+    
+    task_manager.prune_task_changes(task_manager.get_change_version())
+    assert task_manager.get_task_changes(owner_id, version)["reset"] is True
+
+
+def test_expired_changes_are_pruned_and_old_watermarks_reset():
+    owner_id = User.create("owner", "pw")
+    task_manager.create_encrypted_task("Old", "x", owner_id)
+    old_version = task_manager.get_change_version()
+    _, _, new_id = task_manager.create_encrypted_task("New", "y", owner_id)
+    conn = db_setup.get_connection()
+    conn.execute(
+        "UPDATE task_changes SET changed_at = datetime('now', '-8 days') WHERE change_id <= ?",
+        (old_version,),
+    )
+    conn.commit()
+    conn.close()
+
+    assert task_manager.prune_expired_task_changes() > 0
+    assert task_manager.prune_expired_task_changes() == 0
+    # a client that saw the pruned change can still follow the feed...
+    changes = task_manager.get_task_changes(owner_id, old_version)
+    assert changes["reset"] is False
+    assert [t["task_id"] for t in changes["inserted"]] == [new_id]
+    # ...one from before it has to reload everything
+    assert task_manager.get_task_changes(owner_id, 0)["reset"] is True
+
+
+def test_data_version_monitor_detects_commits_from_other_connections():
+    owner_id = User.create("owner", "pw")
+    monitor = DataVersionMonitor()
+    try:
+        assert monitor.poll() is False
+        task_manager.create_encrypted_task("New", "x", owner_id)
+        assert monitor.poll() is True
+        assert monitor.poll() is False
+    finally:
+        monitor.close()
+    assert monitor.poll() is False
+
+
+def _key_rows(task_id):
+    conn = db_setup.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT user_id, encrypted_key FROM encryption_keys WHERE task_id = ? ORDER BY user_id", (task_id,))
+    rows = cursor.fetchall()
+    cursor.execute("SELECT details FROM todos WHERE task_id = ?", (task_id,))
+    details = cursor.fetchone()[0]
+    conn.close()
+    return rows, details
+
+
+def test_rekey_tasks_replaces_data_key_for_remaining_users_only():
+    owner_id = User.create("owner", "pw")
+    keep_id = User.create("keep", "pw")
+    gone_id = User.create("gone", "pw")
+    _, _, task_id = task_manager.create_encrypted_task("Plan", "secret", owner_id, [keep_id, gone_id])
+    # a permission removed behind task_manager's back leaves the old wrapped key
+    conn = db_setup.get_connection()
+    conn.execute("DELETE FROM permissions WHERE user_id = ? AND task_id = ?", (gone_id, task_id))
+    conn.commit()
+    conn.close()
+    old_keys, old_details = _key_rows(task_id)
+    
+    result = task_manager.rekey_tasks([task_id, task_id, 999], batch_size=1, max_workers=2)
+    assert result == {"rekeyed": 1, "skipped": [], "missing": [999]}
+    
+    new_keys, new_details = _key_rows(task_id)
+    assert [user for user, _ in new_keys] == [owner_id, keep_id]
+    assert new_details != old_details
+    assert set(dict(new_keys).values()).isdisjoint(dict(old_keys).values())
+    for user_id in (owner_id, keep_id):
+        assert task_manager.read_task(task_id, user_id)["details"] == "secret"
+    assert task_manager.search_task_ids(keep_id, "secret") == [task_id]
+
+
+def test_rekey_tasks_retries_tasks_edited_concurrently(monkeypatch):
+    owner_id = User.create("owner", "pw")
+    _, _, task_id = task_manager.create_encrypted_task("Plan", "v1", owner_id)
+    prepare = task_manager._prepare_rekey
+    calls = []
+    
+    def edit_while_preparing(source):
+        calls.append(source[0])
+        if len(calls) == 1:
+            task_manager.update_task(task_id, owner_id, new_details="v2")
+        return prepare(source)
+    
+    monkeypatch.setattr(task_manager, "_prepare_rekey", edit_while_preparing)
+    assert task_manager.rekey_tasks([task_id])["rekeyed"] == 1
+    assert calls == [task_id, task_id]
+    assert task_manager.read_task(task_id, owner_id)["details"] == "v2"
+
+
+def test_revoke_access_is_set_based_and_can_queue_a_rekey():
+    owner_id = User.create("owner", "pw")
+    team = [User.create(f"member{i}", "pw") for i in range(3)]
+    _, _, task_ids = task_manager.create_encrypted_tasks(owner_id, [
+        {"title": f"Task {n}", "details": f"plan {n}", "shared_with": team} for n in range(4)
+    ])
+    _, _, other_id = task_manager.create_encrypted_task("Theirs", "x", team[0])
+    
+    assert task_manager.revoke_access(task_ids + [other_id], owner_id, team) == (
+        False, "Only the creator can revoke access"
+    )
+    ok, message = task_manager.revoke_access(task_ids, owner_id, team[:2] + [owner_id], rekey=True)
+    assert ok and "8 grants" in message
+    
+    for member in team[:2]:
+        assert [t["task_id"] for t in task_manager.get_tasks_for_user(member)] == (
+            [other_id] if member == team[0] else []
+        )
+        assert task_manager.search_task_ids(member, "plan") == []
+        assert task_manager.get_task_stats(member)["shared_with_me"] == 0
+    conn = db_setup.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM encryption_keys WHERE user_id IN (?, ?)", tuple(team[:2]))
+    assert cursor.fetchone()[0] == 1  # team[0]'s own task
+    conn.close()
+    assert db_setup.check_user_task_stats() == []
+    
+    _, old_details = _key_rows(task_ids[0])
+    result = task_manager.rekey_pending_tasks()
+    assert result["rekeyed"] == 4 and result["pending"] == 0
+    assert _key_rows(task_ids[0])[1] != old_details
+    assert task_manager.read_task(task_ids[0], team[2])["details"] == "plan 0"
+
+
+def test_permission_revoke_also_drops_wrapped_key():
+    owner_id = User.create("owner", "pw")
+    collab_id = User.create("collab", "pw")
+    _, _, task_id = task_manager.create_encrypted_task("Plan", "x", owner_id, [collab_id])
+    assert Permission.revoke(collab_id, task_id) is True
+    assert [user for user, _ in _key_rows(task_id)[0]] == [owner_id]
+
+
+def test_tasks_are_slotted_frozen_and_indexed_by_id():
+    owner_id = User.create("owner", "pw")
+    task_manager.create_encrypted_tasks(owner_id, [
+        {"title": f"Task {n}", "details": f"notes {n}"} for n in range(3)
+    ])
+    tasks = task_manager.get_tasks_for_user(owner_id)
+    task = tasks[1]
+    assert isinstance(task, Task) and not hasattr(task, "__dict__")
+    assert task["details"] == task.get("details") == "notes 1"
+    assert dict(task) == task.to_dict() and task.get("missing", 0) == 0
+    with pytest.raises(KeyError):
+        task["missing"]
+    with pytest.raises(AttributeError):
+        task.title = "changed"
+    assert task_manager.read_task(task.task_id, owner_id) == task
+    assert Todo.get_by_id(task.task_id).title == "Task 1"
+    assert Todo.get_by_id(task.task_id).is_complete is False
+    assert [t.is_complete for t in Todo.get_by_user(owner_id)] == [False] * 3
+    shared = Permission.get_user_todos(owner_id)
+    assert all(isinstance(t, Task) for t in shared) and len(shared) == 3
+    assert sorted(t["title"] for t in shared) == ["Task 0", "Task 1", "Task 2"]
+
+    store = TaskStore(tasks)
+    store.upsert(task.replace(is_complete=True))
+    assert store[task.task_id].is_complete is True
+    assert [t.task_id for t in store] == [t.task_id for t in tasks]  # position kept
+    assert store.remove(tasks[0].task_id) == tasks[0]
+    assert tasks[0].task_id not in store and len(store) == 2
@@ -0,0 +1,33 @@
+from database.models import Task
+from gui.task_store import TaskViewStore
+
+ME, OTHER = 1, 2
+
+
+def _task(task_id, created_by=ME, is_complete=False):
+    return Task(task_id, f"Task {task_id}", "", created_by, created_by, "", "", is_complete)
+
+
+def test_filter_views_follow_toggles_adds_and_removes():
+    store = TaskViewStore(ME, [
+        _task(1), _task(2, OTHER), _task(3, is_complete=True), _task(4, OTHER, True),
+    ])
+    assert store.rows("all") == [1, 2, 3, 4]
+    assert store.rows("done") == [3, 4]
+    assert store.rows("pending") == [1, 2]
+    assert store.rows("shared") == [2, 4]
+    assert store.rows("all", {4, 1}) == [1, 4]
+
+    store.upsert(store[2].replace(is_complete=True))
+    assert store.rows("done") == [2, 3, 4]  # load order kept
+    assert store.rows("pending") == [1]
+    assert store.rows("all") == [1, 2, 3, 4]
+
+    store.upsert(_task(5))
+    store.remove(3)
+    assert store.rows("all") == [1, 2, 4, 5]
+    assert store.rows("pending") == [1, 5]
+    assert (store.count("done"), len(store)) == (2, 4)
+
+    store.replace_all([_task(9, OTHER)])
+    assert store.rows("shared") == [9] and store.rows("pending") == [9]